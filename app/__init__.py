@@ -1,20 +1,21 @@
 """Flask application factory."""
 
 from flask import Flask
-from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
 
 from config import config
 
 db = SQLAlchemy()
-migrate = Migrate()
 
 
-def create_app(config_name="default"):
+def create_app(config_name="default", **overrides):
     """Create and configure the Flask application.
 
     Args:
         config_name: Configuration to use (development, production, testing, default)
+        **overrides: Config values applied on top of the configuration class,
+            before any extension reads them (tests use this to share one
+            database connection between apps)
 
     Returns:
         Configured Flask application instance
@@ -24,20 +25,80 @@ def create_app(config_name="default"):
     # Load configuration (instantiate to trigger __init__ for production validation)
     config_class = config[config_name]
     app.config.from_object(config_class())
+    app.config.update(overrides)
 
-    # Initialize extensions
+    # Take the client address from the proxy's X-Forwarded-For (rate limit keys)
+    if app.config.get("TRUSTED_PROXIES"):
+        from werkzeug.middleware.proxy_fix import ProxyFix
+
+        app.wsgi_app = ProxyFix(
+            app.wsgi_app,
+            x_for=app.config["TRUSTED_PROXIES"],
+            x_proto=app.config["TRUSTED_PROXIES"],
+        )
+
+    # Initialize extensions (Flask-Migrate loads with the ``flask db`` commands)
     db.init_app(app)
-    migrate.init_app(app, db)
+
+    # WAL, cache and lock settings plus upkeep for SQLite files (before any connection)
+    from app.sqlite_profile import init_sqlite_profile
+
+    init_sqlite_profile(app)
 
     # Initialize Flask-Login
     from app.auth import login_manager
 
     login_manager.init_app(app)
 
+    # Request, template and SQL timing (Server-Timing header and /metrics)
+    from app.instrumentation import init_instrumentation
+
+    init_instrumentation(app)
+
+    # Slow query log with EXPLAIN capture
+    from app.slow_queries import init_slow_query_log
+
+    init_slow_query_log(app)
+
+    # Per-route SQL query budgets
+    from app.query_budget import init_query_budgets
+
+    init_query_budgets(app)
+
+    # Per-client rate limits, load shedding and /healthz
+    from app.throttling import init_throttling
+
+    init_throttling(app)
+
+    # Per-worker cache of categories and users
+    from app.reference_data import init_reference_data
+
+    init_reference_data(app)
+
+    # Cache for computed results, per worker and optionally shared
+    from app.cache import init_cache
+
+    init_cache(app)
+
+    # Log word changes in the transaction that makes them
+    from app import changes  # noqa: F401
+
     # Register routes
+    from app.api import api_bp
     from app.routes import main_bp
 
     app.register_blueprint(main_bp)
+    app.register_blueprint(api_bp)
+
+    # Warm-up before taking traffic and /readyz
+    from app.warmup import init_warmup
+
+    init_warmup(app)
+
+    # Register CLI commands
+    from app.cli import register_commands
+
+    register_commands(app)
 
     # Auto-initialize database (idempotent - safe for Railway restarts)
     # Skip in testing mode - tests manage their own database state
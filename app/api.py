@@ -0,0 +1,130 @@
+"""JSON API routes."""
+
+from functools import wraps
+
+from flask import Blueprint, current_app, jsonify, request, url_for
+from flask_login import current_user
+
+from app import db
+from app.changes import get_changes, parse_cursor
+from app.growth import RESOLUTIONS, get_growth_series
+from app.jobs import DONE, JobQueueFull, get_job_runner, job_kinds
+from app.models import Job
+from app.query_budget import query_budget
+from app.reference_data import get_reference_data
+from app.stats_cube import get_stats_cube, with_names
+from app.sync import apply_sync_batch, get_sync_cursor
+from app.throttling import rate_limit
+
+api_bp = Blueprint("api", __name__, url_prefix="/api")
+
+
+def api_login_required(view):
+    """Like login_required, but answers 401 JSON instead of redirecting."""
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        if not current_user.is_authenticated:
+            return jsonify(error="Authentication required."), 401
+        return view(*args, **kwargs)
+    return wrapped
+
+
+@api_bp.route("/sync", methods=["POST"])
+@api_login_required
+@rate_limit("30/minute", burst=10)
+@query_budget(8)
+def sync_words():
+    """Store a batch of offline-captured words idempotently."""
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict) or not isinstance(payload.get("words"), list):
+        return jsonify(error='Expected a JSON object with a "words" array.'), 400
+
+    items = payload["words"]
+    max_batch = current_app.config.get("SYNC_MAX_BATCH", 1000)
+    if len(items) > max_batch:
+        return jsonify(error=f"At most {max_batch} words per sync."), 413
+
+    if not items:
+        return jsonify(results=[], cursor=get_sync_cursor())
+
+    results, cursor = apply_sync_batch(items, current_user.id)
+    return jsonify(results=results, cursor=cursor)
+
+
+@api_bp.route("/changes")
+@api_login_required
+@query_budget(3)
+def list_changes():
+    """Return the word change log after a client's cursor, one page at a time."""
+    since = parse_cursor(request.args.get("since", "0"))
+    if since is None:
+        return jsonify(error="since must be a change position from 0 to 2**63-1."), 400
+    limit = request.args.get("limit", 100, type=int)
+    limit = max(1, min(limit, current_app.config.get("CHANGES_MAX_PAGE", 1000)))
+    return jsonify(get_changes(since=since, limit=limit))
+
+
+@api_bp.route("/growth")
+@api_login_required
+@query_budget(2)
+def growth_series():
+    """Return the cumulative vocabulary series for charts."""
+    resolution = request.args.get("resolution", "day")
+    if resolution not in RESOLUTIONS:
+        return jsonify(error=f"resolution must be one of: {', '.join(RESOLUTIONS)}."), 400
+    points = request.args.get("points")
+    if points is not None:
+        if not points.isdigit() or int(points) < 3:
+            return jsonify(error="points must be a whole number of at least 3."), 400
+        points = min(int(points), current_app.config.get("GROWTH_MAX_POINTS", 2000))
+    return jsonify(get_growth_series(resolution, points))
+
+
+@api_bp.route("/stats")
+@api_login_required
+@query_budget(3)
+def stats_cube():
+    """Return word counts by month, person and category, with subtotals."""
+    return jsonify(with_names(get_stats_cube(), get_reference_data()))
+
+
+def job_payload(job):
+    """Serialize a job with its status and download URLs."""
+    payload = job.to_dict()
+    payload["status_url"] = url_for("api.get_job", job_id=job.id)
+    payload["download_url"] = (
+        url_for("main.job_download", job_id=job.id) if job.status == DONE else None
+    )
+    return payload
+
+
+@api_bp.route("/jobs", methods=["POST"])
+@api_login_required
+@rate_limit("20/hour", burst=5)
+@query_budget(6)
+def create_job():
+    """Queue a background job, or return the current equivalent one."""
+    payload = request.get_json(silent=True)
+    kinds = job_kinds()
+    if not isinstance(payload, dict) or payload.get("kind") not in kinds:
+        return jsonify(error=f"kind must be one of: {', '.join(kinds)}."), 400
+    try:
+        job, reused = get_job_runner(current_app._get_current_object()).submit(
+            payload["kind"], user_id=current_user.id
+        )
+    except JobQueueFull:
+        response = jsonify(error="Too many jobs are waiting. Try again shortly.")
+        response.headers["Retry-After"] = "30"
+        return response, 503
+    return jsonify(job_payload(job)), 200 if reused else 202
+
+
+@api_bp.route("/jobs/<job_id>")
+@api_login_required
+@query_budget(1)
+def get_job(job_id):
+    """Report a background job's status and progress."""
+    job = db.session.get(Job, job_id)
+    if job is None:
+        return jsonify(error="No such job."), 404
+    return jsonify(job_payload(job))
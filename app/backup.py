@@ -0,0 +1,465 @@
+"""Compressed, checksummed database snapshots and bulk restore.
+
+A snapshot is a gzip-compressed JSON-lines stream:
+
+* a header object (format, version, creation time, source dialect, schema
+  revision and the tables it holds),
+* for each table a ``{"table": ..., "columns": [...]}`` object followed by
+  one JSON array per row and a ``{"end": ..., "rows": n}`` object,
+* a footer holding the SHA-256 of every preceding (uncompressed) line.
+
+Rows keep their ids and timestamps. Restore replaces the contents of the
+snapshot's tables in one transaction: secondary indexes are dropped, rows are
+bulk loaded (raw ``executemany`` on SQLite, ``COPY`` on Postgres), the
+checksum is verified, indexes are rebuilt and id sequences moved past the
+restored ids. A corrupt or truncated snapshot rolls back without touching
+the database.
+
+An incremental snapshot (``since``) holds only the change log entries after
+a position, so it costs O(changes). It restores on top of a database at
+exactly that position, typically one just restored from the snapshot it
+continues. Every restore ends with a change log ``reset`` entry recording
+the position it restored through.
+"""
+
+import csv
+import gzip
+import hashlib
+import io
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import DateTime, String, cast, delete, func, inspect, select, text
+
+from app import db
+from app.changes import DELETE, RESET, latest_change, latest_seq, record_reset
+from app.data_versions import bump_version, watched_names
+from app.models import Word, WordChange
+
+SNAPSHOT_FORMAT = "emily-words-snapshot"
+SNAPSHOT_VERSION = 1
+
+# Diagnostic or derived tables that are not backed up
+EXCLUDED_TABLES = {"slow_queries", "data_versions", "jobs"}
+
+# Marks NULL in Postgres COPY input
+COPY_NULL = "\\N"
+
+
+def snapshot_tables():
+    """Return the tables a snapshot holds, parents before children."""
+    return [table for table in db.metadata.sorted_tables if table.name not in EXCLUDED_TABLES]
+
+
+def _dump_line(obj):
+    return (json.dumps(obj, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def _backup_columns(table):
+    """Select columns for a backup, reading datetimes as their stored text.
+
+    Skipping the parse-and-reformat round trip is most of the cost of a
+    backup; the text is what restore feeds back to the database.
+    """
+    return [
+        cast(column, String).label(column.name) if isinstance(column.type, DateTime) else column
+        for column in table.columns
+    ]
+
+
+def _schema_revision(connection):
+    if not inspect(connection).has_table("alembic_version"):
+        return None
+    return connection.execute(text("SELECT version_num FROM alembic_version")).scalar()
+
+
+def write_snapshot(path, batch_size=5000, since=None):
+    """Stream every backed-up table (or the changes since a position) into a file.
+
+    The file is written next to ``path`` and renamed into place when
+    complete, so an interrupted backup never leaves a partial snapshot.
+
+    Args:
+        path: Destination file.
+        batch_size: Rows fetched per round trip.
+        since: Change log position to start an incremental snapshot after.
+
+    Returns:
+        Dictionary with ``path``, ``tables`` (rows per table), ``through``
+        (the change log position covered), ``bytes`` and ``seconds``.
+    """
+    started = time.perf_counter()
+    connection = db.session.connection()
+    through = latest_seq()
+    if since is None:
+        tables = snapshot_tables()
+    else:
+        if since > through:
+            raise ValueError(f"The change log only reaches {through}.")
+        tables = [WordChange.__table__]
+    hasher = hashlib.sha256()
+    counts = {}
+
+    encode = json.JSONEncoder(separators=(",", ":")).encode
+
+    partial = f"{path}.partial"
+    with gzip.open(partial, "wb", compresslevel=6) as out:
+        def write(obj):
+            line = _dump_line(obj)
+            hasher.update(line)
+            out.write(line)
+
+        write({
+            "format": SNAPSHOT_FORMAT,
+            "version": SNAPSHOT_VERSION,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "dialect": connection.dialect.name,
+            "revision": _schema_revision(connection),
+            "tables": [table.name for table in tables],
+            "since": since,
+            "through": through,
+        })
+
+        for table in tables:
+            write({"table": table.name, "columns": [column.name for column in table.columns]})
+
+            rows = 0
+            query = select(*_backup_columns(table)).order_by(*table.primary_key.columns)
+            if since is not None:
+                query = query.where(table.c.seq > since, table.c.seq <= through)
+            result = connection.execute(query.execution_options(yield_per=batch_size))
+            for partition in result.partitions():
+                # One write and one hash update per batch rather than per row
+                chunk = "".join(encode(list(row)) + "\n" for row in partition).encode("utf-8")
+                hasher.update(chunk)
+                out.write(chunk)
+                rows += len(partition)
+            write({"end": table.name, "rows": rows})
+            counts[table.name] = rows
+
+        out.write(_dump_line({"sha256": hasher.hexdigest(), "rows": counts}))
+
+    os.replace(partial, path)
+    return {
+        "path": path,
+        "tables": counts,
+        "through": through,
+        "bytes": os.path.getsize(path),
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def read_snapshot(path):
+    """Yield a snapshot's header, table sections and rows, verifying as it goes.
+
+    Yields:
+        ``("header", dict)``, then per table ``("table", name, columns)``,
+        ``("row", list)`` for each row and ``("end", name, rows)``.
+
+    Raises:
+        ValueError: If the file is not a snapshot, is truncated, or its
+            checksum or row counts do not match.
+    """
+    hasher = hashlib.sha256()
+    header = None
+    current = None
+    rows = 0
+    footer = None
+
+    try:
+        with gzip.open(path, "rb") as stream:
+            for line in stream:
+                if footer is not None:
+                    raise ValueError("Snapshot has data after its footer.")
+                if line.startswith(b"["):
+                    if current is None:
+                        raise ValueError("Snapshot row outside a table section.")
+                    hasher.update(line)
+                    rows += 1
+                    yield ("row", json.loads(line))
+                    continue
+
+                obj = json.loads(line)
+                if "sha256" in obj:
+                    footer = obj
+                    continue
+                hasher.update(line)
+
+                if header is None:
+                    if obj.get("format") != SNAPSHOT_FORMAT:
+                        raise ValueError("Not a snapshot file.")
+                    if obj.get("version") != SNAPSHOT_VERSION:
+                        raise ValueError(f"Unsupported snapshot version {obj.get('version')}.")
+                    header = obj
+                    yield ("header", obj)
+                elif "table" in obj:
+                    current, rows = obj["table"], 0
+                    yield ("table", current, obj["columns"])
+                elif "end" in obj:
+                    if obj["end"] != current or obj["rows"] != rows:
+                        raise ValueError(f"Row count mismatch in table {obj['end']}.")
+                    yield ("end", current, rows)
+                    current = None
+    except (OSError, EOFError, json.JSONDecodeError) as exc:
+        raise ValueError(f"Unreadable snapshot: {exc}") from exc
+
+    if header is None or footer is None:
+        raise ValueError("Snapshot is truncated.")
+    if footer["sha256"] != hasher.hexdigest():
+        raise ValueError("Snapshot checksum does not match.")
+
+
+def verify_snapshot(path):
+    """Check a snapshot's checksum and structure without restoring it.
+
+    Returns:
+        Tuple of (header dict, rows per table).
+
+    Raises:
+        ValueError: If the snapshot is invalid.
+    """
+    header = None
+    counts = {}
+    for event in read_snapshot(path):
+        if event[0] == "header":
+            header = event[1]
+        elif event[0] == "end":
+            counts[event[1]] = event[2]
+    return header, counts
+
+
+class _Loader:
+    """Bulk loads rows into one table using the dialect's fastest path."""
+
+    def __init__(self, connection, table, columns):
+        self.connection = connection
+        self.table = table
+        self.columns = columns
+        self.dialect = connection.dialect.name
+        preparer = connection.dialect.identifier_preparer
+        self.table_sql = preparer.format_table(table)
+        self.columns_sql = ", ".join(preparer.quote(name) for name in columns)
+
+    def load(self, rows):
+        if self.dialect == "sqlite":
+            # Snapshot datetimes are already in the database's text format
+            placeholders = ", ".join("?" for _ in self.columns)
+            self.connection.connection.cursor().executemany(
+                f"INSERT INTO {self.table_sql} ({self.columns_sql}) VALUES ({placeholders})",
+                rows,
+            )
+        elif self.dialect == "postgresql":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerows(
+                [COPY_NULL if value is None else value for value in row] for row in rows
+            )
+            buffer.seek(0)
+            self.connection.connection.cursor().copy_expert(
+                f"COPY {self.table_sql} ({self.columns_sql}) FROM STDIN "
+                f"WITH (FORMAT csv, NULL '{COPY_NULL}')",
+                buffer,
+            )
+        else:
+            datetimes = {
+                name for name in self.columns
+                if isinstance(self.table.c[name].type, DateTime)
+            }
+            self.connection.execute(self.table.insert(), [
+                {
+                    name: datetime.fromisoformat(value)
+                    if name in datetimes and value is not None else value
+                    for name, value in zip(self.columns, row)
+                }
+                for row in rows
+            ])
+
+
+def _reset_sequences(connection, tables):
+    """Move Postgres id sequences past the restored ids, never backwards.
+
+    Sequences keep any higher value they already had, so ids and change
+    log positions handed out before the restore are not issued again.
+    """
+    if connection.dialect.name != "postgresql":
+        return
+    for table in tables:
+        column = table.autoincrement_column
+        if column is None:
+            continue
+        max_id = connection.execute(select(func.max(column))).scalar() or 0
+        connection.execute(
+            text(
+                "SELECT setval(CAST(:sequence AS regclass), GREATEST(:value, "
+                "COALESCE(pg_sequence_last_value(CAST(:sequence AS regclass)), 0), 1))"
+            ),
+            {
+                "sequence": connection.execute(
+                    text("SELECT pg_get_serial_sequence(:table, :column)"),
+                    {"table": table.name, "column": column.name},
+                ).scalar(),
+                "value": max_id,
+            },
+        )
+
+
+def restore_snapshot(path, batch_size=5000):
+    """Replace the snapshot's tables with its contents.
+
+    Everything happens in one transaction; nothing changes unless the whole
+    snapshot loads and its checksum matches.
+
+    Args:
+        path: Snapshot file.
+        batch_size: Rows per bulk insert.
+
+    Returns:
+        Dictionary with ``tables`` (rows per table) and ``seconds``.
+
+    Raises:
+        ValueError: If the snapshot is invalid or does not match the schema.
+    """
+    started = time.perf_counter()
+    try:
+        counts = _restore(path, batch_size)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return {"tables": counts, "seconds": time.perf_counter() - started}
+
+
+def _restore(path, batch_size):
+    connection = db.session.connection()
+    events = read_snapshot(path)
+    header = next(events)[1]
+    if header.get("since") is not None:
+        return _restore_incremental(connection, header, events, batch_size)
+
+    tables = []
+    for name in header["tables"]:
+        table = db.metadata.tables.get(name)
+        if table is None:
+            raise ValueError(f"Snapshot table {name} does not exist in this schema.")
+        tables.append(table)
+    order = {table.name: index for index, table in enumerate(db.metadata.sorted_tables)}
+    tables.sort(key=lambda table: order[table.name])
+
+    for table in reversed(tables):
+        connection.execute(table.delete())
+
+    # Build secondary indexes once, after loading, instead of per row
+    indexes = [index for table in tables for index in table.indexes]
+    for index in indexes:
+        index.drop(connection, checkfirst=True)
+
+    counts = {}
+    loader = None
+    batch = []
+    for event in events:
+        kind = event[0]
+        if kind == "row":
+            batch.append(event[1])
+            if len(batch) >= batch_size:
+                loader.load(batch)
+                batch = []
+        elif kind == "table":
+            table = db.metadata.tables[event[1]]
+            unknown = [name for name in event[2] if name not in table.c]
+            if unknown:
+                raise ValueError(f"Snapshot columns {unknown} do not exist in {table.name}.")
+            loader = _Loader(connection, table, event[2])
+        elif kind == "end":
+            if batch:
+                loader.load(batch)
+                batch = []
+            counts[event[1]] = event[2]
+
+    for index in indexes:
+        index.create(connection)
+    _reset_sequences(connection, tables)
+    _finish_restore(header)
+    return counts
+
+
+def _finish_restore(header):
+    # Readers must re-read everything; the entry also marks where an
+    # incremental snapshot can continue from
+    record_reset({"restored_through": header.get("through")})
+    # Cached data no longer matches the database
+    for name in sorted(watched_names()):
+        bump_version(name)
+
+
+def _check_continues(header):
+    """Ensure the database is at the position an incremental snapshot starts from."""
+    since = header["since"]
+    last = latest_change()
+    if last is None:
+        position = 0
+    elif last.op == RESET and last.data:
+        position = json.loads(last.data).get("restored_through", last.seq)
+    else:
+        position = last.seq
+    if position != since and (last is None or last.seq != since):
+        raise ValueError(
+            f"Incremental snapshot continues from change {since}, "
+            f"but the database is at change {position}."
+        )
+
+
+def _restore_incremental(connection, header, events, batch_size):
+    """Apply an incremental snapshot's changes to the words table."""
+    _check_continues(header)
+
+    table = Word.__table__
+    datetimes = {column.key for column in table.columns if isinstance(column.type, DateTime)}
+    counts = {}
+    columns = None
+    batch = []
+
+    def apply(batch):
+        # Only the last change per word in a batch matters
+        final = {}
+        for row in batch:
+            change = dict(zip(columns, row))
+            if change["op"] == RESET:
+                raise ValueError(
+                    f"Change {change['seq']} replaced all words; restore a full snapshot."
+                )
+            final[change["word_id"]] = change
+        connection.execute(delete(table).where(table.c.id.in_(list(final))))
+        images = []
+        for change in final.values():
+            if change["op"] == DELETE:
+                continue
+            image = json.loads(change["data"])
+            images.append({
+                key: datetime.fromisoformat(value) if key in datetimes and value else value
+                for key, value in image.items()
+            })
+        if images:
+            connection.execute(table.insert(), images)
+
+    for event in events:
+        kind = event[0]
+        if kind == "table":
+            if event[1] != WordChange.__tablename__:
+                raise ValueError(f"Unexpected table {event[1]} in incremental snapshot.")
+            columns = event[2]
+        elif kind == "row":
+            batch.append(event[1])
+            if len(batch) >= batch_size:
+                apply(batch)
+                batch = []
+        elif kind == "end":
+            if batch:
+                apply(batch)
+                batch = []
+            counts[event[1]] = event[2]
+
+    _reset_sequences(connection, [table])
+    _finish_restore(header)
+    return counts
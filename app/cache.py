@@ -0,0 +1,648 @@
+"""Cache for computed results, per worker and optionally shared between workers.
+
+Stats, timelines and chart series are computed the same way in every
+gunicorn worker. ``@cached`` wraps such a function so that its results are
+kept in two tiers:
+
+- a per-process LRU (``CACHE_MAX_ENTRIES`` entries), served without
+  leaving the worker;
+- with ``CACHE_STORAGE=sqlite:///path``, a SQLite file that every worker
+  on the host shares, bounded to ``CACHE_SHARED_MAX_MB``. A result computed
+  by one worker is picked up by the others instead of being recomputed.
+
+Each entry is stamped with the versions of the data sets it was computed
+from (see ``data_versions``) and the generations of its tags. It is served
+only while its stamp still matches, and until its TTL runs out
+(``CACHE_DEFAULT_TTL`` seconds unless given, 0 for none). Data versions are
+checked in one query, at most once per request; ``invalidate`` bumps tags
+for results that depend on something other than the database.
+
+When an entry goes stale, only one caller per worker recomputes it
+(single flight); concurrent callers wait for its result. When only its TTL
+ran out, callers are served the stale value instead for up to
+``CACHE_STALE_GRACE`` seconds, while it is refreshed in the background. An
+entry built from older data versions or tag generations is never served,
+so a write is visible on the writer's next request. With
+``CACHE_SHARED_LOCK`` the shared tier also holds a lock per entry, so one
+worker computes and the others pick its result up from the file.
+``single_flight`` coalesces computations that are not cached at all, such
+as the CSV export.
+
+Values go to the shared tier pickled, so they must be picklable and the
+file must only be writable by the app. Lookups per function are exported
+on ``/metrics``.
+"""
+
+import functools
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from flask import current_app, g, has_app_context, has_request_context
+
+from app import db
+from app.data_versions import get_versions, on_commit
+
+# Lookup outcomes counted per namespace: served from this worker, from the
+# shared tier, stale during a refresh, from another caller's computation, or
+# computed
+LOCAL_HIT, SHARED_HIT, STALE = "local_hit", "shared_hit", "stale"
+COALESCED, MISS = "coalesced", "miss"
+OUTCOMES = (LOCAL_HIT, SHARED_HIT, STALE, COALESCED, MISS)
+
+# Seconds between shared tier checks while another worker holds the lock
+LOCK_POLL_SECONDS = 0.05
+
+
+class LocalTier:
+    """Least recently used entries in this process's memory."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._generations = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the (stamp, expires, value) stored for ``key``, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, stamp, expires, value):
+        """Store an entry, evicting the least recently used beyond the bound."""
+        with self._lock:
+            self._entries[key] = (stamp, expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def generations(self, tags):
+        """Return the current generation of each tag."""
+        with self._lock:
+            return {tag: self._generations[tag] for tag in tags}
+
+    def invalidate(self, tags):
+        """Start a new generation of each tag."""
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] += 1
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteTier:
+    """Pickled entries and tag generations in a SQLite file shared by every worker."""
+
+    def __init__(self, path, max_bytes=32 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, stamp TEXT NOT NULL, "
+            "expires REAL, stored REAL NOT NULL, size INTEGER NOT NULL, value BLOB NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_entries_stored ON entries (stored)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS tags (tag TEXT PRIMARY KEY, generation INTEGER NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS locks (key TEXT PRIMARY KEY, expires REAL NOT NULL)"
+        )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        """Return the (stamp, expires, value) stored for ``key``, or None."""
+        row = self._connect().execute(
+            "SELECT stamp, expires, value FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        stamp, expires, value = row
+        try:
+            return _decode_stamp(stamp), expires, pickle.loads(value)
+        except Exception:
+            return None
+
+    def set(self, key, stamp, expires, value):
+        """Store an entry, evicting the oldest ones beyond ``max_bytes``.
+
+        Values that cannot be pickled, or that alone exceed the bound, are
+        not shared.
+        """
+        try:
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return
+        if len(blob) > self.max_bytes:
+            return
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, stamp, expires, stored, size, value) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, json.dumps(stamp), expires, now, len(blob), blob),
+            )
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total > self.max_bytes:
+                self._evict(conn, now)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _evict(self, conn, now):
+        # Expired entries go first, then the oldest until 90% of the bound
+        conn.execute("DELETE FROM entries WHERE expires IS NOT NULL AND expires <= ?", (now,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        excess = total - self.max_bytes * 0.9
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY stored"):
+            if excess <= 0:
+                break
+            victims.append((key,))
+            excess -= size
+        conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+
+    def generations(self, tags):
+        """Return the current generation of each tag."""
+        placeholders = ", ".join("?" * len(tags))
+        rows = dict(self._connect().execute(
+            f"SELECT tag, generation FROM tags WHERE tag IN ({placeholders})", tuple(tags)
+        ).fetchall())
+        return {tag: rows.get(tag, 0) for tag in tags}
+
+    def invalidate(self, tags):
+        """Start a new generation of each tag, for every worker."""
+        self._connect().executemany(
+            "INSERT INTO tags (tag, generation) VALUES (?, 1) "
+            "ON CONFLICT(tag) DO UPDATE SET generation = generation + 1",
+            [(tag,) for tag in tags],
+        )
+
+    def acquire(self, key, seconds):
+        """Take the cross-worker lock for ``key`` unless another worker holds it.
+
+        Args:
+            key: Entry key.
+            seconds: How long the lock lasts if it is never released.
+
+        Returns:
+            True if the lock was taken.
+        """
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT expires FROM locks WHERE key = ?", (key,)).fetchone()
+            taken = row is None or row[0] <= now
+            if taken:
+                conn.execute(
+                    "INSERT OR REPLACE INTO locks (key, expires) VALUES (?, ?)", (key, now + seconds)
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return taken
+
+    def release(self, key):
+        """Release the cross-worker lock for ``key``."""
+        self._connect().execute("DELETE FROM locks WHERE key = ?", (key,))
+
+    def clear(self):
+        """Drop every entry."""
+        self._connect().execute("DELETE FROM entries")
+
+    def size(self):
+        """Return the bytes of pickled values stored."""
+        return self._connect().execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+
+def _decode_stamp(text):
+    return [[tuple(pair) for pair in part] for part in json.loads(text)]
+
+
+def create_shared_tier(storage, max_bytes):
+    """Build the shared tier from a ``CACHE_STORAGE`` value (None for ``memory``).
+
+    Raises:
+        ValueError: If the storage URL is not ``memory`` or ``sqlite:///path``.
+    """
+    if not storage or storage == "memory":
+        return None
+    if storage.startswith("sqlite:///"):
+        return SQLiteTier(storage[len("sqlite:///"):], max_bytes)
+    raise ValueError(f"Unsupported CACHE_STORAGE {storage!r}.")
+
+
+class _Flight:
+    """One computation in progress and, once done, its outcome."""
+
+    __slots__ = ("done", "value", "error", "depends_on")
+
+    def __init__(self, depends_on=()):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+        self.depends_on = frozenset(depends_on)
+
+
+class SingleFlight:
+    """Runs one computation per key at a time in this process.
+
+    Callers that ask for a key while its computation runs wait for it and
+    share its value, or its exception.
+    """
+
+    def __init__(self, timeout=30.0):
+        self.timeout = timeout
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def run(self, key, compute, depends_on=()):
+        """Return ``compute()``'s value, joining a computation already running.
+
+        Args:
+            key: Hashable key; equal keys share one computation.
+            compute: Callable returning the value.
+            depends_on: Data set names the value reads. A commit in this
+                process that changes one detaches the running computation,
+                so later callers start a new one.
+
+        Returns:
+            (value, led) where ``led`` is False if the value came from
+            another caller's computation.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            led = flight is None
+            if led:
+                flight = self._flights[key] = _Flight(depends_on)
+        if not led:
+            if not flight.done.wait(self.timeout):
+                # The computation is stuck: don't queue behind it
+                return compute(), True
+            if flight.error is not None:
+                raise flight.error
+            return flight.value, False
+        try:
+            flight.value = compute()
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            flight.done.set()
+        return flight.value, True
+
+    def running(self, key):
+        """Return True if a computation for ``key`` is in progress."""
+        return key in self._flights
+
+    def forget(self, names):
+        """Detach running computations that read any of the data sets ``names``."""
+        with self._lock:
+            for key in [key for key, flight in self._flights.items() if flight.depends_on & names]:
+                del self._flights[key]
+
+
+def current_versions(names):
+    """Return the versions of data sets, read at most once per request."""
+    memo = g.setdefault("_cache_versions", {}) if has_request_context() else {}
+    missing = [name for name in names if name not in memo]
+    if missing:
+        memo.update(get_versions(missing))
+    return {name: memo[name] for name in names}
+
+
+class Cache:
+    """One app's two-tier cache, its in-flight computations and its counters."""
+
+    def __init__(self, local, shared=None, default_ttl=0, stale_grace=0,
+                 refresh_async=True, shared_lock=False, lock_timeout=10.0, app=None):
+        self.local = local
+        self.shared = shared
+        self.default_ttl = default_ttl
+        self.stale_grace = stale_grace
+        self.refresh_async = refresh_async
+        self.shared_lock = shared_lock and shared is not None
+        self.lock_timeout = lock_timeout
+        self.app = app
+        self.flights = SingleFlight(timeout=lock_timeout * 3)
+        self.counts = defaultdict(lambda: dict.fromkeys(OUTCOMES, 0))
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def get(self, namespace, key, compute, versions=(), tags=(), ttl=None):
+        """Return the cached value for ``key``, calling ``compute()`` on a miss.
+
+        Args:
+            namespace: Group of entries the hit counters are kept under.
+            key: Entry key within the namespace; its ``repr`` must identify it.
+            compute: Callable returning the value.
+            versions: Data set names the value is computed from.
+            tags: Tags that ``invalidate`` can expire the value by.
+            ttl: Seconds the value may be served for (``default_ttl`` if None,
+                0 for no limit).
+
+        Returns:
+            The value.
+        """
+        full_key = f"{namespace}:{key!r}"
+        # Stamped before computing, so a concurrent write can only make the
+        # value newer than its stamp, never older
+        stamp = self._stamp(versions, tags)
+        now = time.time()
+
+        entry = self.local.get(full_key)
+        if _fresh(entry, stamp, now):
+            self._count(namespace, LOCAL_HIT)
+            return entry[2]
+        if self.shared is not None:
+            shared_entry = self.shared.get(full_key)
+            if _fresh(shared_entry, stamp, now):
+                self.local.set(full_key, *shared_entry)
+                self._count(namespace, SHARED_HIT)
+                return shared_entry[2]
+            entry = entry or shared_entry
+
+        ttl = self.default_ttl if ttl is None else ttl
+        flight_key = (full_key, repr(stamp))
+
+        def refresh():
+            return self._refresh(namespace, full_key, stamp, compute, ttl, entry)
+
+        if self._stale_usable(entry, stamp, now):
+            if self.flights.running(flight_key) or self._start_refresh(flight_key, refresh):
+                self._count(namespace, STALE)
+                return entry[2]
+
+        value, led = self.flights.run(flight_key, refresh)
+        if not led:
+            self._count(namespace, COALESCED)
+        return value
+
+    def _stale_usable(self, entry, stamp, now):
+        """Return True if a stale entry may be served while it refreshes.
+
+        Only entries whose TTL ran out qualify, for ``stale_grace`` seconds
+        after it did: one whose data versions or tags moved may miss a
+        write the caller just made.
+        """
+        if entry is None or not self.stale_grace or entry[0] != stamp:
+            return False
+        expires = entry[1]
+        return expires is not None and now - expires <= self.stale_grace
+
+    def _start_refresh(self, flight_key, refresh):
+        """Recompute an entry on a background thread; False if refreshes run inline."""
+        if not self.refresh_async or self.app is None:
+            return False
+        with self._lock:
+            if flight_key in self._refreshing:
+                return True
+            self._refreshing.add(flight_key)
+
+        def run():
+            try:
+                with self.app.app_context():
+                    try:
+                        self.flights.run(flight_key, refresh)
+                    except Exception:
+                        self.app.logger.exception("Background cache refresh failed")
+                    finally:
+                        db.session.remove()
+            finally:
+                with self._lock:
+                    self._refreshing.discard(flight_key)
+
+        threading.Thread(target=run, name="cache-refresh", daemon=True).start()
+        return True
+
+    def _refresh(self, namespace, full_key, stamp, compute, ttl, stale):
+        """Compute and store an entry, deferring to a worker that holds its lock."""
+        locked = False
+        if self.shared_lock:
+            locked = self.shared.acquire(full_key, self.lock_timeout)
+            if not locked:
+                entry = self._await_other_worker(full_key, stamp)
+                if entry is not None:
+                    self.local.set(full_key, *entry)
+                    self._count(namespace, SHARED_HIT)
+                    return entry[2]
+                if self._stale_usable(stale, stamp, time.time()):
+                    self._count(namespace, STALE)
+                    return stale[2]
+        try:
+            value = compute()
+            now = time.time()
+            expires = now + ttl if ttl else None
+            self.local.set(full_key, stamp, expires, value)
+            if self.shared is not None:
+                self.shared.set(full_key, stamp, expires, value)
+            self._count(namespace, MISS)
+            return value
+        finally:
+            if locked:
+                self.shared.release(full_key)
+
+    def _await_other_worker(self, full_key, stamp):
+        # Another worker is computing the entry: wait for it to appear in the
+        # shared tier, up to the lock timeout
+        deadline = time.time() + self.lock_timeout
+        while time.time() < deadline:
+            time.sleep(LOCK_POLL_SECONDS)
+            entry = self.shared.get(full_key)
+            if _fresh(entry, stamp, time.time()):
+                return entry
+        return None
+
+    def _stamp(self, versions, tags):
+        return [
+            sorted(current_versions(versions).items()) if versions else [],
+            sorted(self._generations(tags).items()) if tags else [],
+        ]
+
+    def _generations(self, tags):
+        # Read at most once per request, like data versions
+        tier = self.shared if self.shared is not None else self.local
+        memo = g.setdefault("_cache_tags", {}) if has_request_context() else {}
+        missing = [tag for tag in tags if tag not in memo]
+        if missing:
+            memo.update(tier.generations(missing))
+        return {tag: memo[tag] for tag in tags}
+
+    def _count(self, namespace, outcome):
+        with self._lock:
+            self.counts[namespace][outcome] += 1
+
+    def invalidate(self, *tags):
+        """Expire every value cached with any of ``tags``, in every worker."""
+        if not tags:
+            return
+        self.local.invalidate(tags)
+        if self.shared is not None:
+            self.shared.invalidate(tags)
+        if has_request_context():
+            memo = g.get("_cache_tags")
+            if memo:
+                for tag in tags:
+                    memo.pop(tag, None)
+
+    def clear(self):
+        """Drop every cached value in both tiers."""
+        self.local.clear()
+        if self.shared is not None:
+            self.shared.clear()
+
+    def stats(self):
+        """Return lookups per namespace with their hit ratio.
+
+        Returns:
+            Dictionary mapping namespaces to their count of each outcome in
+            ``OUTCOMES`` and ``hit_ratio``, the share of lookups that did
+            not compute.
+        """
+        with self._lock:
+            counts = {namespace: dict(outcomes) for namespace, outcomes in self.counts.items()}
+        for outcomes in counts.values():
+            lookups = sum(outcomes.values())
+            outcomes["hit_ratio"] = 1 - outcomes[MISS] / lookups if lookups else 0.0
+        return counts
+
+
+def _fresh(entry, stamp, now):
+    if entry is None:
+        return False
+    entry_stamp, expires, _ = entry
+    return entry_stamp == stamp and (expires is None or expires > now)
+
+
+def get_cache():
+    """Return the current app's cache, or None when caching is off or outside an app."""
+    if not has_app_context():
+        return None
+    return current_app.extensions.get("cache")
+
+
+def cached(versions=(), tags=(), ttl=None):
+    """Cache a function's results per arguments in the current app's cache.
+
+    Arguments make up the key through their ``repr``, so they should be
+    simple values. The undecorated function stays available as
+    ``func.uncached``.
+
+    Args:
+        versions: Data set names the result is computed from.
+        tags: Tags that ``invalidate`` can expire results by.
+        ttl: Seconds a result may be served for (``CACHE_DEFAULT_TTL`` if
+            None, 0 for no limit).
+    """
+    def decorator(func):
+        namespace = f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            cache = get_cache()
+            if cache is None:
+                return func(*args, **kwargs)
+            key = (args, tuple(sorted(kwargs.items())))
+            return cache.get(namespace, key, lambda: func(*args, **kwargs),
+                             versions=versions, tags=tags, ttl=ttl)
+
+        wrapper.uncached = func
+        wrapper.cache_namespace = namespace
+        return wrapper
+    return decorator
+
+
+def single_flight(key, compute, depends_on=()):
+    """Return ``compute()``, sharing one computation among concurrent callers.
+
+    For results too large or too varied to cache: callers in this worker
+    that ask for ``key`` while it is being computed get the same value.
+    See ``SingleFlight.run`` for ``depends_on``.
+    """
+    cache = get_cache()
+    if cache is None:
+        return compute()
+    return cache.flights.run(key, compute, depends_on)[0]
+
+
+def invalidate(*tags):
+    """Expire values cached with any of ``tags`` in the current app's cache."""
+    cache = get_cache()
+    if cache is not None:
+        cache.invalidate(*tags)
+
+
+def _forget_versions(names):
+    # A commit moved these data sets: read them again in this request, and
+    # don't hand later callers computations that started before it
+    if has_request_context():
+        memo = g.get("_cache_versions")
+        if memo:
+            for name in names:
+                memo.pop(name, None)
+    cache = get_cache()
+    if cache is not None:
+        cache.flights.forget(names)
+
+
+def _reset_request_memo():
+    g.pop("_cache_versions", None)
+    g.pop("_cache_tags", None)
+
+
+def init_cache(app):
+    """Create the app's cache from its ``CACHE_*`` settings.
+
+    Does nothing when ``CACHE_ENABLED`` is false; ``@cached`` functions
+    then compute every time.
+    """
+    if not app.config.get("CACHE_ENABLED", True):
+        return
+    shared = create_shared_tier(
+        app.config.get("CACHE_STORAGE"),
+        int(app.config.get("CACHE_SHARED_MAX_MB", 32) * 1024 * 1024),
+    )
+    app.extensions["cache"] = Cache(
+        LocalTier(app.config.get("CACHE_MAX_ENTRIES", 256)),
+        shared,
+        default_ttl=app.config.get("CACHE_DEFAULT_TTL", 0),
+        stale_grace=app.config.get("CACHE_STALE_GRACE", 0),
+        refresh_async=app.config.get("CACHE_REFRESH_ASYNC", True),
+        shared_lock=app.config.get("CACHE_SHARED_LOCK", False),
+        lock_timeout=app.config.get("CACHE_LOCK_TIMEOUT", 10),
+        app=app,
+    )
+    on_commit(_forget_versions)
+    app.before_request(_reset_request_memo)
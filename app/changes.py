@@ -0,0 +1,257 @@
+"""Append-only change log for words.
+
+Every insert, update and delete of a word appends a ``word_changes`` entry
+in the same transaction: a monotonic ``seq``, the operation and an image of
+the row (the last image, for deletes). Readers keep the highest ``seq`` they
+have applied and ask for everything after it, so syncing clients, exports
+and incremental backups cost O(changes) rather than O(table).
+
+ORM writes are logged by session hooks. Core bulk writes call
+``record_changes`` themselves; bulk loads that do not log individual rows
+(synthetic data, full restores) append a ``reset`` entry instead, which tells
+readers to re-read everything.
+
+Words are also a watched data set (``WORDS``) whose version moves with every
+change, so caches and live update streams can tell when to refresh. Core
+writers bump it with ``bump_version(WORDS)``.
+
+On Postgres, writers take the data versions write lock before logging, so
+sequence numbers become visible in commit order and a reader can never skip
+an entry that commits late. Version bumps take the same lock first, so the
+two never lock in opposite orders.
+"""
+
+import json
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import and_, delete, event, func, insert, inspect, select
+from sqlalchemy.orm import Session, aliased
+
+from app import db
+from app.data_versions import lock_writes, watch
+from app.models import Word, WordChange
+
+INSERT = "insert"
+UPDATE = "update"
+DELETE = "delete"
+RESET = "reset"
+
+# Data set name for the words table
+WORDS = "words"
+
+# Largest change log position (``seq`` is a signed 64-bit integer in both databases)
+MAX_SEQ = 2**63 - 1
+
+# Columns captured in row images
+IMAGE_COLUMNS = tuple(column.key for column in Word.__table__.columns)
+
+
+def row_image(values):
+    """Build a JSON-ready row image from a mapping of word column values."""
+    image = {}
+    for key in IMAGE_COLUMNS:
+        value = values.get(key)
+        image[key] = value.isoformat() if isinstance(value, datetime) else value
+    return image
+
+
+def _instance_image(word):
+    loaded = inspect(word).dict
+    return row_image({
+        key: loaded[key] if key in loaded else getattr(word, key)
+        for key in IMAGE_COLUMNS
+    })
+
+
+def record_changes(changes, connection=None):
+    """Append entries to the change log in the caller's transaction.
+
+    Args:
+        changes: Iterable of (op, word_id, image) tuples; ``image`` is a row
+            image dict or None.
+        connection: Connection to write on; defaults to the session's.
+    """
+    changes = list(changes)
+    if not changes:
+        return
+    if connection is None:
+        connection = db.session.connection()
+    lock_writes(connection)
+    now = datetime.now(timezone.utc)
+    connection.execute(insert(WordChange.__table__), [
+        {
+            "op": op,
+            "word_id": word_id,
+            "data": json.dumps(image, separators=(",", ":")) if image is not None else None,
+            "changed_at": now,
+        }
+        for op, word_id, image in changes
+    ])
+
+
+def record_reset(info=None, connection=None):
+    """Log that words changed wholesale; readers must re-read everything.
+
+    Args:
+        info: Optional dict stored with the entry (restores note the
+            snapshot position they restored through).
+        connection: Connection to write on; defaults to the session's.
+    """
+    record_changes([(RESET, None, info)], connection)
+
+
+def latest_change():
+    """Return the newest log entry, or None if the log is empty."""
+    return WordChange.query.order_by(WordChange.seq.desc()).first()
+
+
+def latest_seq():
+    """Return the newest sequence number in the log (0 if empty)."""
+    return db.session.execute(select(func.coalesce(func.max(WordChange.seq), 0))).scalar()
+
+
+def serialize_change(change):
+    """Serialize a log entry for API and CLI output."""
+    return {
+        "seq": change.seq,
+        "op": change.op,
+        "word_id": change.word_id,
+        "word": json.loads(change.data) if change.data and change.op != RESET else None,
+        "changed_at": change.changed_at.isoformat() if change.changed_at else None,
+    }
+
+
+def parse_cursor(value):
+    """Parse a client's change log position from a string.
+
+    Returns:
+        The position, or None unless ``value`` is a whole number from 0 to
+        ``MAX_SEQ``.
+    """
+    if value is None or not value.isdigit() or not value.isascii():
+        return None
+    cursor = int(value)
+    return cursor if cursor <= MAX_SEQ else None
+
+
+def get_changes(since=0, limit=100):
+    """Return one page of log entries after ``since``.
+
+    Args:
+        since: Last sequence number the reader has applied.
+        limit: Maximum entries to return.
+
+    Returns:
+        Dictionary with ``changes`` (serialized entries, oldest first),
+        ``cursor`` (the seq to pass as ``since`` next), ``has_more`` and
+        ``reset``. ``reset`` is true when the reader must re-read everything:
+        the page holds a reset entry, or ``since`` is ahead of the log
+        (the database was restored from an older snapshot).
+    """
+    rows = (
+        WordChange.query.filter(WordChange.seq > since)
+        .order_by(WordChange.seq)
+        .limit(limit + 1)
+        .all()
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    reset = any(row.op == RESET for row in rows)
+    if not rows and since and since > latest_seq():
+        reset = True
+
+    return {
+        "changes": [serialize_change(row) for row in rows],
+        "cursor": rows[-1].seq if rows else since,
+        "has_more": has_more,
+        "reset": reset,
+    }
+
+
+def compact_changes(before_seq=None, keep_days=None):
+    """Drop log entries no reader needs to reach the current state.
+
+    Below the cutoff, an entry is removed when a later entry exists for the
+    same word, and everything before the newest reset is removed. Readers
+    at any cursor still end up with the same rows; they only miss
+    intermediate versions. The newest entry for each word (including delete
+    tombstones) is always kept.
+
+    Args:
+        before_seq: Only compact entries with a lower seq.
+        keep_days: Only compact entries older than this many days. With
+            neither argument, the whole log is compacted.
+
+    Returns:
+        Number of entries removed.
+    """
+    table = WordChange.__table__
+    cutoff = latest_seq() + 1
+    if before_seq is not None:
+        cutoff = min(cutoff, before_seq)
+    if keep_days is not None:
+        horizon = datetime.now(timezone.utc) - timedelta(days=keep_days)
+        first_recent = db.session.execute(
+            select(func.min(table.c.seq)).where(table.c.changed_at >= horizon)
+        ).scalar()
+        if first_recent is not None:
+            cutoff = min(cutoff, first_recent)
+
+    later = aliased(WordChange)
+    superseded = db.session.execute(
+        delete(table).where(
+            table.c.seq < cutoff,
+            table.c.word_id.is_not(None),
+            select(later.seq)
+            .where(and_(later.word_id == table.c.word_id, later.seq > table.c.seq))
+            .exists(),
+        )
+    ).rowcount
+
+    last_reset = db.session.execute(
+        select(func.max(table.c.seq)).where(table.c.op == RESET, table.c.seq < cutoff)
+    ).scalar()
+    before_reset = 0
+    if last_reset is not None:
+        before_reset = db.session.execute(
+            delete(table).where(table.c.seq < last_reset)
+        ).rowcount
+
+    db.session.commit()
+    return superseded + before_reset
+
+
+def _before_flush(session, flush_context, instances):
+    deleted = [
+        (DELETE, word.id, _instance_image(word))
+        for word in session.deleted
+        if isinstance(word, Word)
+    ]
+    if deleted:
+        session.info.setdefault("word_deletes", []).extend(deleted)
+
+
+def _after_flush(session, flush_context):
+    changes = [(INSERT, word.id, _instance_image(word))
+               for word in session.new if isinstance(word, Word)]
+    changes.extend(
+        (UPDATE, word.id, _instance_image(word))
+        for word in session.dirty
+        if isinstance(word, Word) and session.is_modified(word)
+    )
+    changes.extend(session.info.pop("word_deletes", ()))
+    if changes:
+        record_changes(changes, session.connection())
+
+
+def _after_rollback(session):
+    session.info.pop("word_deletes", None)
+
+
+watch(Word, WORDS)
+
+if not event.contains(Session, "after_flush", _after_flush):
+    event.listen(Session, "before_flush", _before_flush)
+    event.listen(Session, "after_flush", _after_flush)
+    event.listen(Session, "after_rollback", _after_rollback)
@@ -0,0 +1,246 @@
+"""Flask CLI commands for maintenance and performance tooling."""
+
+import glob
+import os
+from datetime import datetime
+
+import click
+
+from app import db
+
+
+class MigrateGroup(click.Group):
+    """``flask db``, setting up Flask-Migrate (and importing Alembic) on first use.
+
+    Workers never run migrations, so only the CLI pays for the import.
+    """
+
+    def _commands(self):
+        from flask import current_app
+        from flask_migrate import Migrate
+
+        app = current_app._get_current_object()
+        if "migrate" not in app.extensions:
+            # Replaces this group in app.cli with Flask-Migrate's own
+            Migrate(app, db)
+        return app.cli.commands["db"]
+
+    def list_commands(self, ctx):
+        return self._commands().list_commands(ctx)
+
+    def get_command(self, ctx, name):
+        return self._commands().get_command(ctx, name)
+
+
+def register_commands(app):
+    """Register the app's custom ``flask`` CLI commands."""
+    app.cli.add_command(MigrateGroup("db", help="Perform database migrations."))
+    app.cli.add_command(generate_data_command)
+    app.cli.add_command(slow_queries_command)
+    app.cli.add_command(backup_command)
+    app.cli.add_command(restore_command)
+    app.cli.add_command(changes_command)
+    app.cli.add_command(sqlite_maintenance_command)
+
+
+@click.command("generate-data")
+@click.option("--words", default=1000, show_default=True, help="Total words to generate.")
+@click.option("--children", default=1, show_default=True, help="Independent vocabularies to simulate.")
+@click.option("--seed", default=42, show_default=True, help="Random seed for reproducible output.")
+@click.option("--birthdate", default=None, help="First child's birthdate (YYYY-MM-DD).")
+@click.option("--months", default=36, show_default=True, help="Age in months the growth curve runs to.")
+@click.option("--batch-size", default=50000, show_default=True, help="Rows per bulk insert.")
+@click.option("--reset", is_flag=True, help="Delete existing words first.")
+def generate_data_command(words, children, seed, birthdate, months, batch_size, reset):
+    """Bulk insert a reproducible synthetic word dataset."""
+    from app.datagen import generate_dataset
+    from app.init_db import seed_categories, seed_users
+
+    if birthdate:
+        birthdate = datetime.strptime(birthdate, "%Y-%m-%d").date()
+
+    db.create_all()
+    seed_users()
+    seed_categories()
+
+    try:
+        result = generate_dataset(
+            words=words,
+            children=children,
+            seed=seed,
+            birthdate=birthdate,
+            months=months,
+            batch_size=batch_size,
+            reset=reset,
+        )
+    except ValueError as exc:
+        raise click.ClickException(str(exc))
+
+    rate = result["words"] / result["seconds"] if result["seconds"] else 0
+    click.echo(
+        f"Inserted {result['words']} words in {result['seconds']:.2f}s "
+        f"({rate:,.0f} rows/s)"
+    )
+
+
+@click.command("slow-queries")
+@click.option("--limit", default=10, show_default=True, help="Number of shapes to show.")
+@click.option(
+    "--sort",
+    type=click.Choice(["total", "max", "calls", "avg"]),
+    default="total",
+    show_default=True,
+    help="Rank by total time, worst run, call count or average.",
+)
+@click.option("--plans", is_flag=True, help="Show captured query plans.")
+@click.option("--reset", is_flag=True, help="Clear the slow query log.")
+def slow_queries_command(limit, sort, plans, reset):
+    """Summarize the slowest recorded statement shapes."""
+    from app.models import SlowQuery
+    from app.slow_queries import summarize_slow_queries
+
+    if reset:
+        deleted = SlowQuery.query.delete()
+        db.session.commit()
+        click.echo(f"Cleared {deleted} slow query shapes.")
+        return
+
+    rows = summarize_slow_queries(limit=limit, sort=sort)
+    if not rows:
+        click.echo("No slow queries recorded.")
+        return
+
+    click.echo(f"{'calls':>7} {'total ms':>10} {'avg ms':>8} {'max ms':>8}  route")
+    for row in rows:
+        click.echo(
+            f"{row.calls:>7} {row.total_ms:>10.1f} {row.total_ms / row.calls:>8.1f} "
+            f"{row.max_ms:>8.1f}  {row.route or '-'}"
+        )
+        click.echo(f"        {row.statement[:160]}")
+        click.echo(f"        params: {row.param_shape}")
+        if plans and row.plan:
+            for line in row.plan.splitlines():
+                click.echo(f"          | {line}")
+
+
+@click.command("backup")
+@click.option("--output", default=None, help="Snapshot file (default: backups/emily_words_<timestamp>.jsonl.gz).")
+@click.option("--keep", default=10, show_default=True, help="Snapshots to keep in the backups directory (0 keeps all).")
+@click.option("--since", type=int, default=None, help="Only write changes after this change log position.")
+def backup_command(output, keep, since):
+    """Write a compressed, checksummed snapshot of the database."""
+    from app.backup import write_snapshot
+
+    pruned_dir = None
+    if output is None:
+        pruned_dir = "backups"
+        os.makedirs(pruned_dir, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        prefix = "emily_words" if since is None else "emily_changes"
+        output = os.path.join(pruned_dir, f"{prefix}_{timestamp}.jsonl.gz")
+
+    try:
+        result = write_snapshot(output, since=since)
+    except ValueError as exc:
+        raise click.ClickException(str(exc))
+    rows = ", ".join(f"{name}={count}" for name, count in result["tables"].items())
+    click.echo(
+        f"Wrote {result['path']} ({result['bytes'] / 1024:,.1f} KiB, {rows}) "
+        f"through change {result['through']} in {result['seconds']:.2f}s"
+    )
+
+    if pruned_dir and keep and since is None:
+        snapshots = sorted(glob.glob(os.path.join(pruned_dir, "emily_words_*.jsonl.gz")))
+        for old in snapshots[:-keep]:
+            os.remove(old)
+
+
+@click.command("restore")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--verify-only", is_flag=True, help="Check the snapshot without restoring it.")
+@click.option("--batch-size", default=5000, show_default=True, help="Rows per bulk insert.")
+@click.option("--yes", is_flag=True, help="Do not ask for confirmation.")
+def restore_command(path, verify_only, batch_size, yes):
+    """Replace the database contents with a snapshot."""
+    from app.backup import restore_snapshot, verify_snapshot
+
+    try:
+        header, counts = verify_snapshot(path)
+    except ValueError as exc:
+        raise click.ClickException(str(exc))
+
+    rows = ", ".join(f"{name}={count}" for name, count in counts.items())
+    click.echo(f"Snapshot from {header['created_at']} ({header['dialect']}): {rows}")
+    if verify_only:
+        click.echo("Checksum OK.")
+        return
+
+    if not yes:
+        if header.get("since") is not None:
+            prompt = (
+                f"This applies changes {header['since'] + 1}-{header['through']} "
+                "to the words table. Continue?"
+            )
+        else:
+            prompt = f"This replaces all rows in {', '.join(counts)}. Continue?"
+        click.confirm(prompt, abort=True)
+
+    try:
+        result = restore_snapshot(path, batch_size=batch_size)
+    except ValueError as exc:
+        raise click.ClickException(str(exc))
+
+    total = sum(result["tables"].values())
+    click.echo(f"Restored {total} rows in {result['seconds']:.2f}s")
+
+
+@click.command("changes")
+@click.option("--since", default=0, show_default=True, help="Last change log position already seen.")
+@click.option("--limit", default=100, show_default=True, help="Entries per page.")
+@click.option("--all", "all_pages", is_flag=True, help="Follow the cursor until the log is exhausted.")
+@click.option("--compact", is_flag=True, help="Drop superseded entries instead of listing.")
+@click.option("--keep-days", type=int, default=None, help="With --compact, keep entries newer than this.")
+@click.option("--before-seq", type=int, default=None, help="With --compact, only compact entries below this position.")
+def changes_command(since, limit, all_pages, compact, keep_days, before_seq):
+    """Print the word change log as JSON lines, or compact it."""
+    import json
+
+    from app.changes import compact_changes, get_changes
+
+    if compact:
+        removed = compact_changes(before_seq=before_seq, keep_days=keep_days)
+        click.echo(f"Removed {removed} superseded change log entries.")
+        return
+
+    while True:
+        page = get_changes(since=since, limit=limit)
+        if page["reset"]:
+            click.echo("# reset: words were replaced wholesale; re-read everything", err=True)
+        for change in page["changes"]:
+            click.echo(json.dumps(change))
+        since = page["cursor"]
+        if not (all_pages and page["has_more"]):
+            break
+
+    click.echo(f"# cursor: {since} (more: {'yes' if page['has_more'] else 'no'})", err=True)
+
+
+@click.command("sqlite-maintenance")
+@click.option("--vacuum", is_flag=True, help="Rebuild the file first (enables incremental vacuum on old databases).")
+def sqlite_maintenance_command(vacuum):
+    """Checkpoint, optimize and incrementally vacuum the SQLite database now."""
+    from flask import current_app
+
+    maintenance = current_app.extensions.get("sqlite_maintenance")
+    if maintenance is None:
+        raise click.ClickException("Not a tuned SQLite database file (see SQLITE_TUNING).")
+
+    if vacuum:
+        maintenance.vacuum()
+        click.echo("Rebuilt the database file.")
+    result = maintenance.run(optimize=True)
+    click.echo(
+        f"Checkpointed {result['checkpointed']} of {result['wal_frames']} WAL frames"
+        f"{' (busy)' if result['busy'] else ''}; "
+        f"free pages {result['free_pages']} -> {result['free_pages_after']}."
+    )
@@ -0,0 +1,157 @@
+"""Version stamps for cached data.
+
+Each named data set has a row in ``data_versions`` whose version is bumped in
+the same transaction as any ORM change to the models watched for it. Caches
+remember the version they were built from and rebuild when it moves, which
+also catches changes made by other workers. Callbacks registered with
+``on_commit`` hear about changes committed in this process, so local caches
+can drop stale data without waiting for their next version check.
+``app.cache`` keeps values computed from data sets until their versions
+move.
+
+Core bulk writes bypass the ORM and must call ``bump_version`` themselves.
+
+On Postgres, every bump first takes a transaction-level advisory lock
+(``WRITE_LOCK``), which the change log in ``app.changes`` takes too. Writers
+therefore always lock in one order, that lock before any ``data_versions``
+row, and cannot deadlock on each other.
+"""
+
+from itertools import chain
+
+from sqlalchemy import event, select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import DataVersion
+
+_UPSERT_DIALECTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+# Advisory lock key serializing writers to watched data on Postgres
+WRITE_LOCK = 0x776F7264
+
+# Model class -> data set name
+_watched = {}
+
+# Callables taking the set of data set names changed by a commit
+_commit_callbacks = []
+
+
+def watch(model, name):
+    """Bump data set ``name`` whenever instances of ``model`` change."""
+    _watched[model] = name
+
+
+def on_commit(callback):
+    """Call ``callback(names)`` after a commit in this process changes data sets."""
+    if callback not in _commit_callbacks:
+        _commit_callbacks.append(callback)
+
+
+def get_version(name):
+    """Return the current version of a data set (0 if never bumped)."""
+    version = db.session.execute(
+        select(DataVersion.version).where(DataVersion.name == name)
+    ).scalar()
+    return version or 0
+
+
+def get_versions(names):
+    """Return the current versions of several data sets from one query.
+
+    Returns:
+        Dictionary mapping each name to its version (0 if never bumped).
+    """
+    rows = db.session.execute(
+        select(DataVersion.name, DataVersion.version).where(DataVersion.name.in_(names))
+    )
+    versions = dict.fromkeys(names, 0)
+    versions.update((name, version or 0) for name, version in rows)
+    return versions
+
+
+def watched_names():
+    """Return the names of all data sets with watched models."""
+    return set(_watched.values())
+
+
+def lock_writes(connection):
+    """Take the write lock for the rest of the transaction (Postgres only).
+
+    Call it before touching any ``data_versions`` row. Taking it again in
+    the same transaction is free.
+    """
+    if connection.dialect.name == "postgresql":
+        # A lock, not a data query: kept out of request query budgets
+        connection.execute(
+            text("SELECT pg_advisory_xact_lock(:key)"),
+            {"key": WRITE_LOCK},
+            execution_options={"query_budget": False},
+        )
+
+
+def bump_version(name, connection=None):
+    """Increment a data set's version.
+
+    Args:
+        name: Data set name.
+        connection: Connection to write on. Defaults to the session's, so
+            the bump commits or rolls back with the caller's transaction and
+            ``on_commit`` callbacks hear about it.
+    """
+    if connection is None:
+        connection = db.session.connection()
+        db.session.info.setdefault("changed_data_sets", set()).add(name)
+    lock_writes(connection)
+    table = DataVersion.__table__
+    upsert = _UPSERT_DIALECTS.get(connection.dialect.name)
+    if upsert is not None:
+        statement = upsert(table).values(name=name, version=1)
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=[table.c.name], set_={"version": table.c.version + 1}
+        ))
+        return
+    result = connection.execute(
+        update(table).where(table.c.name == name).values(version=table.c.version + 1)
+    )
+    if result.rowcount == 0:
+        connection.execute(table.insert().values(name=name, version=1))
+
+
+def _after_flush(session, flush_context):
+    if not _watched:
+        return
+    names = set()
+    for obj in chain(session.new, session.deleted, session.dirty):
+        name = _watched.get(type(obj))
+        if name is not None and name not in names:
+            if obj in session.dirty and not session.is_modified(obj):
+                continue
+            names.add(name)
+    if not names:
+        return
+    connection = session.connection()
+    for name in sorted(names):
+        bump_version(name, connection)
+    session.info.setdefault("changed_data_sets", set()).update(names)
+
+
+def _after_commit(session):
+    names = session.info.pop("changed_data_sets", None)
+    if names:
+        for callback in _commit_callbacks:
+            callback(names)
+
+
+def _after_rollback(session):
+    session.info.pop("changed_data_sets", None)
+
+
+if not event.contains(Session, "after_flush", _after_flush):
+    event.listen(Session, "after_flush", _after_flush)
+    event.listen(Session, "after_commit", _after_commit)
+    event.listen(Session, "after_rollback", _after_rollback)
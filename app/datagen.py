@@ -0,0 +1,332 @@
+"""Synthetic vocabulary generator for load and scale testing.
+
+Builds reproducible, realistic-looking word histories: vocabulary grows along
+a logistic curve (slow first words, a burst around 18-24 months, then a
+plateau), words are spread across the seeded categories and both parents,
+and everything is derived from a single random seed.
+"""
+
+import csv
+import functools
+import io
+import math
+import random
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+
+from sqlalchemy import func, insert, inspect
+
+from app import db
+from app.changes import WORDS, record_reset
+from app.data_versions import bump_version
+from app.models import Category, User, Word
+
+# Real first words come first so small datasets look like a real child's list
+FIRST_WORDS = [
+    "mama", "dada", "ball", "dog", "hi", "bye", "no", "uh-oh", "baby", "cat",
+    "milk", "more", "up", "duck", "moo", "woof", "book", "shoe", "car", "banana",
+    "bath", "nana", "yes", "all done", "apple", "bird", "cookie", "juice", "hat",
+    "eat", "go", "night night", "baa", "quack", "meow", "water", "cup", "nose",
+    "eyes", "mine", "down", "open", "hot", "bear", "truck", "fish", "sock",
+]
+
+# Syllables used to build unique pseudo-words once the real list runs out
+SYLLABLES = [
+    "ba", "be", "bi", "bo", "bu", "da", "de", "di", "do", "du",
+    "ga", "ge", "gi", "go", "gu", "ka", "ke", "ki", "ko", "ku",
+    "la", "le", "li", "lo", "lu", "ma", "me", "mi", "mo", "mu",
+    "na", "ne", "ni", "no", "nu", "pa", "pe", "pi", "po", "pu",
+    "ta", "te", "ti", "to", "tu", "wa", "we", "wi", "wo", "wu",
+]
+
+# Relative weights for each seeded category name; None means uncategorized
+CATEGORY_WEIGHTS = {
+    "Noun": 45,
+    "Verb": 15,
+    "Animal Sound": 8,
+    "Person": 10,
+    "Other": 10,
+    None: 12,
+}
+
+# Share of words logged by each parent, in seeded username order
+USER_WEIGHTS = {"nick": 55, "wife": 45}
+
+# Logistic growth curve parameters, in months of age
+CURVE_START_MONTHS = 10
+CURVE_MIDPOINT_MONTHS = 22
+CURVE_STEEPNESS = 0.35
+
+DAYS_PER_MONTH = 30.4375
+
+
+def synthetic_word(index):
+    """Return the unique word text for a position in the generated vocabulary.
+
+    The first entries are real first words; later ones are pseudo-words built
+    from syllables using bijective base-N numbering, so every index maps to a
+    distinct (case-insensitive) word.
+
+    Args:
+        index: Zero-based position in the vocabulary.
+
+    Returns:
+        Word text string.
+    """
+    if index < len(FIRST_WORDS):
+        return FIRST_WORDS[index]
+
+    base = len(SYLLABLES)
+    # Skip the one- to three-syllable range so pseudo-words never collide with
+    # real words such as "mama" or "banana"
+    n = index - len(FIRST_WORDS) + base + base ** 2 + base ** 3 + 1
+    parts = []
+    while n > 0:
+        n, remainder = divmod(n - 1, base)
+        parts.append(SYLLABLES[remainder])
+    return "".join(reversed(parts))
+
+
+def _logistic_cdf(months):
+    return 1.0 / (1.0 + math.exp(-CURVE_STEEPNESS * (months - CURVE_MIDPOINT_MONTHS)))
+
+
+def _sample_ages(rng, count, months):
+    """Sample sorted ages (in months) following the logistic growth curve."""
+    low = _logistic_cdf(CURVE_START_MONTHS)
+    high = _logistic_cdf(months)
+    ages = []
+    for _ in range(count):
+        u = rng.uniform(low, high)
+        ages.append(CURVE_MIDPOINT_MONTHS + math.log(u / (1.0 - u)) / CURVE_STEEPNESS)
+    ages.sort()
+    return ages
+
+
+@functools.lru_cache(maxsize=1)
+def _times_of_day():
+    """Return the time-of-day text for every second of a day, built once."""
+    return tuple(
+        f"{h:02d}:{m:02d}:{s:02d}.000000"
+        for h in range(24) for m in range(60) for s in range(60)
+    )
+
+
+def _timestamp_formatter(epoch):
+    """Return a fast formatter from seconds-since-``epoch`` to timestamp text.
+
+    Formatting a million datetimes individually dominates generation time, so
+    day and time-of-day strings are cached and concatenated instead. The
+    output matches SQLAlchemy's SQLite storage format and is accepted by
+    Postgres ``COPY``.
+    """
+    days = {}
+    times = _times_of_day()
+
+    def format_timestamp(seconds):
+        day, second = divmod(int(seconds), 86400)
+        day_text = days.get(day)
+        if day_text is None:
+            day_text = days[day] = (epoch + timedelta(days=day)).strftime("%Y-%m-%d ")
+        return day_text + times[second]
+
+    return format_timestamp
+
+
+def iter_word_rows(
+    user_ids,
+    category_ids,
+    words=1000,
+    children=1,
+    seed=42,
+    birthdate=None,
+    months=36,
+):
+    """Yield insert-ready word rows for a synthetic dataset.
+
+    Each child gets an equal share of the vocabulary and its own birthdate,
+    staggered a year apart. Rows for a child are produced in date order, so
+    ids grow with ``date_added`` just as they do in real use.
+
+    Args:
+        user_ids: Mapping of username to user id (``nick`` and ``wife``).
+        category_ids: Mapping of category name to category id.
+        words: Total number of words to generate.
+        children: Number of independent vocabularies to simulate.
+        seed: Random seed; the same seed always yields the same rows.
+        birthdate: Birthdate of the first child. Defaults to ``months`` ago.
+        months: Age in months the growth curve runs up to.
+
+    Yields:
+        Tuples of (word, date_added, user_id, category_id), with
+        ``date_added`` as ``YYYY-MM-DD HH:MM:SS.ffffff`` text.
+    """
+    rng = random.Random(seed)
+    if birthdate is None:
+        birthdate = date.today() - timedelta(days=round(months * DAYS_PER_MONTH))
+
+    user_options = [user_ids[name] for name in USER_WEIGHTS if name in user_ids]
+    user_weights = [USER_WEIGHTS[name] for name in USER_WEIGHTS if name in user_ids]
+    if not user_options:
+        user_options, user_weights = list(user_ids.values()), None
+
+    category_options = []
+    category_weights = []
+    for name, weight in CATEGORY_WEIGHTS.items():
+        if name is None or name in category_ids:
+            category_options.append(category_ids.get(name))
+            category_weights.append(weight)
+
+    epoch = datetime.combine(birthdate, dt_time()) - timedelta(days=365 * (children - 1))
+    format_timestamp = _timestamp_formatter(epoch)
+    seconds_per_month = DAYS_PER_MONTH * 86400
+
+    index = 0
+    for child in range(children):
+        count = words // children + (1 if child < words % children else 0)
+        # Older siblings were born a year earlier each
+        offset = 365 * 86400 * (children - 1 - child)
+
+        ages = _sample_ages(rng, count, months)
+        users = rng.choices(user_options, weights=user_weights, k=count)
+        categories = rng.choices(category_options, weights=category_weights, k=count)
+
+        for age, user_id, category_id in zip(ages, users, categories):
+            added = format_timestamp(offset + age * seconds_per_month)
+            yield (synthetic_word(index), added, user_id, category_id)
+            index += 1
+
+
+def _bulk_insert_words(rows, batch_size):
+    """Insert word tuples in batches using the fastest path for the dialect.
+
+    SQLite gets raw DBAPI ``executemany``; Postgres gets ``COPY FROM STDIN``;
+    anything else falls back to Core ``executemany``. ``created_at`` and
+    ``updated_at`` are set to ``date_added``.
+
+    Returns:
+        Number of rows inserted.
+    """
+    connection = db.session.connection()
+    dialect = connection.dialect.name
+    cursor = connection.connection.cursor()
+    inserted = 0
+
+    for batch in _batched(rows, batch_size):
+        if dialect == "sqlite":
+            cursor.executemany(
+                "INSERT INTO words (word, date_added, user_id, category_id, "
+                "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                [(w, d, u, c, d, d) for w, d, u, c in batch],
+            )
+        elif dialect == "postgresql":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerows((w, d, u, c, d, d) for w, d, u, c in batch)
+            buffer.seek(0)
+            cursor.copy_expert(
+                "COPY words (word, date_added, user_id, category_id, "
+                "created_at, updated_at) FROM STDIN WITH (FORMAT csv)",
+                buffer,
+            )
+        else:
+            connection.execute(insert(Word.__table__), [
+                {
+                    "word": w,
+                    "date_added": datetime.fromisoformat(d),
+                    "user_id": u,
+                    "category_id": c,
+                    "created_at": datetime.fromisoformat(d),
+                    "updated_at": datetime.fromisoformat(d),
+                }
+                for w, d, u, c in batch
+            ])
+        inserted += len(batch)
+
+    return inserted
+
+
+def _batched(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def generate_dataset(
+    words=1000,
+    children=1,
+    seed=42,
+    birthdate=None,
+    months=36,
+    batch_size=50000,
+    reset=False,
+):
+    """Bulk insert a synthetic dataset into the words table.
+
+    Users and categories must already be seeded. Rows are written straight
+    through the DBAPI in large batches, bypassing the ORM unit of work, so
+    the change log gets a single ``reset`` entry instead of one per row.
+    The words table's secondary indexes are dropped for the load and built
+    once afterwards.
+
+    Args:
+        words: Total number of words to generate.
+        children: Number of independent vocabularies to simulate.
+        seed: Random seed for reproducible output.
+        birthdate: Birthdate of the first child (date). Defaults to ``months`` ago.
+        months: Age in months the growth curve runs up to.
+        batch_size: Number of rows per insert batch.
+        reset: Delete existing words first instead of refusing to run.
+
+    Returns:
+        Dictionary with the number of rows inserted and elapsed seconds.
+
+    Raises:
+        ValueError: If no users are seeded, or words already exist and
+            ``reset`` is False.
+    """
+    user_ids = dict(db.session.query(User.username, User.id).all())
+    category_ids = dict(db.session.query(Category.name, Category.id).all())
+    if not user_ids:
+        raise ValueError("No users found. Seed users before generating data.")
+
+    existing = db.session.query(func.count(Word.id)).scalar()
+    if existing and not reset:
+        raise ValueError(
+            f"Database already has {existing} words; pass reset=True to replace them."
+        )
+
+    started = time.perf_counter()
+    if existing:
+        db.session.execute(Word.__table__.delete())
+
+    rows = iter_word_rows(
+        user_ids,
+        category_ids,
+        words=words,
+        children=children,
+        seed=seed,
+        birthdate=birthdate,
+        months=months,
+    )
+    # Build secondary indexes once, after loading, instead of per row (only
+    # those the database has: an older schema is left as it is). The builds
+    # are slow by design, so keep them out of the slow query log.
+    connection = db.session.connection().execution_options(slow_query_log=False)
+    present = {index["name"] for index in inspect(connection).get_indexes(Word.__tablename__)}
+    indexes = [index for index in Word.__table__.indexes if index.name in present]
+    for index in indexes:
+        index.drop(connection)
+    inserted = _bulk_insert_words(rows, batch_size)
+    for index in indexes:
+        index.create(connection)
+    record_reset()
+    bump_version(WORDS)
+
+    db.session.commit()
+    return {"words": inserted, "seconds": time.perf_counter() - started}
@@ -2,19 +2,20 @@
 
 import csv
 import io
-from datetime import date
+import json
+from datetime import date, datetime
 
 
-def generate_csv_content(words):
-    """Generate CSV string from Word objects with UTF-8 BOM for Excel compatibility.
+def write_csv(output, words, reference=None):
+    """Write the word export CSV, with a UTF-8 BOM for Excel, to a text stream.
 
     Args:
-        words: List of Word model instances to export.
-
-    Returns:
-        String containing CSV data with headers and all word rows.
+        output: Writable text stream.
+        words: Iterable of Word model instances (or rows with the same
+            attributes) to export.
+        reference: Optional ReferenceData snapshot to take user and category
+            names from instead of loading each word's relationships.
     """
-    output = io.StringIO()
     # Add UTF-8 BOM for Excel compatibility
     output.write('\ufeff')
 
@@ -24,20 +25,82 @@ def generate_csv_content(words):
 
     # Data rows
     for word in words:
+        if reference is not None:
+            user_name = reference.user_names.get(word.user_id, '')
+            category_name = reference.category_names.get(word.category_id, '')
+        else:
+            user_name = word.user.display_name if word.user else ''
+            category_name = word.category.name if word.category else ''
         writer.writerow([
             word.word,
             word.date_added.strftime('%Y-%m-%d') if word.date_added else '',
-            word.user.display_name if word.user else '',
-            word.category.name if word.category else ''
+            user_name,
+            category_name
         ])
 
+
+def generate_csv_content(words, reference=None):
+    """Generate CSV string from Word objects with UTF-8 BOM for Excel compatibility.
+
+    Args:
+        words: List of Word model instances to export.
+        reference: Optional ReferenceData snapshot to take user and category
+            names from instead of loading each word's relationships.
+
+    Returns:
+        String containing CSV data with headers and all word rows.
+    """
+    output = io.StringIO()
+    write_csv(output, words, reference)
     return output.getvalue()
 
 
-def get_export_filename():
+def generate_changes_csv(changes, reference):
+    """Generate an incremental CSV from change log entries.
+
+    Each row is one change, oldest first, with the word as it was after the
+    change (or, for deletes, just before it). A ``reset`` row means every
+    word was replaced and a full export should be taken instead.
+
+    Args:
+        changes: List of WordChange model instances.
+        reference: ReferenceData snapshot for user and category names.
+
+    Returns:
+        String containing CSV data with headers and one row per change.
+    """
+    output = io.StringIO()
+    output.write('\ufeff')
+
+    writer = csv.writer(output, quoting=csv.QUOTE_MINIMAL)
+    writer.writerow(['Seq', 'Change', 'Word', 'Date Added', 'Added By', 'Category'])
+
+    for change in changes:
+        image = json.loads(change.data) if change.data and change.op != 'reset' else {}
+        date_added = image.get('date_added')
+        writer.writerow([
+            change.seq,
+            change.op,
+            image.get('word', ''),
+            datetime.fromisoformat(date_added).strftime('%Y-%m-%d') if date_added else '',
+            reference.user_names.get(image.get('user_id'), ''),
+            reference.category_names.get(image.get('category_id'), ''),
+        ])
+
+    return output.getvalue()
+
+
+def get_export_filename(since=None):
     """Generate filename with current date.
 
+    Args:
+        since: Change log position for incremental exports.
+
     Returns:
-        String filename in format: emily_words_YYYY-MM-DD.csv
+        String filename in format: emily_words_YYYY-MM-DD.csv, or
+        emily_changes_since_N_YYYY-MM-DD.csv for incremental exports.
     """
-    return f"emily_words_{date.today().strftime('%Y-%m-%d')}.csv"
+    today = date.today().strftime('%Y-%m-%d')
+    if since is not None:
+        return f"emily_changes_since_{since}_{today}.csv"
+    return f"emily_words_{today}.csv"
@@ -0,0 +1,193 @@
+"""Group-commit write path for word additions.
+
+With ``GROUP_COMMIT_ENABLED``, ``add_word`` hands its insert to a committer
+thread instead of committing itself. The committer gathers the inserts that
+arrive within a short window (``GROUP_COMMIT_WINDOW_MS``), checks them for
+duplicates with one query, writes them in a single transaction and then
+resolves each request's future with its own result. A burst of concurrent
+additions costs one transaction (and one fsync) instead of one each.
+
+This only helps when one process serves concurrent requests (threaded
+gunicorn workers); with sync workers each batch holds a single insert.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from sqlalchemy import func
+from sqlalchemy.exc import SQLAlchemyError
+
+from app import db
+from app.models import Word
+
+
+class _PendingWord:
+    """One queued insert and the future its request is waiting on."""
+
+    __slots__ = ("word", "user_id", "category_id", "future")
+
+    def __init__(self, word, user_id, category_id):
+        self.word = word
+        self.user_id = user_id
+        self.category_id = category_id
+        self.future = Future()
+
+
+class GroupCommitter:
+    """Batches concurrent word inserts into shared transactions."""
+
+    def __init__(self, app, window_ms=5, max_batch=100, timeout=5.0):
+        self.app = app
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self.batches = 0
+        self.items = 0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def add_word(self, word_text, user_id, category_id=None):
+        """Queue a word insert and wait for the batch it lands in to commit.
+
+        Args:
+            word_text: The (stripped) word to add.
+            user_id: ID of the user adding it.
+            category_id: Optional category ID.
+
+        Returns:
+            Dictionary with ``status`` (``added`` or ``duplicate``), ``word``
+            (the stored text; for duplicates, the existing word) and ``id``.
+
+        Raises:
+            concurrent.futures.TimeoutError: If the insert was still queued
+                after ``timeout`` seconds. It is withdrawn and never written,
+                so the caller can safely retry.
+            SQLAlchemyError: If this insert could not be written.
+        """
+        pending = _PendingWord(word_text, user_id, category_id)
+        self._queue.put(pending)
+        self._ensure_thread()
+        try:
+            return pending.future.result(self.timeout)
+        except FutureTimeoutError:
+            if pending.future.cancel():
+                raise
+        # The committer took the insert just in time: its batch is being
+        # written, so report how that ends rather than a failure
+        return pending.future.result(self.timeout)
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="group-commit", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            # Skip inserts whose requests timed out and withdrew them
+            batch = [pending for pending in self._collect()
+                     if pending.future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                with self.app.app_context():
+                    self._commit_batch(batch)
+            except Exception as exc:
+                # Never leave a request waiting on a batch that blew up
+                for pending in batch:
+                    if not pending.future.done():
+                        pending.future.set_exception(exc)
+
+    def _collect(self):
+        """Block for the first insert, then gather more until the window closes."""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _commit_batch(self, batch):
+        """Write a batch in one transaction and resolve its futures.
+
+        If the transaction fails, the batch is retried one insert at a time
+        so a single bad row only fails its own request.
+        """
+        try:
+            results = self._insert(batch)
+            db.session.commit()
+        except SQLAlchemyError as exc:
+            db.session.rollback()
+            if len(batch) == 1:
+                batch[0].future.set_exception(exc)
+                return
+            for pending in batch:
+                self._commit_batch([pending])
+            return
+
+        self.batches += 1
+        self.items += len(batch)
+        for pending, result in zip(batch, results):
+            pending.future.set_result(result)
+
+    def _insert(self, batch):
+        """Check a batch for duplicates with one query and add the new words."""
+        lowered = {pending.word.lower() for pending in batch}
+        existing = {
+            word.lower(): (word, word_id)
+            for word_id, word in db.session.query(Word.id, Word.word)
+            .filter(func.lower(Word.word).in_(lowered))
+        }
+
+        results = []
+        added = []
+        for pending in batch:
+            key = pending.word.lower()
+            if key in existing:
+                word, word_id = existing[key]
+                results.append({"status": "duplicate", "word": word, "id": word_id})
+                continue
+            word = Word(
+                word=pending.word,
+                user_id=pending.user_id,
+                category_id=pending.category_id,
+            )
+            db.session.add(word)
+            added.append(word)
+            # Later inserts of the same word in this batch are duplicates of it
+            existing[key] = (pending.word, None)
+            results.append({"status": "added", "word": pending.word, "id": None})
+
+        # Read ids before commit expires the instances
+        db.session.flush()
+        ids = {word.word.lower(): word.id for word in added}
+        for result in results:
+            if result["id"] is None:
+                result["id"] = ids[result["word"].lower()]
+        return results
+
+
+def get_group_committer(app):
+    """Return the app's group committer, creating it on first use."""
+    committer = app.extensions.get("group_committer")
+    if committer is None:
+        committer = app.extensions.setdefault("group_committer", GroupCommitter(
+            app,
+            window_ms=app.config.get("GROUP_COMMIT_WINDOW_MS", 5),
+            max_batch=app.config.get("GROUP_COMMIT_MAX_BATCH", 100),
+            timeout=app.config.get("GROUP_COMMIT_TIMEOUT", 5.0),
+        ))
+    return committer
@@ -0,0 +1,192 @@
+"""Cumulative vocabulary growth series for charts.
+
+Word counts are read once per day bucket (one ``GROUP BY`` over the date
+part of ``date_added``) and rolled up into day, week or month points with a
+running total. Long histories can be downsampled to a target point count
+with largest-triangle-three-buckets (LTTB), which keeps the curve's visible
+shape, and the CDC milestone ranges from ``app/milestones.py`` come along as
+bands. Series are cached per resolution and point count until the ``words``
+data version moves, so chart loads stay constant-time.
+"""
+
+import calendar
+from datetime import date, timedelta
+
+from flask import current_app
+from sqlalchemy import func, select
+
+from app import db
+from app.cache import cached
+from app.changes import WORDS
+from app.milestones import MILESTONES
+from app.models import Word
+from app.utils import parse_birthdate
+
+RESOLUTIONS = ("day", "week", "month")
+
+
+def load_daily_counts():
+    """Return (date, words added) pairs for every day with words, oldest first."""
+    day = func.date(Word.date_added)
+    rows = db.session.execute(
+        select(day.label("day"), func.count().label("count"))
+        .group_by(day)
+        .order_by(day)
+    )
+    return [
+        (row.day if isinstance(row.day, date) else date.fromisoformat(str(row.day)), row.count)
+        for row in rows
+    ]
+
+
+def bucket_start(day, resolution):
+    """Return the first day of the bucket ``day`` falls in."""
+    if resolution == "week":
+        return day - timedelta(days=day.weekday())
+    if resolution == "month":
+        return day.replace(day=1)
+    return day
+
+
+def cumulative_series(daily_counts, resolution="day"):
+    """Roll daily counts up into buckets with a running total.
+
+    Args:
+        daily_counts: (date, count) pairs, oldest first.
+        resolution: ``day``, ``week`` (starting Monday) or ``month``.
+
+    Returns:
+        List of dictionaries with ``date`` (bucket start), ``added`` and
+        ``total``, one per bucket that has words.
+    """
+    series = []
+    total = 0
+    for day, count in daily_counts:
+        start = bucket_start(day, resolution)
+        total += count
+        if series and series[-1]["date"] == start:
+            series[-1]["added"] += count
+            series[-1]["total"] = total
+        else:
+            series.append({"date": start, "added": count, "total": total})
+    return series
+
+
+def lttb(points, threshold, x=lambda p: p[0], y=lambda p: p[1]):
+    """Downsample points with largest-triangle-three-buckets.
+
+    The first and last points are always kept. The rest are split into
+    ``threshold - 2`` buckets, and from each bucket the point forming the
+    largest triangle with the previously kept point and the next bucket's
+    average is kept.
+
+    Args:
+        points: Sequence of points ordered by x.
+        threshold: Number of points to keep.
+        x: Function returning a point's x value (a number).
+        y: Function returning a point's y value (a number).
+
+    Returns:
+        List of the kept points, in order.
+    """
+    if threshold >= len(points) or threshold < 3:
+        return list(points)
+
+    kept = [points[0]]
+    size = (len(points) - 2) / (threshold - 2)
+    previous = 0
+    for bucket in range(threshold - 2):
+        start = int(bucket * size) + 1
+        end = int((bucket + 1) * size) + 1
+        next_end = min(int((bucket + 2) * size) + 1, len(points))
+        following = points[end:next_end] or [points[-1]]
+        avg_x = sum(x(p) for p in following) / len(following)
+        avg_y = sum(y(p) for p in following) / len(following)
+
+        ax, ay = x(points[previous]), y(points[previous])
+        best, best_area = start, -1.0
+        for index in range(start, end):
+            area = abs(
+                (ax - avg_x) * (y(points[index]) - ay)
+                - (ax - x(points[index])) * (avg_y - ay)
+            )
+            if area > best_area:
+                best, best_area = index, area
+        kept.append(points[best])
+        previous = best
+    kept.append(points[-1])
+    return kept
+
+
+def add_months(day, months):
+    """Return ``day`` moved forward by whole months, clamped to month end."""
+    month_index = day.month - 1 + months
+    year, month = day.year + month_index // 12, month_index % 12 + 1
+    return day.replace(year=year, month=month, day=min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def milestone_bands(birthdate=None):
+    """Return the CDC vocabulary ranges as chart bands.
+
+    Args:
+        birthdate: Child's birthdate; when given, each band also gets the
+            calendar date the child reaches the milestone's age.
+
+    Returns:
+        List of dictionaries with ``label``, ``age_months``, ``min_words``,
+        ``max_words`` and ``date`` (ISO string or None).
+    """
+    return [
+        {
+            "label": milestone["label"],
+            "age_months": milestone["age_months"],
+            "min_words": milestone["min_words"],
+            "max_words": milestone["max_words"],
+            "date": (
+                add_months(birthdate, milestone["age_months"]).isoformat()
+                if birthdate else None
+            ),
+        }
+        for milestone in MILESTONES
+    ]
+
+
+def build_growth_series(daily_counts, resolution="day", points=None, birthdate=None):
+    """Build the chart payload for one resolution and target point count.
+
+    Args:
+        daily_counts: (date, count) pairs, oldest first.
+        resolution: ``day``, ``week`` or ``month``.
+        points: Optional maximum number of points (LTTB downsampling).
+        birthdate: Child's birthdate for the milestone band dates.
+
+    Returns:
+        Dictionary with ``resolution``, ``total``, ``downsampled``,
+        ``points`` (``date``, ``added``, ``total``) and ``milestones``.
+    """
+    series = cumulative_series(daily_counts, resolution)
+    downsampled = bool(points) and len(series) > points
+    if downsampled:
+        series = lttb(
+            series, points,
+            x=lambda p: p["date"].toordinal(),
+            y=lambda p: p["total"],
+        )
+    return {
+        "resolution": resolution,
+        "total": series[-1]["total"] if series else 0,
+        "downsampled": downsampled,
+        "points": [dict(point, date=point["date"].isoformat()) for point in series],
+        "milestones": milestone_bands(birthdate),
+    }
+
+
+@cached(versions=(WORDS,))
+def _growth_series(resolution, points, birthdate):
+    return build_growth_series(load_daily_counts(), resolution, points, birthdate)
+
+
+def get_growth_series(resolution="day", points=None):
+    """Return the current app's growth series, cached per ``words`` data version."""
+    birthdate = parse_birthdate(current_app.config.get("BABY_BIRTHDATE"))
+    return _growth_series(resolution, points, birthdate)
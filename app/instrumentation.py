@@ -0,0 +1,332 @@
+"""Request and SQL instrumentation.
+
+Times every SQL statement, template render and bcrypt call made while
+handling a request, reports the split in a ``Server-Timing`` response header,
+and aggregates per-endpoint latency histograms and query counts for a
+Prometheus-text ``/metrics`` endpoint.
+
+Metrics live in process memory, so each gunicorn worker reports its own
+series (labelled with ``pid``). Recording costs a couple of clock reads and a
+locked counter update per statement and request.
+"""
+
+import hmac
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from flask import (
+    Response,
+    abort,
+    before_render_template,
+    current_app,
+    g,
+    has_request_context,
+    request,
+    template_rendered,
+)
+from sqlalchemy import event
+
+from app import db
+
+# Upper bounds (seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Server-Timing metric names for each timed phase
+PHASES = ("db", "render", "bcrypt")
+
+
+class RequestTimer:
+    """Accumulates phase timings for a single request."""
+
+    __slots__ = ("started", "durations", "counts", "render_started")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations = dict.fromkeys(PHASES, 0.0)
+        self.counts = dict.fromkeys(PHASES, 0)
+        self.render_started = []
+
+    def add(self, phase, seconds):
+        """Record one timed operation for a phase."""
+        self.durations[phase] += seconds
+        self.counts[phase] += 1
+
+    def elapsed(self):
+        """Seconds since the request started."""
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        """Format the timings as a ``Server-Timing`` header value."""
+        parts = []
+        for phase in PHASES:
+            if self.counts[phase]:
+                parts.append(
+                    f'{phase};dur={self.durations[phase] * 1000:.1f};'
+                    f'desc="{self.counts[phase]}x"'
+                )
+        parts.append(f"total;dur={self.elapsed() * 1000:.1f}")
+        return ", ".join(parts)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram."""
+
+    __slots__ = ("buckets", "sum", "count")
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.buckets[bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Thread-safe per-process store of request and query metrics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency = {}
+        self.requests = {}
+        self.queries = {}
+        self.query_seconds = {}
+        self.phase_seconds = {}
+
+    def record_request(self, endpoint, method, status, timer):
+        """Fold a finished request's timings into the aggregates."""
+        seconds = timer.elapsed()
+        with self._lock:
+            histogram = self.latency.get(endpoint)
+            if histogram is None:
+                histogram = self.latency[endpoint] = Histogram()
+            histogram.observe(seconds)
+
+            key = (endpoint, method, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.queries[endpoint] = self.queries.get(endpoint, 0) + timer.counts["db"]
+            self.query_seconds[endpoint] = (
+                self.query_seconds.get(endpoint, 0.0) + timer.durations["db"]
+            )
+            for phase in PHASES:
+                key = (endpoint, phase)
+                self.phase_seconds[key] = (
+                    self.phase_seconds.get(key, 0.0) + timer.durations[phase]
+                )
+
+    def reset(self):
+        """Clear all recorded metrics."""
+        with self._lock:
+            self.latency.clear()
+            self.requests.clear()
+            self.queries.clear()
+            self.query_seconds.clear()
+            self.phase_seconds.clear()
+
+    def render(self, pool=None, cache=None):
+        """Render all metrics in the Prometheus text exposition format."""
+        pid = os.getpid()
+        lines = []
+
+        with self._lock:
+            lines.append("# HELP http_request_duration_seconds Request latency by endpoint.")
+            lines.append("# TYPE http_request_duration_seconds histogram")
+            for endpoint, histogram in sorted(self.latency.items()):
+                labels = f'endpoint="{endpoint}",pid="{pid}"'
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS, histogram.buckets):
+                    cumulative += count
+                    lines.append(
+                        f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}'
+                    )
+                lines.append(
+                    f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}'
+                )
+                lines.append(f"http_request_duration_seconds_sum{{{labels}}} {histogram.sum:.6f}")
+                lines.append(f"http_request_duration_seconds_count{{{labels}}} {histogram.count}")
+
+            lines.append("# HELP http_requests_total Requests by endpoint, method and status.")
+            lines.append("# TYPE http_requests_total counter")
+            for (endpoint, method, status), count in sorted(self.requests.items()):
+                lines.append(
+                    f'http_requests_total{{endpoint="{endpoint}",method="{method}",'
+                    f'status="{status}",pid="{pid}"}} {count}'
+                )
+
+            lines.append("# HELP db_queries_total SQL statements executed by endpoint.")
+            lines.append("# TYPE db_queries_total counter")
+            for endpoint, count in sorted(self.queries.items()):
+                lines.append(f'db_queries_total{{endpoint="{endpoint}",pid="{pid}"}} {count}')
+
+            lines.append("# HELP db_query_seconds_total Time spent in SQL by endpoint.")
+            lines.append("# TYPE db_query_seconds_total counter")
+            for endpoint, seconds in sorted(self.query_seconds.items()):
+                lines.append(
+                    f'db_query_seconds_total{{endpoint="{endpoint}",pid="{pid}"}} {seconds:.6f}'
+                )
+
+            lines.append("# HELP request_phase_seconds_total Time spent per phase by endpoint.")
+            lines.append("# TYPE request_phase_seconds_total counter")
+            for (endpoint, phase), seconds in sorted(self.phase_seconds.items()):
+                lines.append(
+                    f'request_phase_seconds_total{{endpoint="{endpoint}",phase="{phase}",'
+                    f'pid="{pid}"}} {seconds:.6f}'
+                )
+
+        lines.extend(_pool_metrics(pool, pid))
+        if cache is not None:
+            lines.extend(_cache_metrics(cache, pid))
+        return "\n".join(lines) + "\n"
+
+
+def _pool_metrics(pool, pid):
+    """Render connection pool gauges for pools that expose them."""
+    lines = []
+    gauges = (
+        ("db_pool_size", "Configured pool size.", "size"),
+        ("db_pool_checked_out", "Connections currently checked out.", "checkedout"),
+        ("db_pool_checked_in", "Idle connections in the pool.", "checkedin"),
+        ("db_pool_overflow", "Connections opened beyond the pool size.", "overflow"),
+    )
+    for name, help_text, method in gauges:
+        getter = getattr(pool, method, None)
+        if getter is None:
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f'{name}{{pid="{pid}"}} {getter()}')
+    return lines
+
+
+def _cache_metrics(cache, pid):
+    """Render cache lookups by function and outcome, and the local tier's size."""
+    lines = [
+        "# HELP cache_lookups_total Cache lookups by function and outcome.",
+        "# TYPE cache_lookups_total counter",
+    ]
+    for namespace, outcomes in sorted(cache.stats().items()):
+        for outcome, count in outcomes.items():
+            if outcome != "hit_ratio":
+                lines.append(
+                    f'cache_lookups_total{{name="{namespace}",result="{outcome}",pid="{pid}"}} {count}'
+                )
+    lines.append("# HELP cache_local_entries Entries in this worker's cache.")
+    lines.append("# TYPE cache_local_entries gauge")
+    lines.append(f'cache_local_entries{{pid="{pid}"}} {len(cache.local)}')
+    return lines
+
+
+metrics = MetricsRegistry()
+
+
+def current_timer():
+    """Return the active request's timer, or None outside instrumented requests."""
+    if has_request_context():
+        return g.get("_request_timer")
+    return None
+
+
+@contextmanager
+def timed(phase):
+    """Time a block of code as part of the current request's ``phase``."""
+    timer = current_timer()
+    if timer is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.add(phase, time.perf_counter() - started)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_start"].pop()
+    timer = current_timer()
+    if timer is not None:
+        timer.add("db", time.perf_counter() - started)
+
+
+def _handle_error(exception_context):
+    # after_cursor_execute never fires for failed statements
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start"):
+        conn.info["query_start"].pop()
+
+
+def _before_render(sender, template, context, **extra):
+    timer = current_timer()
+    if timer is not None:
+        timer.render_started.append(time.perf_counter())
+
+
+def _after_render(sender, template, context, **extra):
+    timer = current_timer()
+    if timer is not None and timer.render_started:
+        timer.add("render", time.perf_counter() - timer.render_started.pop())
+
+
+def _start_timer():
+    g._request_timer = RequestTimer()
+
+
+def _finish_timer(response):
+    timer = g.pop("_request_timer", None)
+    if timer is None:
+        return response
+    response.headers["Server-Timing"] = timer.server_timing()
+    metrics.record_request(
+        request.endpoint or "unmatched", request.method, response.status_code, timer
+    )
+    return response
+
+
+def _record_failure(exc):
+    # after_request is skipped when a view raises, so count the 500 here
+    timer = g.pop("_request_timer", None)
+    if timer is not None and exc is not None:
+        metrics.record_request(request.endpoint or "unmatched", request.method, 500, timer)
+
+
+def metrics_view():
+    """Serve collected metrics in Prometheus text format."""
+    token = current_app.config.get("METRICS_TOKEN")
+    if token and not hmac.compare_digest(
+        request.headers.get("Authorization", "").encode(), f"Bearer {token}".encode()
+    ):
+        abort(401)
+    body = metrics.render(pool=db.engine.pool, cache=current_app.extensions.get("cache"))
+    return Response(body, mimetype="text/plain; version=0.0.4")
+
+
+def init_instrumentation(app):
+    """Install request, template and SQL timing hooks on the app.
+
+    Does nothing when ``INSTRUMENTATION_ENABLED`` is false.
+    """
+    if not app.config.get("INSTRUMENTATION_ENABLED", True):
+        return
+
+    with app.app_context():
+        engine = db.engine
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
+
+    app.before_request(_start_timer)
+    app.after_request(_finish_timer)
+    app.teardown_request(_record_failure)
+    app.add_url_rule("/metrics", "metrics", metrics_view)
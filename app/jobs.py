@@ -0,0 +1,396 @@
+"""Background jobs for heavy exports and reports.
+
+Work too slow for a request (the full CSV export, the printable
+pediatrician report) is queued as a row in ``jobs`` and run on a small
+per-worker thread pool, so a long report never ties up the worker that
+serves everyone else. The row records status, progress and, once finished,
+the artifact file kept under ``JOB_ARTIFACT_DIR``; any worker can answer a
+status poll or serve the download from it.
+
+Each job is tagged with the ``words`` and ``reference`` data versions it
+was built from. Submitting the same kind and parameters again returns the
+finished job while those versions stand, or the one already in progress;
+when a newer artifact of the same kind finishes, superseded files are
+deleted. At most ``JOB_MAX_QUEUED`` jobs wait per worker and submitting
+beyond that raises ``JobQueueFull``.
+
+Job types are registered with ``job_type``. Each is a function taking the
+output path, the job's parameters and a ``progress(fraction, message)``
+callback.
+"""
+
+import json
+import os
+import secrets
+import threading
+import time
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app, render_template
+from sqlalchemy import and_, func, or_, select
+
+from app import db
+from app.changes import WORDS
+from app.data_versions import get_version
+from app.milestones import get_all_milestones
+from app.models import Job, Word
+from app.reference_data import REFERENCE, get_reference_data
+from app.timeline import get_milestone_timeline
+from app.utils import calculate_age_months, get_milestone_for_age, get_monthly_stats, parse_birthdate
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+PENDING = (QUEUED, RUNNING)
+
+# Seconds between progress commits while a job runs
+PROGRESS_INTERVAL = 0.5
+
+# Words read per query by the export job
+EXPORT_BATCH_SIZE = 1000
+
+JobType = namedtuple("JobType", ["kind", "run", "suffix", "mimetype", "attachment", "download_name"])
+
+_job_types = {}
+
+
+class JobQueueFull(Exception):
+    """Raised when this worker already has ``JOB_MAX_QUEUED`` jobs waiting."""
+
+
+def job_type(kind, suffix, mimetype, attachment=True, download_name=None):
+    """Register a job type.
+
+    Args:
+        kind: Name clients submit.
+        suffix: Artifact file extension.
+        mimetype: Content type the artifact is served with.
+        attachment: Serve as a download rather than inline.
+        download_name: Callable taking the Job and returning the download
+            file name.
+
+    Returns:
+        Decorator registering ``run(path, params, progress)``.
+    """
+    def register(run):
+        _job_types[kind] = JobType(kind, run, suffix, mimetype, attachment, download_name)
+        return run
+    return register
+
+
+def get_job_type(kind):
+    """Return the registered JobType for ``kind``, or None."""
+    return _job_types.get(kind)
+
+
+def job_kinds():
+    """Return the names of all registered job types."""
+    return sorted(_job_types)
+
+
+def current_data_version():
+    """Return the data versions a job built now would reflect, as a tag."""
+    return f"{WORDS}:{get_version(WORDS)},{REFERENCE}:{get_version(REFERENCE)}"
+
+
+class JobRunner:
+    """Queues jobs in the ``jobs`` table and runs them on a thread pool."""
+
+    def __init__(self, app, workers=2, max_queued=20, artifact_dir=None,
+                 stale_seconds=600, run_async=True):
+        self.app = app
+        self.workers = workers
+        self.max_queued = max_queued
+        self.artifact_dir = artifact_dir or os.path.join(app.instance_path, "jobs")
+        self.stale_seconds = stale_seconds
+        self.run_async = run_async
+        self.pending = 0
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def artifact_path(self, job):
+        """Return the artifact file path for a finished job, or None."""
+        if not job.artifact:
+            return None
+        return os.path.join(self.artifact_dir, job.artifact)
+
+    def has_artifact(self, job):
+        """Return True if the job finished and its file is still on disk."""
+        path = self.artifact_path(job)
+        return job.status == DONE and path is not None and os.path.exists(path)
+
+    def submit(self, kind, params=None, user_id=None):
+        """Queue a job, or return an equivalent one that is current.
+
+        Args:
+            kind: Registered job type name.
+            params: JSON-serializable parameters for the job.
+            user_id: Submitting user's id.
+
+        Returns:
+            Tuple of (Job, reused). ``reused`` is True when an existing job
+            (finished at the current data version, or still in progress)
+            was returned instead of a new one.
+
+        Raises:
+            ValueError: If ``kind`` is not a registered job type.
+            JobQueueFull: If this worker has too many jobs waiting.
+        """
+        if kind not in _job_types:
+            raise ValueError(f"Unknown job type: {kind}")
+        params = json.dumps(params or {}, sort_keys=True, separators=(",", ":"))
+        version = current_data_version()
+
+        existing = self._find_existing(kind, params, version)
+        if existing is not None:
+            return existing, True
+
+        with self._lock:
+            if self.pending >= self.max_queued:
+                raise JobQueueFull(f"{self.pending} jobs are already waiting.")
+            self.pending += 1
+
+        job_id = secrets.token_hex(16)
+        job = Job(id=job_id, kind=kind, params=params, status=QUEUED,
+                  progress=0.0, data_version=version, user_id=user_id)
+        db.session.add(job)
+        try:
+            db.session.commit()
+        except Exception:
+            with self._lock:
+                self.pending -= 1
+            raise
+
+        if self.run_async:
+            self._ensure_executor().submit(self.run, job_id)
+        else:
+            self.run(job_id)
+        return job, False
+
+    def _find_existing(self, kind, params, version):
+        """Return a current finished job or a live pending one, if any."""
+        stale = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(seconds=self.stale_seconds)
+        candidates = (
+            Job.query.filter(
+                Job.kind == kind,
+                Job.params == params,
+                or_(
+                    and_(Job.status == DONE, Job.data_version == version),
+                    and_(Job.status.in_(PENDING), Job.updated_at >= stale),
+                ),
+            )
+            .order_by(Job.created_at.desc())
+            .limit(5)
+            .all()
+        )
+        for job in candidates:
+            if job.status in PENDING or self.has_artifact(job):
+                return job
+        return None
+
+    def _ensure_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="jobs"
+                )
+            return self._executor
+
+    def run(self, job_id):
+        """Run a queued job to completion in its own app context."""
+        try:
+            with self.app.app_context():
+                self._run(job_id)
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+    def _run(self, job_id):
+        job = db.session.get(Job, job_id)
+        if job is None or job.status != QUEUED:
+            return
+        spec = _job_types[job.kind]
+        job.status = RUNNING
+        # Tag with the versions at start, so a job queued before a change
+        # is reusable at the versions it actually read
+        job.data_version = current_data_version()
+        db.session.commit()
+
+        os.makedirs(self.artifact_dir, exist_ok=True)
+        name = f"{job.kind}_{job.id}{spec.suffix}"
+        path = os.path.join(self.artifact_dir, name)
+        partial = path + ".part"
+        last_commit = [0.0]
+
+        def progress(fraction, message=None):
+            job.progress = max(0.0, min(fraction, 1.0))
+            if message is not None:
+                job.message = message[:200]
+            now = time.monotonic()
+            if now - last_commit[0] >= PROGRESS_INTERVAL:
+                last_commit[0] = now
+                db.session.commit()
+
+        try:
+            # Progress waits for its throttled commit instead of flushing
+            # (and taking SQLite's write lock) ahead of every query
+            with db.session.no_autoflush:
+                spec.run(partial, json.loads(job.params), progress)
+            os.replace(partial, path)
+        except Exception as exc:
+            self.app.logger.exception("Job %s (%s) failed", job_id, spec.kind)
+            db.session.rollback()
+            if os.path.exists(partial):
+                os.remove(partial)
+            job = db.session.get(Job, job_id)
+            job.status = FAILED
+            job.error = str(exc) or type(exc).__name__
+        else:
+            job.status = DONE
+            job.progress = 1.0
+            job.message = "Finished"
+            job.artifact = name
+        job.finished_at = datetime.now(timezone.utc)
+        db.session.commit()
+
+        if job.status == DONE:
+            self.prune(job)
+
+    def prune(self, job):
+        """Delete artifacts superseded by ``job`` (same kind and parameters)."""
+        superseded = Job.query.filter(
+            Job.kind == job.kind,
+            Job.params == job.params,
+            Job.status == DONE,
+            Job.artifact.isnot(None),
+            Job.id != job.id,
+            Job.data_version != job.data_version,
+        ).all()
+        for old in superseded:
+            path = self.artifact_path(old)
+            if os.path.exists(path):
+                os.remove(path)
+            old.artifact = None
+        if superseded:
+            db.session.commit()
+
+    def shutdown(self, wait=True):
+        """Stop the pool, optionally waiting for running jobs."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+def get_job_runner(app):
+    """Return the app's job runner, creating it on first use."""
+    runner = app.extensions.get("job_runner")
+    if runner is None:
+        runner = app.extensions.setdefault("job_runner", JobRunner(
+            app,
+            workers=app.config.get("JOB_WORKERS", 2),
+            max_queued=app.config.get("JOB_MAX_QUEUED", 20),
+            artifact_dir=app.config.get("JOB_ARTIFACT_DIR"),
+            stale_seconds=app.config.get("JOB_STALE_SECONDS", 600),
+            run_async=app.config.get("JOB_ASYNC", True),
+        ))
+    return runner
+
+
+def iter_words(batch_size=EXPORT_BATCH_SIZE):
+    """Yield every word's export columns, oldest first, a batch per query.
+
+    Pages by (date_added, id), so progress commits between batches do not
+    disturb an open cursor.
+    """
+    columns = select(Word.id, Word.word, Word.date_added, Word.user_id, Word.category_id)
+    after = None
+    while True:
+        query = columns
+        if after is not None:
+            query = query.where(or_(
+                Word.date_added > after.date_added,
+                and_(Word.date_added == after.date_added, Word.id > after.id),
+            ))
+        rows = db.session.execute(
+            query.order_by(Word.date_added, Word.id).limit(batch_size)
+        ).all()
+        yield from rows
+        if len(rows) < batch_size:
+            return
+        after = rows[-1]
+
+
+def _export_filename(job):
+    from app.export import get_export_filename
+
+    return get_export_filename()
+
+
+@job_type("export", ".csv", "text/csv", download_name=_export_filename)
+def run_export(path, params, progress):
+    """Write every word to a CSV file, reporting progress per batch."""
+    from app.export import write_csv
+
+    total = db.session.execute(select(func.count(Word.id))).scalar() or 0
+    reference = get_reference_data()
+
+    def counted(rows):
+        for written, row in enumerate(rows, 1):
+            yield row
+            if written % EXPORT_BATCH_SIZE == 0:
+                progress(written / total, f"Exported {written} of {total} words")
+
+    with open(path, "w", encoding="utf-8", newline="") as output:
+        write_csv(output, counted(iter_words()), reference)
+    progress(1.0, f"Exported {total} words")
+
+
+@job_type("report", ".html", "text/html", attachment=False,
+          download_name=lambda job: f"emily_report_{job.created_at:%Y-%m-%d}.html")
+def run_report(path, params, progress):
+    """Render the printable pediatrician summary to an HTML file."""
+    birthdate = parse_birthdate(current_app.config.get("BABY_BIRTHDATE"))
+    age_months = calculate_age_months(birthdate) if birthdate else None
+    reference = get_reference_data()
+
+    progress(0.1, "Counting words")
+    total_words = db.session.execute(select(func.count(Word.id))).scalar() or 0
+    category_counts = Counter(dict(db.session.execute(
+        select(Word.category_id, func.count(Word.id)).group_by(Word.category_id)
+    ).all()))
+    categories = sorted(
+        ((reference.category_names.get(category_id) or "Uncategorized", count)
+         for category_id, count in category_counts.items()),
+        key=lambda item: (-item[1], item[0]),
+    )
+
+    progress(0.3, "Building timeline")
+    timeline = get_milestone_timeline()
+    monthly_stats = get_monthly_stats()
+
+    progress(0.5, "Listing words")
+    words = db.session.execute(
+        select(Word.word, Word.date_added, Word.category_id).order_by(func.lower(Word.word))
+    ).all()
+
+    progress(0.8, "Rendering report")
+    html = render_template(
+        "report.html",
+        generated_at=datetime.now(),
+        birthdate=birthdate,
+        age_months=age_months,
+        total_words=total_words,
+        current_milestone=get_milestone_for_age(age_months) if age_months is not None else None,
+        milestones=get_all_milestones(),
+        timeline=[entry for entry in timeline if entry["reached_on"] or entry["milestone"]],
+        monthly_stats=monthly_stats,
+        categories=categories,
+        words=words,
+        category_names=reference.category_names,
+    )
+    with open(path, "w", encoding="utf-8") as output:
+        output.write(html)
@@ -0,0 +1,317 @@
+"""Server-Sent Events live updates for open pages.
+
+Each worker runs one ``LiveHub``. The hub reads new change log entries with
+one query per round, renders them once and keeps the last ``LIVE_BACKLOG``
+events in memory; every connected stream just waits on the hub's condition
+and copies events out of that buffer. The hub is woken immediately by
+commits in its own process (via the ``words`` data set's commit callback)
+and polls the change log every ``LIVE_POLL_INTERVAL`` seconds while clients
+are connected, which fans out changes made by other workers. Event ids are
+change log positions, so a reconnecting ``EventSource`` resumes from its
+``Last-Event-ID`` through the same path as the change feed.
+
+Streams end after ``LIVE_STREAM_SECONDS`` and the browser reconnects, so a
+worker never holds a connection indefinitely. Idle streams only wait on a
+condition: under a gevent worker that costs a greenlet; under gthread it
+costs a worker thread. ``LIVE_MAX_CLIENTS`` caps them, and under gthread
+``fit_live_clients`` lowers the cap so ``LIVE_RESERVED_THREADS`` threads
+are always left for ordinary requests.
+"""
+
+import json
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from flask import current_app, has_app_context
+from sqlalchemy import func, select
+
+from app import db
+from app.changes import DELETE, INSERT, RESET, UPDATE, WORDS, get_changes, latest_seq
+from app.data_versions import on_commit
+from app.models import Word
+
+EVENT_NAMES = {
+    INSERT: "word-added",
+    UPDATE: "word-edited",
+    DELETE: "word-deleted",
+    RESET: "reset",
+}
+
+# Browser reconnect delay after a stream ends, in milliseconds
+RETRY_MS = 3000
+
+
+def format_event(data, event=None, event_id=None):
+    """Encode one SSE message."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event is not None:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+def _image_word(image):
+    """Build a detached Word from a change log row image."""
+    fields = dict(image)
+    for key in ("date_added", "created_at", "updated_at"):
+        if fields.get(key):
+            fields[key] = datetime.fromisoformat(fields[key])
+    return Word(**fields)
+
+
+class LiveHubFull(Exception):
+    """Raised when a worker already has ``LIVE_MAX_CLIENTS`` live streams."""
+
+
+class LiveHub:
+    """Shares one change log reader between every live stream in a worker."""
+
+    def __init__(self, app, poll_interval=2.0, backlog=500, run_async=True):
+        self.app = app
+        self.poll_interval = poll_interval
+        self.run_async = run_async
+        self.clients = 0
+        self.polls = 0
+        self._events = deque(maxlen=backlog)
+        self._cursor = None
+        self._floor = None
+        self._word_count = None
+        self._condition = threading.Condition()
+        self._wake = threading.Event()
+        self._poll_lock = threading.Lock()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    @property
+    def cursor(self):
+        """The newest change log position the hub has read."""
+        return self._cursor
+
+    def notify(self):
+        """Ask the hub to read the change log now (a local commit changed words)."""
+        self._wake.set()
+
+    def connect(self, max_clients=None):
+        """Register a stream; returns the hub's position for streams with no history.
+
+        Args:
+            max_clients: Most streams the hub may have, counting this one
+                (None for no limit).
+
+        Raises:
+            LiveHubFull: If ``max_clients`` streams are already registered.
+        """
+        with self._condition:
+            # Checked and counted under one lock so concurrent connects
+            # cannot overshoot the cap
+            if max_clients is not None and self.clients >= max_clients:
+                raise LiveHubFull()
+            self.clients += 1
+        if self._cursor is None:
+            self.poll()
+        if self.run_async:
+            self._ensure_thread()
+        return self._cursor
+
+    def disconnect(self):
+        """Unregister a stream."""
+        with self._condition:
+            self.clients -= 1
+
+    def wait(self, cursor, timeout):
+        """Return the events after ``cursor``, waiting up to ``timeout`` for some.
+
+        Returns:
+            Tuple of (events, word_count). ``events`` is a list of
+            (seq, message) pairs, or None when ``cursor`` is older than the
+            buffer and the stream has to catch up another way.
+        """
+        if not self.run_async:
+            self.poll()
+        with self._condition:
+            if self.run_async and self._cursor is not None and self._cursor <= cursor:
+                self._condition.wait(timeout)
+            return self._since(cursor), self._word_count
+
+    def _since(self, cursor):
+        # The buffer holds every event after self._floor
+        if self._cursor is None or cursor >= self._cursor:
+            return []
+        if cursor < self._floor:
+            return None
+        return [event for event in self._events if event[0] > cursor]
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="live-updates", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            if not self.clients:
+                continue
+            try:
+                self.poll()
+            except Exception:
+                self.app.logger.exception("Failed to read the change log for live updates")
+
+    def poll(self):
+        """Read new change log entries into the buffer and wake the streams."""
+        with self._poll_lock, self.app.app_context():
+            self.polls += 1
+            if self._cursor is None:
+                with self._condition:
+                    self._cursor = self._floor = latest_seq()
+                    self._word_count = self.count_words()
+                return
+
+            messages = []
+            cursor = self._cursor
+            while True:
+                page = get_changes(since=cursor, limit=self._events.maxlen or 500)
+                if page["changes"]:
+                    messages.extend(self.render(page["changes"]))
+                cursor = page["cursor"]
+                if not page["has_more"]:
+                    break
+            if not messages and cursor == self._cursor:
+                return
+            word_count = self.count_words()
+
+        with self._condition:
+            if len(messages) + len(self._events) > self._events.maxlen:
+                # Streams behind the oldest kept event must catch up from the log
+                dropped = len(messages) + len(self._events) - self._events.maxlen
+                kept = list(self._events) + messages
+                self._floor = kept[dropped - 1][0]
+            self._events.extend(messages)
+            self._cursor = cursor
+            self._word_count = word_count
+            self._condition.notify_all()
+
+    def count_words(self):
+        """Return the current number of words."""
+        return db.session.execute(
+            select(func.count()).select_from(Word.__table__)
+        ).scalar()
+
+    def render(self, changes):
+        """Turn serialized changes into (seq, message) pairs with page fragments."""
+        from app.reference_data import get_reference_data
+        from app.routes import word_fragments
+
+        messages = []
+        with self.app.test_request_context():
+            reference = get_reference_data()
+            for change in changes:
+                data = {"seq": change["seq"], "word_id": change["word_id"]}
+                if change["word"] is not None:
+                    word = _image_word(change["word"])
+                    data["word"] = word.to_dict(reference)
+                    if change["op"] != DELETE:
+                        data["html"] = word_fragments(word)
+                messages.append((
+                    change["seq"],
+                    format_event(data, EVENT_NAMES[change["op"]], change["seq"]),
+                ))
+        return messages
+
+
+def stream_events(hub, cursor, backlog, heartbeat, lifetime):
+    """Yield SSE messages for one client until its stream lifetime ends.
+
+    Args:
+        hub: The worker's LiveHub (the stream is registered with it already).
+        cursor: Last change log position the client has.
+        backlog: Messages to send before waiting (a reconnect's catch-up).
+        heartbeat: Seconds between keep-alive comments on a quiet stream.
+        lifetime: Seconds before the stream closes and the client reconnects.
+
+    The caller unregisters the stream when its response closes, which also
+    happens when the response is dropped before this generator starts.
+    """
+    deadline = time.monotonic() + lifetime
+    yield f"retry: {RETRY_MS}\n\n"
+    yield from backlog
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        events, word_count = hub.wait(cursor, min(heartbeat, remaining))
+        if events is None:
+            # Fell behind the buffer: let the page reload rather than replay
+            yield format_event({"seq": hub.cursor}, "reset", hub.cursor)
+            return
+        if not events:
+            yield ": heartbeat\n\n"
+            continue
+        for seq, message in events:
+            yield message
+            cursor = seq
+        yield format_event({"word_count": word_count}, "count")
+
+
+def catch_up(hub, since, limit):
+    """Render the changes a reconnecting client missed.
+
+    Returns:
+        Tuple of (messages, cursor). A gap larger than ``limit`` (or a reset
+        in it) collapses into one ``reset`` event.
+    """
+    page = get_changes(since=since, limit=limit)
+    if page["has_more"] or page["reset"]:
+        cursor = latest_seq()
+        return [format_event({"seq": cursor}, "reset", cursor)], cursor
+    messages = [message for _, message in hub.render(page["changes"])]
+    if messages:
+        messages.append(format_event({"word_count": hub.count_words()}, "count"))
+    return messages, page["cursor"]
+
+
+def fit_live_clients(app, threads):
+    """Cap an app's live streams so a thread-per-request worker keeps threads free.
+
+    Args:
+        app: The worker's app.
+        threads: Request threads in the worker.
+
+    Returns:
+        The new ``LIVE_MAX_CLIENTS``: at most ``threads`` minus
+        ``LIVE_RESERVED_THREADS``, and 0 (no live updates) below that.
+    """
+    reserved = app.config.get("LIVE_RESERVED_THREADS", 4)
+    limit = min(app.config.get("LIVE_MAX_CLIENTS", 12), max(threads - reserved, 0))
+    app.config["LIVE_MAX_CLIENTS"] = limit
+    return limit
+
+
+def get_live_hub(app):
+    """Return the app's live update hub, creating it on first use."""
+    hub = app.extensions.get("live_updates")
+    if hub is None:
+        hub = app.extensions.setdefault("live_updates", LiveHub(
+            app,
+            poll_interval=app.config.get("LIVE_POLL_INTERVAL", 2.0),
+            backlog=app.config.get("LIVE_BACKLOG", 500),
+            run_async=app.config.get("LIVE_POLL_ASYNC", True),
+        ))
+    return hub
+
+
+def _notify_on_commit(names):
+    if WORDS in names and has_app_context():
+        hub = current_app.extensions.get("live_updates")
+        if hub is not None:
+            hub.notify()
+
+
+on_commit(_notify_on_commit)
@@ -2,11 +2,12 @@
 
 from datetime import datetime, timezone
 
-import bcrypt
+from flask import current_app, has_app_context
 from flask_login import UserMixin
 from sqlalchemy import func
 
 from app import db
+from app.instrumentation import timed
 
 
 class User(UserMixin, db.Model):
@@ -23,16 +24,28 @@ class User(UserMixin, db.Model):
     words = db.relationship("Word", back_populates="user", lazy="dynamic")
 
     def set_password(self, password):
-        """Hash and set the user's password."""
-        self.password_hash = bcrypt.hashpw(
-            password.encode("utf-8"), bcrypt.gensalt()
-        ).decode("utf-8")
+        """Hash and set the user's password.
+
+        Uses ``BCRYPT_ROUNDS`` from the app config (bcrypt's default, 12,
+        outside an app context). Existing hashes keep the cost they were
+        made with.
+        """
+        import bcrypt  # only logins and seeding need it
+
+        rounds = current_app.config.get("BCRYPT_ROUNDS", 12) if has_app_context() else 12
+        with timed("bcrypt"):
+            self.password_hash = bcrypt.hashpw(
+                password.encode("utf-8"), bcrypt.gensalt(rounds)
+            ).decode("utf-8")
 
     def check_password(self, password):
         """Verify password against stored hash."""
-        return bcrypt.checkpw(
-            password.encode("utf-8"), self.password_hash.encode("utf-8")
-        )
+        import bcrypt
+
+        with timed("bcrypt"):
+            return bcrypt.checkpw(
+                password.encode("utf-8"), self.password_hash.encode("utf-8")
+            )
 
     def __repr__(self):
         return f"<User {self.username}>"
@@ -58,6 +71,18 @@ class Word(db.Model):
     """Word model for vocabulary tracking."""
 
     __tablename__ = "words"
+    __table_args__ = (
+        # Client-generated UUID from offline sync; makes replays idempotent
+        db.Index("ix_words_client_id", "client_id", unique=True),
+        # Word list and dashboard access paths: each filter (none, category,
+        # user) paired with each sort (date, word), date ranges included
+        db.Index("ix_words_date_added", "date_added"),
+        db.Index("ix_words_word", "word"),
+        db.Index("ix_words_category_date", "category_id", "date_added"),
+        db.Index("ix_words_category_word", "category_id", "word"),
+        db.Index("ix_words_user_date", "user_id", "date_added"),
+        db.Index("ix_words_user_word", "user_id", "word"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     word = db.Column(db.String(100), nullable=False)
@@ -66,6 +91,7 @@ class Word(db.Model):
     )
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
     category_id = db.Column(db.Integer, db.ForeignKey("categories.id"), nullable=True)
+    client_id = db.Column(db.String(36), nullable=True)
     created_at = db.Column(
         db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc)
     )
@@ -80,19 +106,141 @@ class Word(db.Model):
     user = db.relationship("User", back_populates="words")
     category = db.relationship("Category", back_populates="words")
 
-    def to_dict(self):
-        """Serialize word to dictionary."""
+    def to_dict(self, reference=None):
+        """Serialize word to dictionary.
+
+        Args:
+            reference: Optional ReferenceData snapshot to take user and
+                category names from instead of loading the relationships.
+        """
+        if reference is not None:
+            user_name = reference.user_names.get(self.user_id)
+            category_name = reference.category_names.get(self.category_id)
+        else:
+            user_name = self.user.display_name if self.user else None
+            category_name = self.category.name if self.category else None
         return {
             "id": self.id,
             "word": self.word,
             "date_added": self.date_added.isoformat() if self.date_added else None,
             "user_id": self.user_id,
-            "user": self.user.display_name if self.user else None,
+            "user": user_name,
             "category_id": self.category_id,
-            "category": self.category.name if self.category else None,
+            "category": category_name,
+            "client_id": self.client_id,
             "created_at": self.created_at.isoformat() if self.created_at else None,
             "updated_at": self.updated_at.isoformat() if self.updated_at else None,
         }
 
     def __repr__(self):
         return f"<Word {self.word}>"
+
+
+class SlowQuery(db.Model):
+    """Aggregated record of one slow SQL statement shape."""
+
+    __tablename__ = "slow_queries"
+
+    id = db.Column(db.Integer, primary_key=True)
+    fingerprint = db.Column(db.String(40), unique=True, nullable=False)
+    statement = db.Column(db.Text, nullable=False)
+    param_shape = db.Column(db.String(500), nullable=True)
+    route = db.Column(db.String(100), nullable=True)
+    calls = db.Column(db.Integer, nullable=False, default=0)
+    total_ms = db.Column(db.Float, nullable=False, default=0.0)
+    max_ms = db.Column(db.Float, nullable=False, default=0.0)
+    plan = db.Column(db.Text, nullable=True)
+    first_seen = db.Column(
+        db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc)
+    )
+    last_seen = db.Column(
+        db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc)
+    )
+
+    def __repr__(self):
+        return f"<SlowQuery {self.fingerprint[:8]} x{self.calls}>"
+
+
+class DataVersion(db.Model):
+    """Version stamp for a named set of cached data."""
+
+    __tablename__ = "data_versions"
+
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<DataVersion {self.name}={self.version}>"
+
+
+class WordChange(db.Model):
+    """One entry in the append-only log of word changes."""
+
+    __tablename__ = "word_changes"
+    __table_args__ = (
+        db.Index("ix_word_changes_word_id_seq", "word_id", "seq"),
+        # Never reuse a sequence number, even after compaction
+        {"sqlite_autoincrement": True},
+    )
+
+    # 64-bit like MAX_SEQ in app.changes; SQLite's INTEGER already is, and
+    # AUTOINCREMENT needs that exact type
+    seq = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), primary_key=True)
+    op = db.Column(db.String(10), nullable=False)
+    word_id = db.Column(db.Integer, nullable=True)
+    data = db.Column(db.Text, nullable=True)
+    changed_at = db.Column(
+        db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc)
+    )
+
+    def __repr__(self):
+        return f"<WordChange {self.seq} {self.op} {self.word_id}>"
+
+
+class Job(db.Model):
+    """A background job and, once finished, where its artifact lives."""
+
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Reuse lookups: same kind and parameters at the same data version
+        db.Index("ix_jobs_kind_params_version", "kind", "params", "data_version"),
+    )
+
+    # Random hex id, so job URLs cannot be guessed
+    id = db.Column(db.String(32), primary_key=True)
+    kind = db.Column(db.String(30), nullable=False)
+    params = db.Column(db.Text, nullable=False, default="{}")
+    status = db.Column(db.String(10), nullable=False, default="queued")
+    progress = db.Column(db.Float, nullable=False, default=0.0)
+    message = db.Column(db.String(200), nullable=True)
+    data_version = db.Column(db.String(100), nullable=False)
+    artifact = db.Column(db.String(255), nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    # No foreign key: jobs are derived data and do not block user restores
+    user_id = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(
+        db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc)
+    )
+    updated_at = db.Column(
+        db.DateTime,
+        nullable=False,
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+    )
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        """Serialize job status for the API."""
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": round(self.progress, 3),
+            "message": self.message,
+            "error": self.error,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+    def __repr__(self):
+        return f"<Job {self.id} {self.kind} {self.status}>"
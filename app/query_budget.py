@@ -0,0 +1,118 @@
+"""Per-route SQL query budgets.
+
+Views declare how many statements they may issue with ``@query_budget(n)``
+(or through the ``QUERY_BUDGETS`` config mapping, which takes precedence).
+Statements are collected while a budgeted request runs; when a request goes
+over budget the offending statement shapes are logged as a warning, and in
+strict mode (``QUERY_BUDGET_STRICT``, on under testing) ``QueryBudgetExceeded``
+is raised so the test fails.
+
+Statements executed with ``execution_options(query_budget=False)`` are not
+counted; this is for cache fills whose cost is paid once, not per request.
+"""
+
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+from app import db
+from app.slow_queries import normalize_sql
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """Raised in strict mode when a request issues more queries than budgeted."""
+
+
+def query_budget(max_queries):
+    """Declare the maximum number of SQL statements a view may issue.
+
+    Args:
+        max_queries: Statement budget for one request to the view.
+    """
+    def decorator(view):
+        view.query_budget = max_queries
+        return view
+    return decorator
+
+
+def get_query_budget(endpoint):
+    """Return the budget for an endpoint, or None if it has none."""
+    overrides = current_app.config.get("QUERY_BUDGETS") or {}
+    if endpoint in overrides:
+        return overrides[endpoint]
+    view = current_app.view_functions.get(endpoint)
+    return getattr(view, "query_budget", None)
+
+
+def statement_shapes(statements):
+    """Count statements by normalized shape, most frequent first."""
+    return Counter(normalize_sql(statement) for statement in statements).most_common()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if not has_request_context() or context.execution_options.get("query_budget") is False:
+        return
+    statements = g.get("_budget_statements")
+    if statements is not None:
+        statements.append(statement)
+
+
+def _start_budget():
+    budget = get_query_budget(request.endpoint)
+    if budget is not None:
+        g._query_budget = budget
+        g._budget_statements = []
+
+
+def _check_budget(response):
+    statements = g.pop("_budget_statements", None)
+    budget = g.pop("_query_budget", None)
+    if statements is None or len(statements) <= budget:
+        return response
+
+    shapes = statement_shapes(statements)
+    summary = "\n".join(f"  {count}x {shape}" for shape, count in shapes)
+    message = (
+        f"{request.endpoint} issued {len(statements)} queries "
+        f"(budget {budget}):\n{summary}"
+    )
+    if current_app.config.get("QUERY_BUDGET_STRICT"):
+        raise QueryBudgetExceeded(message)
+    current_app.logger.warning(message)
+    return response
+
+
+@contextmanager
+def record_queries():
+    """Collect every SQL statement run on the app's engine inside the block.
+
+    Yields:
+        List that fills with statement strings as they execute.
+    """
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = db.engine
+    event.listen(engine, "after_cursor_execute", _record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "after_cursor_execute", _record)
+
+
+def init_query_budgets(app):
+    """Enforce declared query budgets on the app's requests."""
+    if not app.config.get("QUERY_BUDGETS_ENABLED", True):
+        return
+
+    with app.app_context():
+        engine = db.engine
+    if not event.contains(engine, "after_cursor_execute", _after_cursor_execute):
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+    app.before_request(_start_budget)
+    app.after_request(_check_budget)
@@ -0,0 +1,54 @@
+"""Read-only word rows for the list pages and the CSV export.
+
+The dashboard, the word list and the export only read a word's id, text,
+date and user and category ids. Loading full ``Word`` entities for them
+costs an identity-map entry, instance state and change tracking per row,
+all discarded when the request ends. These helpers select just those
+columns and return plain ``WordRow`` named tuples, which never enter the
+session. User and category names come from the reference data cache, as
+everywhere else, rather than a join.
+
+Pages that change a word (add, edit, delete) still load the entity.
+"""
+
+from collections import namedtuple
+
+from sqlalchemy import select
+
+from app import db
+from app.models import Word
+from app.utils import filter_date_range
+
+WordRow = namedtuple("WordRow", ["id", "word", "date_added", "user_id", "category_id"])
+
+WORD_COLUMNS = (Word.id, Word.word, Word.date_added, Word.user_id, Word.category_id)
+
+
+def select_words(category_id=None, user_id=None, start=None, end=None):
+    """Build a select of WordRow columns with the word list's filters.
+
+    Args:
+        category_id: Only words in this category.
+        user_id: Only words added by this user.
+        start: First date to include, or None.
+        end: Last date to include, or None.
+
+    Returns:
+        SQLAlchemy Select; add ordering and pass it to ``word_rows``.
+    """
+    statement = select(*WORD_COLUMNS)
+    if category_id:
+        statement = statement.where(Word.category_id == category_id)
+    if user_id:
+        statement = statement.where(Word.user_id == user_id)
+    return filter_date_range(statement, start, end)
+
+
+def word_rows(statement):
+    """Run a ``select_words`` statement and return its rows as WordRows."""
+    return [WordRow._make(row) for row in db.session.execute(statement)]
+
+
+def recent_words(limit=5):
+    """Return the most recently added words, newest first."""
+    return word_rows(select_words().order_by(Word.date_added.desc()).limit(limit))
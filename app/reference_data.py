@@ -0,0 +1,162 @@
+"""Process-local cache of reference data (categories and users).
+
+Categories and users almost never change but are needed on nearly every page.
+Each worker keeps an immutable snapshot of both tables, with id-to-name maps
+that templates, exports and serializers use instead of relationship loads.
+
+The snapshot is tagged with the ``reference`` data version. It is dropped as
+soon as this process commits a change to either model; changes committed by
+other workers are noticed by checking the version at most once per request,
+and no more often than every ``REFERENCE_CACHE_TTL`` seconds.
+
+Filling the snapshot is exempt from query budgets: it costs three statements
+once per change, not per request.
+"""
+
+import threading
+import time
+from collections import namedtuple
+from types import MappingProxyType
+
+from flask import current_app, g, has_app_context, has_request_context
+from sqlalchemy import select
+
+from app import db
+from app.data_versions import get_version, on_commit, watch
+from app.models import Category, DataVersion, User
+
+# Data set name in data_versions
+REFERENCE = "reference"
+
+CategoryRef = namedtuple("CategoryRef", ["id", "name", "description"])
+UserRef = namedtuple("UserRef", ["id", "username", "display_name"])
+
+
+class ReferenceData:
+    """Immutable snapshot of categories and users at one data version."""
+
+    __slots__ = ("version", "categories", "users", "category_names", "user_names")
+
+    def __init__(self, version, categories, users):
+        self.version = version
+        self.categories = tuple(categories)
+        self.users = tuple(users)
+        self.category_names = MappingProxyType({c.id: c.name for c in self.categories})
+        self.user_names = MappingProxyType({u.id: u.display_name for u in self.users})
+
+
+def load_reference_data():
+    """Read a fresh snapshot from the database."""
+    version = db.session.execute(
+        select(DataVersion.version)
+        .where(DataVersion.name == REFERENCE)
+        .execution_options(query_budget=False)
+    ).scalar() or 0
+    categories = db.session.execute(
+        select(Category.id, Category.name, Category.description)
+        .order_by(Category.id)
+        .execution_options(query_budget=False)
+    )
+    users = db.session.execute(
+        select(User.id, User.username, User.display_name)
+        .order_by(User.id)
+        .execution_options(query_budget=False)
+    )
+    return ReferenceData(
+        version,
+        [CategoryRef(*row) for row in categories],
+        [UserRef(*row) for row in users],
+    )
+
+
+class ReferenceCache:
+    """Holds one worker's reference snapshot and decides when to refresh it."""
+
+    def __init__(self, ttl=5.0):
+        self.ttl = ttl
+        self.loads = 0
+        self._snapshot = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Drop the snapshot so the next access reloads it."""
+        self._snapshot = None
+
+    def get(self):
+        """Return a current snapshot, reloading it if the version moved."""
+        snapshot = self._snapshot
+        if snapshot is not None:
+            if self._recently_checked():
+                return snapshot
+            version = get_version(REFERENCE)
+            self._mark_checked()
+            if version == snapshot.version:
+                return snapshot
+
+        with self._lock:
+            if self._snapshot is not None and self._snapshot is not snapshot:
+                # Another thread reloaded while we waited
+                return self._snapshot
+            snapshot = self._snapshot = load_reference_data()
+            self.loads += 1
+            self._mark_checked()
+            return snapshot
+
+    def _recently_checked(self):
+        if has_request_context() and g.get("_reference_checked"):
+            return True
+        return time.monotonic() - self._checked_at < self.ttl
+
+    def _mark_checked(self):
+        self._checked_at = time.monotonic()
+        if has_request_context():
+            g._reference_checked = True
+
+
+def get_reference_data():
+    """Return the current app's reference snapshot."""
+    return current_app.extensions["reference_data"].get()
+
+
+def _lookup(field, key):
+    if key is None:
+        return None
+    cache = current_app.extensions["reference_data"]
+    name = getattr(cache.get(), field).get(key)
+    if name is None:
+        # The row is newer than the snapshot
+        cache.invalidate()
+        name = getattr(cache.get(), field).get(key)
+    return name
+
+
+def user_name(user_id):
+    """Return a user's display name from the snapshot."""
+    return _lookup("user_names", user_id)
+
+
+def category_name(category_id):
+    """Return a category's name from the snapshot, or None."""
+    return _lookup("category_names", category_id)
+
+
+def _invalidate_on_commit(names):
+    if REFERENCE in names and has_app_context():
+        cache = current_app.extensions.get("reference_data")
+        if cache is not None:
+            cache.invalidate()
+
+
+watch(Category, REFERENCE)
+watch(User, REFERENCE)
+on_commit(_invalidate_on_commit)
+
+
+def init_reference_data(app):
+    """Attach a reference cache to the app and expose name lookups to templates."""
+    app.extensions["reference_data"] = ReferenceCache(
+        ttl=app.config.get("REFERENCE_CACHE_TTL", 5.0)
+    )
+    app.add_template_global(user_name)
+    app.add_template_global(category_name)
@@ -1,42 +1,133 @@
 """Application routes."""
 
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from datetime import datetime
 
-from flask import Blueprint, current_app, flash, make_response, redirect, render_template, request, url_for
+from flask import (
+    Blueprint,
+    Response,
+    abort,
+    current_app,
+    flash,
+    get_template_attribute,
+    jsonify,
+    make_response,
+    redirect,
+    render_template,
+    request,
+    send_file,
+    url_for,
+)
 from flask_login import current_user, login_required, login_user, logout_user
+from sqlalchemy.exc import SQLAlchemyError
 
 from app import db
-from app.export import generate_csv_content, get_export_filename
+from app.cache import single_flight
+from app.changes import WORDS, parse_cursor
+from app.group_commit import get_group_committer
+from app.jobs import JobQueueFull, get_job_runner, get_job_type
+from app.live import LiveHubFull, catch_up, get_live_hub, stream_events
 from app.milestones import get_all_milestones
-from app.models import Category, User, Word
+from app.models import Job, User, Word, WordChange
+from app.query_budget import query_budget
+from app.read_models import recent_words, select_words, word_rows
+from app.reference_data import REFERENCE, get_reference_data
+from app.stats_cube import get_stats_cube, with_names
+from app.throttling import rate_limit
+from app.timeline import get_milestone_timeline
 from app.utils import (
     calculate_age_months,
     check_duplicate_word,
     check_duplicate_word_excluding,
     get_milestone_for_age,
-    get_monthly_stats,
+    parse_date_range,
 )
 
 main_bp = Blueprint("main", __name__)
 
 
+def wants_partial():
+    """Return True if the client asked for a JSON delta instead of a redirect.
+
+    Scripted requests mark themselves with ``X-Requested-With: XMLHttpRequest``
+    or prefer ``application/json`` over HTML; browsers submitting forms
+    without JavaScript do neither and keep the post-redirect-get flow.
+    """
+    if request.headers.get("X-Requested-With") == "XMLHttpRequest":
+        return True
+    best = request.accept_mimetypes.best_match(["text/html", "application/json"])
+    return best == "application/json"
+
+
+def partial_response(message, category, status=200, word=None, word_count=None, **extra):
+    """Build the JSON delta for a partial-page response.
+
+    The delta carries the flash message (as text and rendered markup) and,
+    when given, the affected word with its rendered row, card and
+    recent-list fragments, so the page can be patched without a reload.
+    Nothing is flashed to the session.
+
+    Args:
+        message: Flash message text.
+        category: Flash category (``success``, ``error`` or ``info``).
+        status: HTTP status code.
+        word: Word to include, with its user and category loaded.
+        word_count: Updated total word count, if it changed.
+        **extra: Additional fields for the payload.
+
+    Returns:
+        Tuple of (JSON response, status).
+    """
+    payload = {
+        "ok": status < 400,
+        "message": message,
+        "category": category,
+        "flash": str(get_template_attribute("partials/flash.html", "flash_message")(
+            category, message
+        )),
+    }
+    if word is not None:
+        payload["word"] = word.to_dict(get_reference_data())
+        payload["html"] = word_fragments(word)
+    if word_count is not None:
+        payload["word_count"] = word_count
+    payload.update(extra)
+    return jsonify(payload), status
+
+
+def word_fragments(word):
+    """Render a word's table row, card and recent-list fragments."""
+    return {
+        name: str(get_template_attribute("partials/word_row.html", macro)(word))
+        for name, macro in (
+            ("row", "word_row"), ("card", "word_card"), ("recent", "recent_word")
+        )
+    }
+
+
+def _load_word(word_id):
+    """Fetch a word; names come from the reference data cache."""
+    return db.session.get(Word, word_id)
+
+
 @main_bp.route("/")
 @login_required
+@query_budget(4)
 def index():
     """Display the main dashboard."""
     word_count = Word.query.count()
-    categories = Category.query.all()
-    recent_words = Word.query.order_by(Word.date_added.desc()).limit(5).all()
+    categories = get_reference_data().categories
     return render_template(
         "index.html",
         word_count=word_count,
         categories=categories,
-        recent_words=recent_words,
+        recent_words=recent_words(5),
     )
 
 
 @main_bp.route("/words")
 @login_required
+@query_budget(3)
 def word_list():
     """Display the word list with sorting and filtering."""
     # Get query parameters
@@ -44,14 +135,10 @@ def word_list():
     order = request.args.get("order", "desc")
     category_id = request.args.get("category", type=int)
     user_id = request.args.get("user", type=int)
+    date_from, date_to = parse_date_range(request.args)
 
-    # Build query with filters
-    query = Word.query
-
-    if category_id:
-        query = query.filter_by(category_id=category_id)
-    if user_id:
-        query = query.filter_by(user_id=user_id)
+    # Read-only rows with filters; names come from the reference data cache
+    query = select_words(category_id, user_id, date_from, date_to)
 
     # Apply sorting
     if sort == "word":
@@ -59,9 +146,10 @@ def word_list():
     else:  # date
         order_col = Word.date_added.asc() if order == "asc" else Word.date_added.desc()
 
-    words = query.order_by(order_col).all()
-    categories = Category.query.all()
-    users = User.query.all()
+    words = word_rows(query.order_by(order_col))
+    reference = get_reference_data()
+    categories = reference.categories
+    users = reference.users
 
     return render_template(
         "words.html",
@@ -72,14 +160,19 @@ def word_list():
         current_order=order,
         current_category=category_id,
         current_user_filter=user_id,
+        current_from=date_from,
+        current_to=date_to,
     )
 
 
 @main_bp.route("/stats")
 @login_required
+@query_budget(5)
 def stats():
     """Display statistics and developmental milestones."""
-    total_words = Word.query.count()
+    # Totals by month, person and category (cached per data version)
+    cube = with_names(get_stats_cube(), get_reference_data())
+    total_words = cube["total"]
 
     # Get baby's age from config
     birthdate_str = current_app.config.get("BABY_BIRTHDATE")
@@ -98,8 +191,10 @@ def stats():
     # Get all milestones for display
     milestones = get_all_milestones()
 
-    # Get monthly stats
-    monthly_stats = get_monthly_stats()
+    monthly_stats = cube["by_month"]
+
+    # When each milestone and round number was reached (cached per data version)
+    timeline = get_milestone_timeline()
 
     return render_template(
         "stats.html",
@@ -108,40 +203,120 @@ def stats():
         current_milestone=current_milestone,
         milestones=milestones,
         monthly_stats=monthly_stats,
+        timeline=timeline,
+        milestone_reached={entry["words"]: entry for entry in timeline if entry["milestone"]},
+        by_user=cube["by_user"],
+        by_category=cube["by_category"],
     )
 
 
 @main_bp.route("/export")
 @login_required
+@rate_limit("6/minute", burst=3)
+@query_budget(3)
 def export_csv():
-    """Export all words as CSV file."""
-    # Get all words sorted by date (oldest first)
-    words = Word.query.order_by(Word.date_added.asc()).all()
+    """Export words (optionally ``?from=&to=``) as CSV, or the changes after ``?since=``."""
+    from app.export import generate_changes_csv, generate_csv_content, get_export_filename
+
+    since = request.args.get("since")
+    if since is not None:
+        since = parse_cursor(since)
+        if since is None:
+            abort(400)
+        changes = (
+            WordChange.query.filter(WordChange.seq > since)
+            .order_by(WordChange.seq)
+            .all()
+        )
+        csv_content = generate_changes_csv(changes, get_reference_data())
+        cursor = changes[-1].seq if changes else since
+    else:
+        # All words (optionally within ?from=&to=) by date, oldest first.
+        # Concurrent exports of the same range share one query and render.
+        start, end = parse_date_range(request.args)
+
+        def render():
+            words = select_words(None, None, start, end).order_by(Word.date_added.asc())
+            return generate_csv_content(word_rows(words), get_reference_data())
 
-    csv_content = generate_csv_content(words)
+        csv_content = single_flight(("export", start, end), render, depends_on=(WORDS, REFERENCE))
 
     response = make_response(csv_content)
-    response.headers["Content-Disposition"] = f"attachment; filename={get_export_filename()}"
+    response.headers["Content-Disposition"] = f"attachment; filename={get_export_filename(since)}"
     response.headers["Content-Type"] = "text/csv; charset=utf-8"
+    if since is not None:
+        # Pass back as ?since= for the next incremental export
+        response.headers["X-Changes-Cursor"] = str(cursor)
     return response
 
 
+# Page titles for background job types
+JOB_LABELS = {
+    "export": "Full Export",
+    "report": "Pediatrician Report",
+}
+
+
+@main_bp.route("/jobs/<kind>", methods=["POST"])
+@login_required
+@rate_limit("20/hour", burst=5)
+@query_budget(6)
+def start_job(kind):
+    """Queue a background export or report and show its status page."""
+    if get_job_type(kind) is None:
+        abort(404)
+    try:
+        job, _ = get_job_runner(current_app._get_current_object()).submit(
+            kind, user_id=current_user.id
+        )
+    except JobQueueFull:
+        flash("The server is busy preparing other files. Please try again shortly.", "error")
+        return redirect(url_for("main.stats"))
+    return redirect(url_for("main.job_status", job_id=job.id))
+
+
+@main_bp.route("/jobs/<job_id>")
+@login_required
+@query_budget(2)
+def job_status(job_id):
+    """Show a background job's progress, refreshing until it finishes."""
+    job = db.get_or_404(Job, job_id)
+    return render_template("job.html", job=job, job_label=JOB_LABELS.get(job.kind, "Job"))
+
+
+@main_bp.route("/jobs/<job_id>/download")
+@login_required
+@query_budget(2)
+def job_download(job_id):
+    """Serve a finished job's artifact."""
+    job = db.get_or_404(Job, job_id)
+    runner = get_job_runner(current_app._get_current_object())
+    if not runner.has_artifact(job):
+        # Still running, failed, or superseded by newer data
+        abort(404)
+    spec = get_job_type(job.kind)
+    return send_file(
+        runner.artifact_path(job),
+        mimetype=spec.mimetype,
+        as_attachment=spec.attachment,
+        download_name=spec.download_name(job),
+    )
+
+
 @main_bp.route("/words/add", methods=["POST"])
 @login_required
+@query_budget(8)
 def add_word():
     """Handle adding a new word."""
+    partial = wants_partial()
     word_text = request.form.get("word", "").strip()
 
     if not word_text:
+        if partial:
+            return partial_response("Please enter a word.", "error", 400)
         flash("Please enter a word.", "error")
         return redirect(url_for("main.index"))
 
-    # Check for duplicates (case-insensitive)
-    existing = check_duplicate_word(word_text)
-    if existing:
-        flash(f'"{existing.word}" has already been added.', "error")
-        return redirect(url_for("main.index"))
-
     # Get optional category
     category_id = request.form.get("category_id")
     if category_id:
@@ -149,6 +324,43 @@ def add_word():
     else:
         category_id = None
 
+    # Batch with concurrent additions into one transaction when enabled
+    if current_app.config.get("GROUP_COMMIT_ENABLED"):
+        try:
+            result = get_group_committer(current_app._get_current_object()).add_word(
+                word_text, current_user.id, category_id
+            )
+        except (FutureTimeoutError, SQLAlchemyError):
+            if partial:
+                return partial_response("Could not save the word. Please try again.", "error", 503)
+            flash("Could not save the word. Please try again.", "error")
+            return redirect(url_for("main.index"))
+
+        if result["status"] == "duplicate":
+            message = f'"{result["word"]}" has already been added.'
+            if partial:
+                return partial_response(message, "error", 409)
+            flash(message, "error")
+        else:
+            message = f'Added "{word_text}" to Emily\'s vocabulary!'
+            if partial:
+                return partial_response(
+                    message, "success", 201,
+                    word=_load_word(result["id"]),
+                    word_count=Word.query.count(),
+                )
+            flash(message, "success")
+        return redirect(url_for("main.index"))
+
+    # Check for duplicates (case-insensitive)
+    existing = check_duplicate_word(word_text)
+    if existing:
+        message = f'"{existing.word}" has already been added.'
+        if partial:
+            return partial_response(message, "error", 409)
+        flash(message, "error")
+        return redirect(url_for("main.index"))
+
     # Create the new word
     word = Word(
         word=word_text,
@@ -156,31 +368,50 @@ def add_word():
         category_id=category_id
     )
     db.session.add(word)
+    db.session.flush()
+    word_id = word.id
     db.session.commit()
 
-    flash(f'Added "{word_text}" to Emily\'s vocabulary!', "success")
+    message = f'Added "{word_text}" to Emily\'s vocabulary!'
+    if partial:
+        return partial_response(
+            message, "success", 201,
+            word=_load_word(word_id),
+            word_count=Word.query.count(),
+        )
+    flash(message, "success")
     return redirect(url_for("main.index"))
 
 
 @main_bp.route("/words/<int:word_id>/edit", methods=["GET", "POST"])
 @login_required
+@query_budget(8)
 def edit_word(word_id):
     """Edit a word."""
     word = Word.query.get_or_404(word_id)
-    categories = Category.query.all()
 
     if request.method == "POST":
+        partial = wants_partial()
         word_text = request.form.get("word", "").strip()
 
         if not word_text:
+            if partial:
+                return partial_response("Please enter a word.", "error", 400)
             flash("Please enter a word.", "error")
-            return render_template("edit_word.html", word=word, categories=categories)
+            return render_template(
+                "edit_word.html", word=word, categories=get_reference_data().categories
+            )
 
         # Check for duplicates (excluding current word)
         existing = check_duplicate_word_excluding(word_text, word_id)
         if existing:
-            flash(f'"{existing.word}" already exists.', "error")
-            return render_template("edit_word.html", word=word, categories=categories)
+            message = f'"{existing.word}" already exists.'
+            if partial:
+                return partial_response(message, "error", 409)
+            flash(message, "error")
+            return render_template(
+                "edit_word.html", word=word, categories=get_reference_data().categories
+            )
 
         # Get optional category
         category_id = request.form.get("category_id")
@@ -194,15 +425,21 @@ def edit_word(word_id):
         word.category_id = category_id
         db.session.commit()
 
-        flash(f'Updated "{word_text}" successfully!', "success")
+        message = f'Updated "{word_text}" successfully!'
+        if partial:
+            return partial_response(message, "success", word=_load_word(word_id))
+        flash(message, "success")
         return redirect(url_for("main.word_list"))
 
     # GET request - display edit form
-    return render_template("edit_word.html", word=word, categories=categories)
+    return render_template(
+        "edit_word.html", word=word, categories=get_reference_data().categories
+    )
 
 
 @main_bp.route("/words/<int:word_id>/delete", methods=["POST"])
 @login_required
+@query_budget(6)
 def delete_word(word_id):
     """Delete a word."""
     word = Word.query.get_or_404(word_id)
@@ -211,11 +448,61 @@ def delete_word(word_id):
     db.session.delete(word)
     db.session.commit()
 
-    flash(f'Deleted "{word_text}" from vocabulary.', "success")
+    message = f'Deleted "{word_text}" from vocabulary.'
+    if wants_partial():
+        return partial_response(
+            message, "success",
+            word_count=Word.query.count(),
+            deleted_id=word_id,
+            redirect=url_for("main.word_list"),
+        )
+    flash(message, "success")
     return redirect(url_for("main.word_list"))
 
 
+@main_bp.route("/events")
+@login_required
+@query_budget(4)
+def live_events():
+    """Stream word changes and counts to an open page as Server-Sent Events."""
+    config = current_app.config
+    hub = get_live_hub(current_app._get_current_object())
+    try:
+        cursor = hub.connect(config["LIVE_MAX_CLIENTS"])
+    except LiveHubFull:
+        response = make_response("Too many live connections; try again later.", 503)
+        response.headers["Retry-After"] = str(config.get("LIVE_STREAM_SECONDS", 300) // 10 or 1)
+        return response
+
+    backlog = []
+    last_id = parse_cursor(request.headers.get("Last-Event-ID", request.args.get("since")))
+    try:
+        if last_id is not None:
+            # Reconnect: replay what the client missed straight from the change log
+            backlog, cursor = catch_up(hub, last_id, config.get("LIVE_BACKLOG", 500))
+    except Exception:
+        hub.disconnect()
+        raise
+
+    response = Response(
+        stream_events(
+            hub, cursor, backlog,
+            heartbeat=config["LIVE_HEARTBEAT"],
+            lifetime=config.get("LIVE_STREAM_SECONDS", 300),
+        ),
+        mimetype="text/event-stream",
+    )
+    # Unregister even if the response is dropped before streaming starts
+    response.call_on_close(hub.disconnect)
+    response.headers["Cache-Control"] = "no-cache"
+    # Stop reverse proxies from buffering the stream
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
 @main_bp.route("/login", methods=["GET", "POST"])
+@rate_limit("10/minute", methods=["POST"])
+@query_budget(2)
 def login():
     """Handle user login."""
     # Redirect if already logged in
@@ -246,7 +533,7 @@ def login():
         return redirect(url_for("main.index"))
 
     # GET request - display login form
-    users = User.query.all()
+    users = get_reference_data().users
     return render_template("login.html", users=users)
 
 
@@ -0,0 +1,337 @@
+"""Slow query log with asynchronous EXPLAIN capture.
+
+Statements that run longer than ``SLOW_QUERY_THRESHOLD_MS`` are normalized
+(literals and placeholders collapsed to ``?``), fingerprinted and handed to a
+background thread. The thread aggregates identical shapes, captures a query
+plan once per shape (``EXPLAIN`` on Postgres, ``EXPLAIN QUERY PLAN`` on
+SQLite) on its own connection, and upserts one ``slow_queries`` row per
+shape. ``flask slow-queries`` summarizes the worst offenders.
+"""
+
+import hashlib
+import queue
+import re
+import threading
+import time
+from datetime import datetime, timezone
+
+from flask import has_request_context, request
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from app import db
+from app.models import SlowQuery
+
+_COMMENT_RE = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER_RE = re.compile(r"%\(\w+\)s|%s|(?<!:):\w+|\?|\$\d+")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE_RE = re.compile(r"\s+")
+
+EXPLAIN_PREFIXES = {
+    "sqlite": "EXPLAIN QUERY PLAN ",
+    "postgresql": "EXPLAIN ",
+}
+
+# Slow statements buffered for the recorder before new ones are dropped
+MAX_PENDING = 10000
+
+# Statements a plan can be captured for
+EXPLAINABLE = ("select", "insert", "update", "delete", "with")
+
+
+def normalize_sql(statement):
+    """Reduce a SQL statement to its shape.
+
+    Comments are dropped, string and numeric literals and driver placeholders
+    become ``?``, ``IN (?, ?, ...)`` lists collapse to ``IN (?...)`` and
+    whitespace is squeezed, so statements differing only in values share a
+    shape.
+    """
+    text = _COMMENT_RE.sub(" ", statement)
+    text = _STRING_RE.sub("?", text)
+    text = _PLACEHOLDER_RE.sub("?", text)
+    text = _NUMBER_RE.sub("?", text)
+    text = _IN_LIST_RE.sub("(?...)", text)
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+def fingerprint_sql(normalized):
+    """Return a stable fingerprint for a normalized statement."""
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+def _value_types(params):
+    if isinstance(params, dict):
+        return "{" + ", ".join(
+            f"{key}: {type(value).__name__}" for key, value in sorted(params.items())
+        ) + "}"
+    return "(" + ", ".join(type(value).__name__ for value in params) + ")"
+
+
+def param_shape(parameters, executemany=False):
+    """Describe bound parameters by type, without their values.
+
+    Args:
+        parameters: DBAPI parameters (sequence or mapping, or a list of them
+            for ``executemany``).
+        executemany: Whether ``parameters`` holds multiple parameter sets.
+
+    Returns:
+        A short string such as ``(int, str)`` or ``500 x {id: int}``.
+    """
+    if executemany:
+        if not parameters:
+            return "0 x ()"
+        return f"{len(parameters)} x {_value_types(parameters[0])}"
+    if not parameters:
+        return "()"
+    return _value_types(parameters)
+
+
+class SlowQueryLog:
+    """Detects slow statements on an engine and records them asynchronously."""
+
+    def __init__(self, app, engine, threshold_ms, explain=True, run_async=True):
+        self.logger = app.logger
+        self.engine = engine
+        self.threshold_ms = threshold_ms
+        self.explain = explain
+        self.run_async = run_async
+        self._queue = queue.Queue(maxsize=MAX_PENDING)
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self._reported = set()
+
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._slow_query_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_slow_query_started", None)
+        if started is None or context.execution_options.get("slow_query_log") is False:
+            return
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if elapsed_ms < self.threshold_ms or SlowQuery.__tablename__ in statement:
+            return
+        route = request.endpoint if has_request_context() else None
+        self.submit(statement, parameters, executemany, elapsed_ms, route)
+
+    def submit(self, statement, parameters, executemany, elapsed_ms, route=None):
+        """Queue one slow statement for recording; drops it if the queue is full."""
+        try:
+            self._queue.put_nowait({
+                "statement": statement,
+                "parameters": parameters,
+                "executemany": executemany,
+                "elapsed_ms": elapsed_ms,
+                "route": route,
+                "seen": datetime.now(timezone.utc),
+            })
+        except queue.Full:
+            return
+        if self.run_async:
+            self._ensure_thread()
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="slow-query-log", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            entries = [self._queue.get()]
+            entries.extend(self._drain())
+            try:
+                self._record(entries)
+            except Exception:
+                self.logger.exception("Failed to record slow queries")
+            finally:
+                for _ in entries:
+                    self._queue.task_done()
+
+    def _drain(self):
+        entries = []
+        while True:
+            try:
+                entries.append(self._queue.get_nowait())
+            except queue.Empty:
+                return entries
+
+    def flush(self):
+        """Record everything queued so far.
+
+        In async mode this waits for the background thread; otherwise the
+        pending entries are recorded in the calling thread.
+        """
+        if self.run_async:
+            self._queue.join()
+            return
+        entries = self._drain()
+        try:
+            if entries:
+                self._record(entries)
+        finally:
+            for _ in entries:
+                self._queue.task_done()
+
+    def _record(self, entries):
+        """Aggregate entries by shape and upsert them into ``slow_queries``."""
+        shapes = {}
+        for entry in entries:
+            normalized = normalize_sql(entry["statement"])
+            key = fingerprint_sql(normalized)
+            shape = shapes.get(key)
+            if shape is None:
+                shape = shapes[key] = {
+                    "normalized": normalized,
+                    "sample": entry,
+                    "calls": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                }
+            shape["calls"] += 1
+            shape["total_ms"] += entry["elapsed_ms"]
+            shape["max_ms"] = max(shape["max_ms"], entry["elapsed_ms"])
+            shape["last"] = entry
+
+        table = SlowQuery.__table__
+        try:
+            with self.engine.connect() as conn:
+                conn = conn.execution_options(slow_query_log=False)
+                for key, shape in shapes.items():
+                    self._upsert(conn, table, key, shape)
+                    conn.commit()
+        except SQLAlchemyError:
+            self.logger.exception("Could not write slow query log")
+
+    def _upsert(self, conn, table, key, shape):
+        sample = shape["sample"]
+        last = shape["last"]
+        existing = conn.execute(
+            select(table.c.calls, table.c.max_ms, table.c.plan).where(table.c.fingerprint == key)
+        ).first()
+
+        plan = None
+        if self.explain and (existing is None or existing.plan is None):
+            plan = self._explain(conn, sample)
+
+        if key not in self._reported:
+            self._reported.add(key)
+            self.logger.warning(
+                "Slow query %.1f ms on %s: %s params=%s%s",
+                shape["max_ms"],
+                last["route"] or "-",
+                shape["normalized"],
+                param_shape(sample["parameters"], sample["executemany"]),
+                f"\n{plan}" if plan else "",
+            )
+
+        if existing is None:
+            try:
+                conn.execute(insert(table).values(
+                    fingerprint=key,
+                    statement=shape["normalized"],
+                    param_shape=param_shape(sample["parameters"], sample["executemany"]),
+                    route=last["route"],
+                    calls=shape["calls"],
+                    total_ms=shape["total_ms"],
+                    max_ms=shape["max_ms"],
+                    plan=plan,
+                    first_seen=sample["seen"],
+                    last_seen=last["seen"],
+                ))
+                return
+            except IntegrityError:
+                # Another worker inserted the same shape first
+                conn.rollback()
+                existing = conn.execute(
+                    select(table.c.calls, table.c.max_ms, table.c.plan)
+                    .where(table.c.fingerprint == key)
+                ).first()
+
+        values = {
+            "calls": table.c.calls + shape["calls"],
+            "total_ms": table.c.total_ms + shape["total_ms"],
+            "max_ms": max(existing.max_ms, shape["max_ms"]),
+            "last_seen": last["seen"],
+        }
+        if last["route"]:
+            values["route"] = last["route"]
+        if plan and existing.plan is None:
+            values["plan"] = plan
+        conn.execute(update(table).where(table.c.fingerprint == key).values(**values))
+
+    def _explain(self, conn, entry):
+        """Capture the query plan for a sample statement, or None."""
+        statement = entry["statement"]
+        prefix = EXPLAIN_PREFIXES.get(conn.dialect.name)
+        if prefix is None or not statement.lstrip().lower().startswith(EXPLAINABLE):
+            return None
+
+        parameters = entry["parameters"]
+        if entry["executemany"]:
+            parameters = parameters[0] if parameters else ()
+        try:
+            with conn.begin_nested():
+                rows = conn.exec_driver_sql(prefix + statement, parameters).fetchall()
+        except SQLAlchemyError as exc:
+            return f"(plan unavailable: {exc.__class__.__name__})"
+
+        if conn.dialect.name == "sqlite":
+            # Rows are (id, parent, notused, detail); indent children under parents
+            depth = {0: -1}
+            lines = []
+            for row in rows:
+                level = depth.get(row[1], -1) + 1
+                depth[row[0]] = level
+                lines.append("  " * level + row[3])
+            return "\n".join(lines)
+        return "\n".join(row[0] for row in rows)
+
+
+def summarize_slow_queries(limit=10, sort="total"):
+    """Return the worst recorded statement shapes.
+
+    Args:
+        limit: Maximum number of shapes to return.
+        sort: ``total`` (total time), ``max`` (worst single run), ``calls``
+            or ``avg``.
+
+    Returns:
+        List of SlowQuery rows, worst first.
+    """
+    order = {
+        "total": SlowQuery.total_ms.desc(),
+        "max": SlowQuery.max_ms.desc(),
+        "calls": SlowQuery.calls.desc(),
+        "avg": (SlowQuery.total_ms / SlowQuery.calls).desc(),
+    }[sort]
+    return SlowQuery.query.order_by(order).limit(limit).all()
+
+
+def init_slow_query_log(app):
+    """Attach a slow query log to the app's engine if enabled."""
+    if not app.config.get("SLOW_QUERY_LOG_ENABLED", True):
+        return None
+
+    with app.app_context():
+        engine = db.engine
+    log = SlowQueryLog(
+        app,
+        engine,
+        threshold_ms=app.config.get("SLOW_QUERY_THRESHOLD_MS", 200),
+        explain=app.config.get("SLOW_QUERY_EXPLAIN", True),
+        run_async=app.config.get("SLOW_QUERY_ASYNC", True),
+    )
+    app.extensions["slow_query_log"] = log
+    return log
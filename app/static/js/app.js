@@ -0,0 +1,197 @@
+/*
+ * Progressive enhancement for the word forms.
+ *
+ * Forms marked with data-enhance are submitted with fetch and the server
+ * answers with a JSON delta (flash markup, the affected word's fragments and
+ * the updated count) that is patched into the page. Without JavaScript, or
+ * if the request fails, the forms post normally and the server redirects.
+ *
+ * Signed-in pages also subscribe to /events (Server-Sent Events) so words
+ * added, edited or deleted on another device appear without a reload.
+ */
+(function () {
+    "use strict";
+
+    var RECENT_LIMIT = 5;
+
+    function fragment(html) {
+        var template = document.createElement("template");
+        template.innerHTML = html.trim();
+        return template.content.firstElementChild;
+    }
+
+    function showFlash(data) {
+        var container = document.querySelector(".container");
+        var messages = container.querySelector(".flash-messages");
+        if (!messages) {
+            messages = document.createElement("div");
+            messages.className = "flash-messages";
+            container.insertBefore(messages, container.firstChild);
+        }
+        messages.replaceChildren(fragment(data.flash));
+    }
+
+    function updateCount(count) {
+        var number = document.querySelector(".word-count-number");
+        var label = document.querySelector(".word-count-label");
+        if (number) {
+            number.textContent = count;
+        }
+        if (label) {
+            label.textContent = (count === 1 ? "word" : "words") + " in Emily's vocabulary";
+        }
+    }
+
+    function addRecent(data) {
+        var section = document.querySelector(".recent-words-section");
+        if (!section || section.querySelector('[data-word-id="' + data.word.id + '"]')) {
+            return;
+        }
+        var list = section.querySelector(".recent-words-list");
+        list.insertBefore(fragment(data.html.recent), list.firstChild);
+        while (list.children.length > RECENT_LIMIT) {
+            list.removeChild(list.lastElementChild);
+        }
+        section.hidden = false;
+    }
+
+    function updateWordInput(data) {
+        var input = document.querySelector("#word");
+        if (input) {
+            input.value = data.word.word;
+        }
+    }
+
+    var handlers = {
+        "add-word": function (form, data) {
+            if (!data.ok) {
+                return;
+            }
+            updateCount(data.word_count);
+            addRecent(data);
+            form.reset();
+            form.querySelector("#word").focus();
+        },
+        "edit-word": function (form, data) {
+            if (data.ok) {
+                updateWordInput(data);
+            }
+        },
+        "delete-word": function (form, data) {
+            if (!data.ok) {
+                return;
+            }
+            document.querySelectorAll('[data-word-id="' + data.deleted_id + '"]')
+                .forEach(function (node) { node.remove(); });
+            updateCount(data.word_count);
+            var section = form.closest(".edit-section");
+            if (section) {
+                // Nothing left to edit; point back to the list
+                var link = document.createElement("a");
+                link.href = data.redirect;
+                link.className = "view-words-link";
+                link.textContent = "Back to Word List";
+                section.replaceChildren(link);
+            }
+        }
+    };
+
+    function submit(event) {
+        var form = event.target;
+        var kind = form.getAttribute("data-enhance");
+        if (!handlers[kind]) {
+            return;
+        }
+        event.preventDefault();
+
+        var buttons = form.querySelectorAll("button[type=submit]");
+        buttons.forEach(function (button) { button.disabled = true; });
+
+        fetch(form.action, {
+            method: "POST",
+            body: new FormData(form),
+            credentials: "same-origin",
+            headers: {
+                "Accept": "application/json",
+                "X-Requested-With": "XMLHttpRequest"
+            }
+        }).then(function (response) {
+            var type = response.headers.get("Content-Type") || "";
+            if (type.indexOf("application/json") === -1) {
+                throw new Error("Unexpected response");
+            }
+            return response.json();
+        }).then(function (data) {
+            showFlash(data);
+            handlers[kind](form, data);
+        }).catch(function () {
+            // Fall back to a normal form post
+            form.removeAttribute("data-enhance");
+            form.submit();
+        }).finally(function () {
+            buttons.forEach(function (button) { button.disabled = false; });
+        });
+    }
+
+    document.addEventListener("submit", submit);
+
+    // Live updates from other devices
+
+    function removeWord(id) {
+        document.querySelectorAll('[data-word-id="' + id + '"]')
+            .forEach(function (node) { node.remove(); });
+    }
+
+    function replaceWord(data) {
+        document.querySelectorAll('[data-word-id="' + data.word.id + '"]')
+            .forEach(function (node) {
+                var kind = node.tagName === "TR" ? "row"
+                    : node.tagName === "LI" ? "recent" : "card";
+                node.replaceWith(fragment(data.html[kind]));
+            });
+    }
+
+    function addToList(data) {
+        var rows = document.querySelector(".word-table tbody");
+        var cards = document.querySelector(".word-cards");
+        // Filtered or re-sorted lists may not include the word; leave them be
+        if (!rows || window.location.search ||
+                rows.querySelector('[data-word-id="' + data.word.id + '"]')) {
+            return;
+        }
+        rows.querySelectorAll(".no-words").forEach(function (node) {
+            node.closest("tr").remove();
+        });
+        cards.querySelectorAll(".no-words").forEach(function (node) { node.remove(); });
+        rows.insertBefore(fragment(data.html.row), rows.firstChild);
+        cards.insertBefore(fragment(data.html.card), cards.firstChild);
+    }
+
+    var liveHandlers = {
+        "word-added": function (data) {
+            addRecent(data);
+            addToList(data);
+        },
+        "word-edited": replaceWord,
+        "word-deleted": function (data) {
+            removeWord(data.word_id);
+        },
+        "count": function (data) {
+            updateCount(data.word_count);
+        },
+        "reset": function () {
+            window.location.reload();
+        }
+    };
+
+    var liveUrl = document.body.getAttribute("data-live");
+    if (liveUrl && window.EventSource) {
+        // EventSource reconnects on its own, sending Last-Event-ID
+        var source = new EventSource(liveUrl);
+        Object.keys(liveHandlers).forEach(function (name) {
+            source.addEventListener(name, function (event) {
+                liveHandlers[name](JSON.parse(event.data));
+            });
+        });
+    }
+}());
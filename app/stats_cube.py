@@ -0,0 +1,165 @@
+"""Word counts by month, user and category from one aggregate query.
+
+The stats page and ``/api/stats`` break the vocabulary down by month, by
+who added each word and by category, with subtotals for each dimension
+and a grand total. Each breakdown is a grouping set of the same scan:
+
+- (month, user, category): the cube's cells;
+- (month), (user), (category): one subtotal per dimension;
+- (): the total.
+
+PostgreSQL computes them all in one ``GROUP BY GROUPING SETS`` query,
+telling the sets apart with ``GROUPING()`` (``category_id`` is NULL both
+for uncategorized words and in subtotals where category is rolled up).
+SQLite has no grouping sets, so it runs the finest ``GROUP BY`` once and
+rolls the subtotals up from those cells in Python. There are only
+months x users x categories cells, so that costs little. Either way the
+result is cached until the ``words`` data version moves.
+"""
+
+import calendar
+from collections import defaultdict
+
+from sqlalchemy import extract, func, select, tuple_
+
+from app import db
+from app.cache import cached
+from app.changes import WORDS
+from app.models import Word
+
+# GROUPING() bits, first argument highest: set when a column is rolled up
+YEAR, MONTH, USER, CATEGORY = 8, 4, 2, 1
+CELL = 0
+BY_MONTH = USER | CATEGORY
+BY_USER = YEAR | MONTH | CATEGORY
+BY_CATEGORY = YEAR | MONTH | USER
+TOTAL = YEAR | MONTH | USER | CATEGORY
+
+
+def _dimensions():
+    return (
+        extract("year", Word.date_added),
+        extract("month", Word.date_added),
+        Word.user_id,
+        Word.category_id,
+    )
+
+
+def grouping_sets_statement():
+    """Build the PostgreSQL GROUPING SETS select behind ``load_grouping_sets``."""
+    year, month, user_id, category_id = dims = _dimensions()
+    return select(
+        func.grouping(*dims), year, month, user_id, category_id, func.count(Word.id)
+    ).group_by(func.grouping_sets(
+        tuple_(year, month, user_id, category_id),
+        tuple_(year, month),
+        tuple_(user_id),
+        tuple_(category_id),
+        tuple_(),
+    ))
+
+
+def load_grouping_sets():
+    """Return every grouping set's rows from one GROUPING SETS query (PostgreSQL).
+
+    Returns:
+        List of (grouping, year, month, user_id, category_id, count) tuples.
+    """
+    return [tuple(row) for row in db.session.execute(grouping_sets_statement())]
+
+
+def load_emulated():
+    """Return the same rows as ``load_grouping_sets`` from one GROUP BY (SQLite)."""
+    dims = _dimensions()
+    cells = db.session.execute(select(*dims, func.count(Word.id)).group_by(*dims)).all()
+
+    rollups = {BY_MONTH: defaultdict(int), BY_USER: defaultdict(int), BY_CATEGORY: defaultdict(int)}
+    total = 0
+    rows = []
+    for year, month, user_id, category_id, count in cells:
+        rows.append((CELL, year, month, user_id, category_id, count))
+        rollups[BY_MONTH][(year, month, None, None)] += count
+        rollups[BY_USER][(None, None, user_id, None)] += count
+        rollups[BY_CATEGORY][(None, None, None, category_id)] += count
+        total += count
+    for grouping, sums in rollups.items():
+        rows.extend((grouping, *key, count) for key, count in sums.items())
+    rows.append((TOTAL, None, None, None, None, total))
+    return rows
+
+
+def _month_key(year, month):
+    return f"{int(year):04d}-{int(month):02d}"
+
+
+def build_cube(rows):
+    """Arrange grouping set rows into the cube's sections.
+
+    Returns:
+        Dictionary with ``total``, ``cells`` (month, user and category
+        counts), ``by_month`` (oldest first, with running totals and month
+        names), ``by_user`` and ``by_category`` (largest first; a
+        ``category_id`` of None is uncategorized).
+    """
+    cube = {"total": 0, "cells": [], "by_month": [], "by_user": [], "by_category": []}
+    for grouping, year, month, user_id, category_id, count in rows:
+        if grouping == CELL:
+            cube["cells"].append({
+                "month": _month_key(year, month),
+                "user_id": user_id,
+                "category_id": category_id,
+                "count": count,
+            })
+        elif grouping == BY_MONTH:
+            cube["by_month"].append({
+                "month": _month_key(year, month),
+                "year": int(year),
+                "month_name": calendar.month_name[int(month)],
+                "count": count,
+            })
+        elif grouping == BY_USER:
+            cube["by_user"].append({"user_id": user_id, "count": count})
+        elif grouping == BY_CATEGORY:
+            cube["by_category"].append({"category_id": category_id, "count": count})
+        elif grouping == TOTAL:
+            cube["total"] = count
+
+    cube["cells"].sort(key=lambda c: (c["month"], c["user_id"], c["category_id"] is None, c["category_id"] or 0))
+    cube["by_month"].sort(key=lambda m: m["month"])
+    running_total = 0
+    for entry in cube["by_month"]:
+        running_total += entry["count"]
+        entry["running_total"] = running_total
+    for section in ("by_user", "by_category"):
+        cube[section].sort(key=lambda entry: -entry["count"])
+    return cube
+
+
+def load_stats_cube():
+    """Compute the cube with the database's best single aggregate."""
+    if db.session.get_bind().dialect.name == "postgresql":
+        return build_cube(load_grouping_sets())
+    return build_cube(load_emulated())
+
+
+@cached(versions=(WORDS,))
+def get_stats_cube():
+    """Return the stats cube, cached per ``words`` data version."""
+    return load_stats_cube()
+
+
+def with_names(cube, reference):
+    """Return a copy of the cube's sections with user and category names added."""
+    def named(entry):
+        entry = dict(entry)
+        if "user_id" in entry:
+            entry["user"] = reference.user_names.get(entry["user_id"])
+        if "category_id" in entry:
+            entry["category"] = reference.category_names.get(entry["category_id"])
+        return entry
+
+    return {
+        "total": cube["total"],
+        **{section: [named(entry) for entry in cube[section]]
+           for section in ("cells", "by_month", "by_user", "by_category")},
+    }
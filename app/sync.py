@@ -0,0 +1,221 @@
+"""Idempotent batch sync for words captured offline.
+
+Clients queue words while offline, each with a client-generated UUID and the
+time it was heard, and send them in one request when back online. The batch
+is classified in one set-based pass (one query for stored UUIDs and texts,
+one for referenced categories) and every accepted word is written in a
+single transaction. Replaying a batch is harmless: already-stored UUIDs come
+back as ``replayed`` with their server ids.
+"""
+
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, insert, or_
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.changes import INSERT, WORDS, latest_seq, record_changes, row_image
+from app.data_versions import bump_version
+from app.models import Category, Word
+
+# Per-item result statuses
+CREATED = "created"
+REPLAYED = "replayed"
+DUPLICATE = "duplicate"
+INVALID = "invalid"
+
+# Captured timestamps further in the future than this are rejected
+MAX_CLOCK_SKEW = timedelta(days=1)
+
+
+def normalize_word(text):
+    """Return the key used for duplicate detection (trimmed, lowercase)."""
+    return text.strip().lower()
+
+
+def _parse_item(item, now):
+    """Validate one incoming item.
+
+    Returns:
+        Tuple of (parsed dict, None) or (None, error message).
+    """
+    if not isinstance(item, dict):
+        return None, "Item must be an object."
+
+    client_id = item.get("client_id")
+    try:
+        client_id = str(uuid.UUID(str(client_id)))
+    except ValueError:
+        return None, "client_id must be a UUID."
+
+    word = item.get("word")
+    if not isinstance(word, str) or not word.strip():
+        return None, "word is required."
+    word = word.strip()
+    if len(word) > Word.word.type.length:
+        return None, "word is too long."
+
+    captured_at = item.get("captured_at")
+    if captured_at is None:
+        captured = now
+    else:
+        try:
+            captured = datetime.fromisoformat(str(captured_at))
+        except ValueError:
+            return None, "captured_at must be an ISO 8601 timestamp."
+        if captured.tzinfo is None:
+            captured = captured.replace(tzinfo=timezone.utc)
+        captured = captured.astimezone(timezone.utc)
+        if captured > now + MAX_CLOCK_SKEW:
+            return None, "captured_at is in the future."
+
+    category_id = item.get("category_id")
+    if category_id is not None and (
+        not isinstance(category_id, int) or isinstance(category_id, bool)
+    ):
+        return None, "category_id must be an integer."
+
+    return {
+        "client_id": client_id,
+        "word": word,
+        "key": normalize_word(word),
+        "captured_at": captured,
+        "category_id": category_id,
+    }, None
+
+
+def get_sync_cursor():
+    """Return the server's current sync position as an opaque string.
+
+    This is the newest change log sequence number; ``/api/changes`` accepts
+    it as ``since``.
+    """
+    return str(latest_seq())
+
+
+def _classify(parsed, user_id, now):
+    """Split parsed items into results and the rows to insert.
+
+    Results for created rows (and in-batch repeats of them) carry the new
+    row's ``client_id`` in ``pending`` until its id is known.
+    """
+    client_ids = {item["client_id"] for item in parsed}
+    keys = {item["key"] for item in parsed}
+
+    by_client_id = {}
+    by_key = {}
+    if parsed:
+        stored = db.session.query(Word.id, Word.word, Word.client_id).filter(
+            or_(Word.client_id.in_(client_ids), func.lower(Word.word).in_(keys))
+        )
+        for word_id, word, client_id in stored:
+            if client_id is not None:
+                by_client_id[client_id] = ("id", word_id, word)
+            by_key.setdefault(normalize_word(word), ("id", word_id, word))
+
+    category_ids = {item["category_id"] for item in parsed if item["category_id"] is not None}
+    known_categories = set()
+    if category_ids:
+        known_categories = {
+            row[0] for row in db.session.query(Category.id).filter(Category.id.in_(category_ids))
+        }
+
+    results = []
+    rows = []
+    for item in parsed:
+        result = {"client_id": item["client_id"], "word": item["word"]}
+        match = by_client_id.get(item["client_id"])
+        status = REPLAYED
+        if match is None:
+            match = by_key.get(item["key"])
+            status = DUPLICATE
+        if match is not None:
+            result["status"] = status
+            field, value, result["word"] = match
+            result[field] = value
+        elif item["category_id"] is not None and item["category_id"] not in known_categories:
+            result["status"] = INVALID
+            result["error"] = "Unknown category_id."
+        else:
+            rows.append({
+                "word": item["word"],
+                "user_id": user_id,
+                "category_id": item["category_id"],
+                "client_id": item["client_id"],
+                "date_added": item["captured_at"],
+                "created_at": now,
+                "updated_at": now,
+            })
+            result["status"] = CREATED
+            result["pending"] = item["client_id"]
+            # Later items in this batch with the same UUID or text match this one
+            by_client_id[item["client_id"]] = ("pending", item["client_id"], item["word"])
+            by_key[item["key"]] = ("pending", item["client_id"], item["word"])
+        results.append(result)
+
+    return results, rows
+
+
+def apply_sync_batch(items, user_id):
+    """Classify and store a batch of offline-captured words.
+
+    Args:
+        items: List of dicts with ``client_id`` (UUID string), ``word``,
+            optional ``captured_at`` (ISO 8601) and optional ``category_id``.
+        user_id: ID of the user syncing the words.
+
+    Returns:
+        Tuple of (results, cursor). ``results`` has one dict per input item,
+        in order, with ``client_id``, ``status`` (created, replayed,
+        duplicate or invalid), ``id`` and ``word`` (or ``error``).
+    """
+    now = datetime.now(timezone.utc)
+    results = [None] * len(items)
+    parsed = []
+    positions = []
+    for index, item in enumerate(items):
+        item_data, error = _parse_item(item, now)
+        if error:
+            client_id = item.get("client_id") if isinstance(item, dict) else None
+            results[index] = {"client_id": client_id, "status": INVALID, "error": error}
+        else:
+            parsed.append(item_data)
+            positions.append(index)
+
+    for attempt in range(2):
+        classified, rows = _classify(parsed, user_id, now)
+        for index, result in zip(positions, classified):
+            results[index] = result
+        if not rows:
+            break
+
+        try:
+            # One executemany for the whole batch, then one query for the new ids
+            db.session.execute(insert(Word.__table__), rows)
+            new_ids = dict(
+                db.session.query(Word.client_id, Word.id).filter(
+                    Word.client_id.in_([row["client_id"] for row in rows])
+                )
+            )
+            # Core inserts bypass the session hooks, so log them here
+            record_changes(
+                (INSERT, new_ids[row["client_id"]],
+                 row_image(dict(row, id=new_ids[row["client_id"]])))
+                for row in rows
+            )
+            bump_version(WORDS)
+        except IntegrityError:
+            # A concurrent sync stored some of these UUIDs first; reclassify once
+            db.session.rollback()
+            if attempt:
+                raise
+            continue
+
+        db.session.commit()
+        for result in classified:
+            if "pending" in result:
+                result["id"] = new_ids[result.pop("pending")]
+        break
+
+    return results, get_sync_cursor()
@@ -0,0 +1,322 @@
+"""Per-client rate limits and load shedding for expensive routes.
+
+Views declare a token-bucket limit with ``@rate_limit("10/minute")`` (or
+through the ``RATE_LIMITS`` config mapping, which takes precedence; ``None``
+lifts a limit). Each client gets its own bucket per endpoint: the user id
+when logged in, otherwise the client IP. A bucket holds up to ``burst``
+tokens (the limit's count by default) and refills at the limit's rate; a
+request that finds it empty gets 429 with ``Retry-After`` set to when a
+token will be back.
+
+Buckets live in process memory by default, so each worker limits on its
+own. ``RATE_LIMIT_STORAGE=sqlite:///path`` keeps them in a small SQLite
+file instead, shared by every worker on the host.
+
+Rate-limited routes are also the ones shed under load: when a worker has
+more than ``LOAD_SHED_MAX_INFLIGHT`` requests in flight, or a request
+waited longer than ``LOAD_SHED_MAX_QUEUE_MS`` in front of the app (from
+the proxy's ``X-Request-Start`` header), they answer 503 with
+``Retry-After`` while every other route keeps being served. ``/healthz``
+never touches the database and is never limited.
+"""
+
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+from flask import current_app, g, jsonify, request
+from flask_login import current_user
+
+# Seconds per rate unit
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+RateLimit = namedtuple("RateLimit", ["count", "period", "burst", "methods"])
+
+
+def parse_rate(value):
+    """Parse a rate like ``10/minute`` into (count, period seconds).
+
+    Raises:
+        ValueError: If the rate is malformed.
+    """
+    count, _, unit = str(value).partition("/")
+    unit = unit.strip().rstrip("s")
+    if not count.strip().isdigit() or int(count) < 1 or unit not in PERIODS:
+        raise ValueError(f"Invalid rate limit {value!r}; expected e.g. '10/minute'.")
+    return int(count), PERIODS[unit]
+
+
+def rate_limit(rate, burst=None, methods=None):
+    """Declare a per-client token-bucket limit for a view.
+
+    Args:
+        rate: Sustained rate, e.g. ``"10/minute"``.
+        burst: Requests allowed back to back (defaults to the rate's count).
+        methods: HTTP methods the limit applies to (defaults to all).
+    """
+    count, period = parse_rate(rate)
+    limit = RateLimit(count, period, burst or count, frozenset(methods) if methods else None)
+
+    def decorator(view):
+        view.rate_limit = limit
+        return view
+    return decorator
+
+
+def get_rate_limit(endpoint):
+    """Return the RateLimit for an endpoint, or None if it has none."""
+    overrides = current_app.config.get("RATE_LIMITS") or {}
+    if endpoint in overrides:
+        value = overrides[endpoint]
+        if value is None:
+            return None
+        count, period = parse_rate(value)
+        return RateLimit(count, period, count, None)
+    view = current_app.view_functions.get(endpoint)
+    return getattr(view, "rate_limit", None)
+
+
+def refill(tokens, updated, now, rate, capacity):
+    """Return a bucket's tokens after refilling from ``updated`` to ``now``."""
+    return min(capacity, tokens + max(0.0, now - updated) * rate)
+
+
+class MemoryBuckets:
+    """Token buckets in this process's memory."""
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, capacity, now):
+        """Take one token from a bucket.
+
+        Args:
+            key: Bucket key (endpoint and client).
+            rate: Tokens added per second.
+            capacity: Bucket size.
+            now: Current time in seconds.
+
+        Returns:
+            Seconds until a token is available: 0 if one was taken.
+        """
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = refill(tokens, updated, now, rate, capacity)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                wait = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (1 - tokens) / rate
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+            return wait
+
+    def _prune(self, now):
+        # Drop the buckets idle longest; a missing bucket counts as full
+        by_age = sorted(self._buckets, key=lambda k: self._buckets[k][1])
+        for key in by_age[: len(by_age) - self.max_keys // 2]:
+            del self._buckets[key]
+
+
+class SQLiteBuckets:
+    """Token buckets in a SQLite file shared by every worker on the host."""
+
+    def __init__(self, path, idle_seconds=86400):
+        self.path = path
+        self.idle_seconds = idle_seconds
+        self.takes = 0
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets "
+                "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+        return conn
+
+    def take(self, key, rate, capacity, now):
+        """Take one token from a bucket; see ``MemoryBuckets.take``."""
+        conn = self._connect()
+        # IMMEDIATE takes the write lock up front, so concurrent workers
+        # read-modify-write one bucket in turn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT tokens, updated FROM buckets WHERE key = ?", (key,)
+            ).fetchone()
+            tokens = refill(*(row or (capacity, now)), now, rate, capacity)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+            if not wait:
+                tokens -= 1
+            conn.execute(
+                "INSERT INTO buckets (key, tokens, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                (key, tokens, now),
+            )
+            self.takes += 1
+            if self.takes % 1000 == 0:
+                conn.execute("DELETE FROM buckets WHERE updated < ?", (now - self.idle_seconds,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+
+def create_buckets(storage):
+    """Build bucket storage from a ``RATE_LIMIT_STORAGE`` value.
+
+    Raises:
+        ValueError: If the storage URL is not ``memory`` or ``sqlite:///path``.
+    """
+    if not storage or storage == "memory":
+        return MemoryBuckets()
+    if storage.startswith("sqlite:///"):
+        return SQLiteBuckets(storage[len("sqlite:///"):])
+    raise ValueError(f"Unsupported RATE_LIMIT_STORAGE {storage!r}.")
+
+
+def queue_wait(header, now):
+    """Return seconds since an ``X-Request-Start`` stamp, or None.
+
+    Accepts ``t=`` prefixed or bare stamps in seconds, milliseconds or
+    microseconds since the epoch, as nginx, Heroku-style routers and
+    HAProxy send them.
+    """
+    if not header:
+        return None
+    try:
+        stamp = float(header.strip().removeprefix("t="))
+    except ValueError:
+        return None
+    if stamp > 1e14:
+        stamp /= 1e6
+    elif stamp > 1e11:
+        stamp /= 1e3
+    return max(0.0, now - stamp)
+
+
+class Throttle:
+    """A worker's rate limit buckets and in-flight request count."""
+
+    def __init__(self, buckets, max_inflight=0, max_queue_ms=0, retry_after=5, clock=time.time):
+        self.buckets = buckets
+        self.max_inflight = max_inflight
+        self.max_queue_ms = max_queue_ms
+        self.retry_after = retry_after
+        self.clock = clock
+        self.in_flight = 0
+        self.limited = 0
+        self.shed = 0
+        self._lock = threading.Lock()
+
+    def enter(self):
+        """Count a request as in flight."""
+        with self._lock:
+            self.in_flight += 1
+
+    def leave(self):
+        """Count a request as finished."""
+        with self._lock:
+            self.in_flight -= 1
+
+    def overloaded(self, request_start=None):
+        """Return True if expensive requests should be shed right now."""
+        if self.max_inflight and self.in_flight > self.max_inflight:
+            return True
+        if self.max_queue_ms:
+            waited = queue_wait(request_start, self.clock())
+            if waited is not None and waited * 1000 > self.max_queue_ms:
+                return True
+        return False
+
+    def take(self, key, limit):
+        """Take a token for ``key`` under ``limit``; return seconds to wait (0 if allowed)."""
+        return self.buckets.take(key, limit.count / limit.period, limit.burst, self.clock())
+
+
+def client_key():
+    """Identify the client: its user id when logged in, else its IP address."""
+    if current_user.is_authenticated:
+        return f"user:{current_user.get_id()}"
+    return f"ip:{request.remote_addr}"
+
+
+def _reject(status, retry_after, message):
+    if request.blueprint == "api" or request.accept_mimetypes.best == "application/json":
+        response = jsonify(error=message)
+    else:
+        response = current_app.response_class(message, mimetype="text/plain")
+    response.status_code = status
+    response.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def _check_request():
+    throttle = current_app.extensions["throttle"]
+    throttle.enter()
+    g._throttle_entered = True
+
+    limit = get_rate_limit(request.endpoint)
+    if limit is None or (limit.methods and request.method not in limit.methods):
+        return None
+
+    if throttle.overloaded(request.headers.get("X-Request-Start")):
+        throttle.shed += 1
+        return _reject(503, throttle.retry_after, "The server is busy. Please try again shortly.")
+
+    wait = throttle.take(f"{request.endpoint}:{client_key()}", limit)
+    if wait:
+        throttle.limited += 1
+        return _reject(429, wait, "Too many requests. Please slow down.")
+    return None
+
+
+def _leave(exc):
+    if g.pop("_throttle_entered", False):
+        current_app.extensions["throttle"].leave()
+
+
+def healthz():
+    """Report that this worker is up, without touching the database."""
+    throttle = current_app.extensions["throttle"]
+    return jsonify(
+        status="ok",
+        in_flight=throttle.in_flight,
+        shedding=throttle.overloaded(),
+    )
+
+
+def init_throttling(app):
+    """Enforce declared rate limits and shed load on the app's requests.
+
+    ``/healthz`` is registered either way. Limits and shedding do nothing
+    when ``RATE_LIMITS_ENABLED`` is false.
+    """
+    app.extensions["throttle"] = Throttle(
+        create_buckets(app.config.get("RATE_LIMIT_STORAGE")),
+        max_inflight=app.config.get("LOAD_SHED_MAX_INFLIGHT", 0),
+        max_queue_ms=app.config.get("LOAD_SHED_MAX_QUEUE_MS", 0),
+        retry_after=app.config.get("LOAD_SHED_RETRY_AFTER", 5),
+    )
+    app.add_url_rule("/healthz", "healthz", healthz)
+
+    if not app.config.get("RATE_LIMITS_ENABLED", True):
+        return
+    app.before_request(_check_request)
+    app.teardown_request(_leave)
@@ -0,0 +1,116 @@
+"""When each vocabulary milestone and round number was reached.
+
+A running count over ``date_added`` (``ROW_NUMBER()`` in date order) gives
+every word its position in the vocabulary; the date of the word at position
+N is the date N words were reached. One window-function query returns just
+the rows at the thresholds of interest, so the timeline costs a single round
+trip however many words there are. It works on SQLite (3.25+) and Postgres
+and is cached until the ``words`` data version moves.
+"""
+
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import func, select
+
+from app import db
+from app.cache import cached
+from app.changes import WORDS
+from app.milestones import MILESTONES
+from app.models import Word
+from app.utils import calculate_age_months, parse_birthdate
+
+# Round-number thresholds follow a 1-2.5-5 series up to this many words
+MAX_ROUND_NUMBER = 10_000_000
+
+
+def round_numbers(limit=MAX_ROUND_NUMBER):
+    """Return the round-number thresholds: 10, 25, 50, 100, 250, 500, 1000, ..."""
+    numbers = []
+    scale = 10
+    while scale <= limit:
+        numbers.extend(n for n in (scale, scale * 5 // 2, scale * 5) if n <= limit)
+        scale *= 10
+    return numbers
+
+
+def load_crossings(thresholds):
+    """Return the date each threshold word count was reached.
+
+    Args:
+        thresholds: Word counts to look up.
+
+    Returns:
+        Dictionary mapping each reached threshold to the datetime of the
+        word that reached it.
+    """
+    running = select(
+        Word.date_added,
+        func.row_number().over(order_by=(Word.date_added, Word.id)).label("position"),
+    ).subquery()
+    rows = db.session.execute(
+        select(running.c.position, running.c.date_added)
+        .where(running.c.position.in_(sorted(set(thresholds))))
+    )
+    return {position: date_added for position, date_added in rows}
+
+
+def build_timeline(crossings, birthdate=None):
+    """Turn threshold crossings into timeline entries.
+
+    Every milestone is listed, reached or not. Round numbers are listed once
+    reached, plus the next one to aim for.
+
+    Args:
+        crossings: Mapping of word count to the datetime it was reached.
+        birthdate: Child's birthdate (date), for the age at each crossing.
+
+    Returns:
+        List of dictionaries ordered by word count, each with ``words``,
+        ``label``, ``milestone`` (the MILESTONES entry or None),
+        ``reached_on`` (date or None), ``age_months`` (or None) and, for
+        milestones, ``on_time`` (reached by the milestone's age).
+    """
+    milestones = {}
+    for milestone in MILESTONES:
+        milestones.setdefault(milestone["min_words"], milestone)
+
+    numbers = set(milestones)
+    next_round = None
+    for number in round_numbers():
+        if number in crossings:
+            numbers.add(number)
+        elif next_round is None:
+            next_round = number
+            numbers.add(number)
+
+    timeline = []
+    for words in sorted(numbers):
+        reached = crossings.get(words)
+        reached_on = reached.date() if isinstance(reached, datetime) else reached
+        age_months = None
+        if reached_on is not None and birthdate is not None:
+            age_months = calculate_age_months(birthdate, reached_on)
+        milestone = milestones.get(words)
+        entry = {
+            "words": words,
+            "label": f"{words} word{'s' if words != 1 else ''}",
+            "milestone": milestone,
+            "reached_on": reached_on,
+            "age_months": age_months,
+        }
+        if milestone is not None:
+            entry["on_time"] = age_months is not None and age_months <= milestone["age_months"]
+        timeline.append(entry)
+    return timeline
+
+
+@cached(versions=(WORDS,))
+def _timeline(birthdate):
+    thresholds = [m["min_words"] for m in MILESTONES] + round_numbers()
+    return build_timeline(load_crossings(thresholds), birthdate)
+
+
+def get_milestone_timeline():
+    """Return the current app's timeline, cached per ``words`` data version."""
+    return _timeline(parse_birthdate(current_app.config.get("BABY_BIRTHDATE")))
@@ -1,10 +1,12 @@
 """Utility functions for Emily Word Tracker."""
 
 import calendar
-from datetime import date
+from datetime import date, datetime, timedelta
 
 from sqlalchemy import extract, func
 
+from app.cache import cached
+from app.changes import WORDS
 from app.models import Word
 from app.milestones import get_milestone_for_age as _get_milestone_for_age
 
@@ -64,6 +66,23 @@ def calculate_age_months(birthdate, reference_date=None):
     return max(0, months)
 
 
+def parse_birthdate(value):
+    """Parse a ``BABY_BIRTHDATE`` setting (YYYY-MM-DD).
+
+    Args:
+        value: Configured value (string, date or None).
+
+    Returns:
+        The birthdate as a date, or None if unset or invalid.
+    """
+    if isinstance(value, date):
+        return value
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date() if value else None
+    except ValueError:
+        return None
+
+
 def get_milestone_for_age(months):
     """Get the developmental milestone for a given age.
 
@@ -78,6 +97,49 @@ def get_milestone_for_age(months):
     return _get_milestone_for_age(months)
 
 
+def parse_date_range(args):
+    """Read an inclusive ``from``/``to`` date range from request arguments.
+
+    Args:
+        args: Request arguments (``request.args``).
+
+    Returns:
+        Tuple of (start, end) dates; either is None when missing or not a
+        valid YYYY-MM-DD date.
+    """
+    bounds = []
+    for name in ("from", "to"):
+        try:
+            bounds.append(date.fromisoformat(args.get(name, "")))
+        except ValueError:
+            bounds.append(None)
+    return tuple(bounds)
+
+
+def filter_date_range(query, start=None, end=None):
+    """Limit a Word query to words added between two dates (inclusive).
+
+    Bounds are compared against ``date_added`` directly so the date indexes
+    can serve the range.
+
+    Args:
+        query: Query or Select over Word.
+        start: First date to include, or None.
+        end: Last date to include, or None. ``date.max`` includes every
+            date, so it adds no bound.
+
+    Returns:
+        The filtered query.
+    """
+    if start is not None:
+        query = query.filter(Word.date_added >= datetime.combine(start, datetime.min.time()))
+    if end is not None and end < date.max:
+        query = query.filter(
+            Word.date_added < datetime.combine(end + timedelta(days=1), datetime.min.time())
+        )
+    return query
+
+
 def group_words_by_month(words):
     """Group a list of words by the month they were added.
 
@@ -97,9 +159,12 @@ def group_words_by_month(words):
     return grouped
 
 
+@cached(versions=(WORDS,))
 def get_monthly_stats():
     """Get word counts grouped by month with running totals.
 
+    Cached per ``words`` data version; treat the result as read-only.
+
     Returns:
         List of dictionaries with year, month, month_name, count, running_total.
         Sorted from oldest to newest.
@@ -0,0 +1,167 @@
+"""Worker warm-up before taking traffic, and the ``/readyz`` readiness check.
+
+A fresh worker pays for opening database connections, compiling every
+Jinja template and running cold queries on its first requests. Warm-up
+does that work up front:
+
+- opens ``WARMUP_POOL_CONNECTIONS`` pool connections at once, so they
+  stay pooled;
+- compiles every HTML template into the environment's cache;
+- loads the reference data cache (categories and users);
+- runs the stats page's queries and primes the milestone timeline and
+  growth series caches.
+
+Under gunicorn, ``gunicorn.conf.py`` runs it in ``post_worker_init``, so
+it finishes before the worker accepts connections. Under any other server
+the first request (or readiness probe) runs it. Each step's duration is
+logged. ``/readyz`` answers 503 until warm-up has finished, then 200 with
+the timings. A failed warm-up is logged and retried on a later request.
+"""
+
+import threading
+import time
+
+from flask import current_app, jsonify, request
+
+from app import db
+
+# Seconds before a failed warm-up is tried again
+RETRY_SECONDS = 5
+
+COLD, WARMING, READY, FAILED = "cold", "warming", "ready", "failed"
+
+
+def warm_pool(app):
+    """Open the configured number of pool connections at once, then return them."""
+    engine = db.engine
+    wanted = app.config.get("WARMUP_POOL_CONNECTIONS", 2)
+    size = getattr(engine.pool, "size", None)
+    if callable(size):
+        wanted = min(wanted, size())
+    connections = []
+    try:
+        for _ in range(max(1, wanted)):
+            connection = engine.connect()
+            connections.append(connection)
+            connection.exec_driver_sql("SELECT 1")
+    finally:
+        for connection in connections:
+            connection.close()
+    return len(connections)
+
+
+def warm_templates(app):
+    """Compile every HTML template into the Jinja environment's cache."""
+    names = [name for name in app.jinja_env.list_templates() if name.endswith(".html")]
+    for name in names:
+        app.jinja_env.get_template(name)
+    return len(names)
+
+
+def warm_reference_data(app):
+    """Load categories and users into the reference data cache."""
+    from app.reference_data import get_reference_data
+
+    reference = get_reference_data()
+    return len(reference.categories) + len(reference.users)
+
+
+def warm_stats(app):
+    """Run the stats page's queries and prime its cached series."""
+    from app.growth import get_growth_series
+    from app.stats_cube import get_stats_cube
+    from app.timeline import get_milestone_timeline
+
+    total = get_stats_cube()["total"]
+    get_milestone_timeline()
+    get_growth_series()
+    return total
+
+
+# Step name -> function(app) returning a count for the log
+STEPS = (
+    ("pool", warm_pool),
+    ("templates", warm_templates),
+    ("reference_data", warm_reference_data),
+    ("stats", warm_stats),
+)
+
+
+class WarmUp:
+    """One worker's warm-up state."""
+
+    def __init__(self, app, enabled=True):
+        self.app = app
+        self.state = COLD if enabled else READY
+        self.timings = {}
+        self.total_ms = None
+        self.error = None
+        self._failed_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return self.state == READY
+
+    def run(self):
+        """Warm the worker up unless it already is; returns True when ready."""
+        if self.state == READY:
+            return True
+        with self._lock:
+            if self.state == READY:
+                return True
+            if self._failed_at is not None and time.monotonic() - self._failed_at < RETRY_SECONDS:
+                return False
+            self.state = WARMING
+            started = time.perf_counter()
+            try:
+                # A fresh app context: the work is not charged to a request
+                with self.app.app_context():
+                    for name, step in STEPS:
+                        step_started = time.perf_counter()
+                        count = step(self.app)
+                        self.timings[name] = round((time.perf_counter() - step_started) * 1000, 1)
+                        self.app.logger.info("Warm-up %s: %s in %.1f ms", name, count, self.timings[name])
+            except Exception as exc:
+                self.state = FAILED
+                self.error = str(exc)
+                self._failed_at = time.monotonic()
+                self.app.logger.exception("Warm-up failed")
+                return False
+            self.total_ms = round((time.perf_counter() - started) * 1000, 1)
+            self.state = READY
+            self.error = None
+            self.app.logger.info("Warm-up finished in %.1f ms", self.total_ms)
+            return True
+
+
+def warm_up(app):
+    """Warm up ``app`` now (gunicorn's ``post_worker_init`` calls this)."""
+    return app.extensions["warmup"].run()
+
+
+def _warm_before_request():
+    warmup = current_app.extensions["warmup"]
+    if not warmup.ready and request.endpoint != "healthz":
+        warmup.run()
+
+
+def readyz():
+    """Report whether this worker has finished warming up."""
+    warmup = current_app.extensions["warmup"]
+    if not warmup.ready:
+        return jsonify(status=warmup.state, error=warmup.error), 503
+    return jsonify(status=READY, warmup_ms=warmup.total_ms, steps=warmup.timings)
+
+
+def init_warmup(app):
+    """Register warm-up and ``/readyz`` on the app.
+
+    With ``WARMUP_ENABLED`` false the worker counts as ready at once.
+    """
+    warmup = WarmUp(app, enabled=app.config.get("WARMUP_ENABLED", True))
+    app.extensions["warmup"] = warmup
+    app.add_url_rule("/readyz", "readyz", readyz)
+    if not warmup.ready:
+        app.before_request(_warm_before_request)
+    return warmup
@@ -0,0 +1,109 @@
+"""Benchmark word additions with and without group commit.
+
+Runs concurrent writer threads against a file-backed SQLite database (or
+``DATABASE_URL``) and reports throughput and latency percentiles for the
+per-request commit path and the group-commit path.
+
+Usage:
+    python -m benchmarks.group_commit --threads 16 --adds 50
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+
+def percentile(values, pct):
+    """Return the pct-th percentile of a list of numbers."""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def run_writers(threads, adds, add):
+    """Run ``threads`` writers each calling ``add(word)`` ``adds`` times."""
+    latencies = []
+    lock = threading.Lock()
+    errors = []
+
+    def writer(thread_index):
+        local = []
+        for i in range(adds):
+            started = time.perf_counter()
+            try:
+                add(f"bench-{thread_index}-{i}-{time.perf_counter_ns()}")
+            except Exception as exc:
+                errors.append(repr(exc))
+                continue
+            local.append((time.perf_counter() - started) * 1000)
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=writer, args=(t,)) for t in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        "adds": len(latencies),
+        "errors": len(errors),
+        "seconds": round(elapsed, 3),
+        "adds_per_second": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 2) if latencies else None,
+        "p95_ms": round(percentile(latencies, 95), 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99), 2) if latencies else None,
+        "mean_ms": round(statistics.mean(latencies), 2) if latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--adds", type=int, default=50, help="Adds per thread.")
+    parser.add_argument("--window-ms", type=float, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-group-commit-")
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{workdir}/bench.db")
+
+    from app import create_app, db
+    from app.group_commit import GroupCommitter
+    from app.models import User, Word
+
+    app = create_app("development")
+    with app.app_context():
+        user_id = User.query.filter_by(username="nick").first().id
+
+    def direct_add(word):
+        with app.app_context():
+            db.session.add(Word(word=word, user_id=user_id))
+            db.session.commit()
+
+    committer = GroupCommitter(app, window_ms=args.window_ms)
+
+    def grouped_add(word):
+        committer.add_word(word, user_id)
+
+    report = {
+        "threads": args.threads,
+        "adds_per_thread": args.adds,
+        "window_ms": args.window_ms,
+        "per_request_commit": run_writers(args.threads, args.adds, direct_add),
+        "group_commit": run_writers(args.threads, args.adds, grouped_add),
+    }
+    report["group_commit"]["batches"] = committer.batches
+    report["group_commit"]["mean_batch_size"] = round(
+        committer.items / committer.batches, 1
+    ) if committer.batches else 0
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Measure worker and CLI startup with ``python -X importtime``.
+
+Runs each startup scenario in fresh interpreters and reports, for each
+one, the median total import time and wall time. It also lists the
+slowest top-level imports and which of the deliberately lazy modules
+(Flask-Migrate and Alembic, bcrypt, the CSV export) were loaded. The
+scenarios are:
+
+- ``worker``: importing ``run`` as gunicorn does, which creates the app;
+- ``cli``: ``flask routes``, a CLI command that never touches migrations;
+- ``migrate``: ``flask db --help``, which has to load Flask-Migrate.
+
+``--budget-ms`` sets an import-time budget for the worker. The command
+exits with status 1 when the worker's median total is over it, so CI can
+track startup the same way it tracks tests.
+
+Usage:
+    python -m benchmarks.import_time --runs 7 --budget-ms 400
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = {
+    "worker": ["-c", "import run"],
+    "cli": ["-m", "flask", "--app", "run", "routes"],
+    "migrate": ["-m", "flask", "--app", "run", "db", "--help"],
+}
+
+# Modules startup should only load when a request or command needs them
+LAZY_MODULES = ("flask_migrate", "alembic", "bcrypt", "app.export")
+
+
+def parse_importtime(stderr):
+    """Parse ``-X importtime`` output into (module, depth, self_us, cumulative_us) rows."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return rows
+
+
+def run_scenario(args, env):
+    """Start one interpreter with ``-X importtime``; returns (wall ms, import rows)."""
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    if completed.returncode != 0:
+        raise SystemExit(f"{' '.join(args)} failed:\n{completed.stderr[-2000:]}")
+    return wall_ms, parse_importtime(completed.stderr)
+
+
+def summarize(runs, top):
+    """Summarize a scenario's runs: medians, slowest top-level imports and lazy modules."""
+    totals = [sum(row[2] for row in rows) / 1000 for _, rows in runs]
+    last_rows = runs[-1][1]
+    top_level = sorted((row for row in last_rows if row[1] == 0), key=lambda row: -row[3])
+    loaded = {row[0] for row in last_rows}
+    return {
+        "runs": len(runs),
+        "import_ms": round(statistics.median(totals), 1),
+        "wall_ms": round(statistics.median(wall for wall, _ in runs), 1),
+        "modules": len(last_rows),
+        "slowest": [{"module": name, "cumulative_ms": round(cumulative / 1000, 1)}
+                    for name, _, _, cumulative in top_level[:top]],
+        "lazy_loaded": [name for name in LAZY_MODULES if name in loaded],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="Interpreters per scenario (median reported).")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help="Comma-separated scenarios to run.")
+    parser.add_argument("--top", type=int, default=10, help="Slowest top-level imports to list.")
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="Fail when the worker's median import time is over this.")
+    parser.add_argument("--output", help="Also write the JSON report to this file.")
+    args = parser.parse_args()
+
+    # A seeded SQLite file, so startup does not hash the seed users' passwords
+    workdir = tempfile.mkdtemp(prefix="bench-import-")
+    env = dict(os.environ, FLASK_ENV="development",
+               DATABASE_URL=f"sqlite:///{workdir}/startup.db")
+    subprocess.run([sys.executable, "-c", "import run"], cwd=ROOT, env=env, check=True,
+                   stdout=subprocess.DEVNULL)
+
+    report = {"python": sys.version.split()[0], "scenarios": {}}
+    for name in args.scenarios.split(","):
+        runs = [run_scenario(SCENARIOS[name], env) for _ in range(args.runs)]
+        report["scenarios"][name] = summarize(runs, args.top)
+        print(f"{name:>8}: imports {report['scenarios'][name]['import_ms']} ms, "
+              f"wall {report['scenarios'][name]['wall_ms']} ms", file=sys.stderr)
+
+    worker = report["scenarios"].get("worker")
+    if args.budget_ms is not None and worker is not None:
+        report["budget"] = {"import_ms": args.budget_ms, "within": worker["import_ms"] <= args.budget_ms}
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as stream:
+            stream.write(output + "\n")
+    print(output)
+    if report.get("budget") and not report["budget"]["within"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
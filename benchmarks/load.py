@@ -0,0 +1,396 @@
+"""End-to-end load test against a local gunicorn server.
+
+Starts gunicorn on a fresh file-backed SQLite database (or ``DATABASE_URL``)
+seeded with a synthetic vocabulary, then runs virtual parents at rising
+concurrency. Each virtual parent logs in through ``/login`` with its own
+cookie jar and loops over a weighted scenario mix: dashboard views, word
+additions, filtered word lists, stats and exports. Every step reports
+throughput, error rate and p50/p95/p99 latency per route; the saturation
+point is the first step where throughput stops growing, p95 latency passes
+the target or errors appear. Uses only the standard library, so it runs
+from any checkout.
+
+Rate limits and load shedding are switched off on the server by default so
+they do not cap the measurement; ``--keep-limits`` leaves them on.
+
+Usage:
+    python -m benchmarks.load --concurrency 1,4,8,16,32 --duration 20
+    python -m benchmarks.load --url http://localhost:8000 --password secret
+"""
+
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+
+# Scenario name -> relative weight
+DEFAULT_MIX = {"dashboard": 40, "words": 25, "add": 15, "stats": 15, "export": 5}
+
+WORD_LIST_FILTERS = [
+    "", "sort=word&order=asc", "category=1", "user=1", "category=2&sort=word&order=asc",
+    "from=2025-01-01&to=2025-06-30",
+]
+
+# A step counts as saturated when throughput grows less than this fraction
+# over the previous step
+MIN_THROUGHPUT_GAIN = 0.1
+
+
+def percentile(values, pct):
+    """Return the pct-th percentile of a list of numbers."""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def parse_mix(text):
+    """Parse ``name=weight,...`` into a scenario mix.
+
+    Raises:
+        ValueError: If a scenario is unknown or a weight is not a positive number.
+    """
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"Unknown scenario {name!r}; choose from {', '.join(DEFAULT_MIX)}.")
+        if not weight.strip().replace(".", "", 1).isdigit() or float(weight) <= 0:
+            raise ValueError(f"Weight for {name} must be a positive number.")
+        mix[name] = float(weight)
+    return mix
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Report redirects as responses, so each request is timed on its own."""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class VirtualParent:
+    """One logged-in browser: a cookie jar and the scenarios it runs."""
+
+    def __init__(self, base_url, username, password, rng):
+        self.base_url = base_url.rstrip("/")
+        self.username = username
+        self.password = password
+        self.rng = rng
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), NoRedirect()
+        )
+
+    def request(self, path, data=None, headers=None):
+        """Send one request and return its status (redirects count as success)."""
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        req = urllib.request.Request(self.base_url + path, data=body, headers=headers or {})
+        try:
+            with self.opener.open(req, timeout=30) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as exc:
+            exc.read()
+            return exc.code
+
+    def login(self):
+        """Log in; returns the response status."""
+        return self.request("/login", {"username": self.username, "password": self.password})
+
+    def dashboard(self):
+        return "GET /", self.request("/")
+
+    def words(self):
+        query = self.rng.choice(WORD_LIST_FILTERS)
+        return "GET /words", self.request("/words" + (f"?{query}" if query else ""))
+
+    def add(self):
+        word = f"load-{self.username}-{time.perf_counter_ns()}-{self.rng.randrange(10**6)}"
+        return "POST /words/add", self.request(
+            "/words/add", {"word": word}, {"X-Requested-With": "XMLHttpRequest"}
+        )
+
+    def stats(self):
+        return "GET /stats", self.request("/stats")
+
+    def export(self):
+        return "GET /export", self.request("/export")
+
+
+def run_step(base_url, credentials, concurrency, duration, mix, seed):
+    """Run ``concurrency`` virtual parents for ``duration`` seconds.
+
+    Parents log in first; the clock starts once all of them have, so
+    password hashing does not skew the steady-state numbers. Logins are
+    reported separately.
+
+    Returns:
+        Dictionary with overall and per-route throughput, errors and latency.
+    """
+    samples = defaultdict(list)
+    errors = defaultdict(int)
+    statuses = defaultdict(lambda: defaultdict(int))
+    logins = []
+    lock = threading.Lock()
+    names, weights = zip(*mix.items())
+    window = {}
+
+    def start_clock():
+        window["started"] = time.perf_counter()
+        window["deadline"] = time.monotonic() + duration
+
+    # Releases once every parent has logged in, with the clock started
+    ready = threading.Barrier(concurrency + 1, action=start_clock)
+
+    def parent(index):
+        rng = random.Random(seed * 1000 + index)
+        username, password = credentials[index % len(credentials)]
+        browser = VirtualParent(base_url, username, password, rng)
+        local = []
+
+        started = time.perf_counter()
+        login_status = browser.login()
+        login_ms = (time.perf_counter() - started) * 1000
+        ready.wait()
+        if login_status == 302:
+            while time.monotonic() < window["deadline"]:
+                scenario = getattr(browser, rng.choices(names, weights)[0])
+                started = time.perf_counter()
+                try:
+                    route, status = scenario()
+                except (OSError, urllib.error.URLError):
+                    route, status = scenario.__name__, 0
+                local.append((route, status, (time.perf_counter() - started) * 1000))
+
+        with lock:
+            logins.append((login_status, login_ms))
+            for route, status, elapsed in local:
+                statuses[route][status] += 1
+                if status == 0 or status >= 400:
+                    errors[route] += 1
+                else:
+                    samples[route].append(elapsed)
+
+    threads = [threading.Thread(target=parent, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    ready.wait()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - window["started"]
+
+    routes = {}
+    for route in sorted(statuses):
+        latencies = samples[route]
+        total = sum(statuses[route].values())
+        routes[route] = {
+            "requests": total,
+            "errors": errors[route],
+            "error_rate": round(errors[route] / total, 4),
+            "statuses": {str(code): count for code, count in sorted(statuses[route].items())},
+            **latency_summary(latencies),
+        }
+
+    everything = [value for latencies in samples.values() for value in latencies]
+    total = sum(route["requests"] for route in routes.values())
+    failed = sum(errors.values())
+    return {
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 2),
+        "requests": total,
+        "requests_per_second": round(total / elapsed, 1),
+        "errors": failed,
+        "error_rate": round(failed / total, 4) if total else 0.0,
+        **latency_summary(everything),
+        "routes": routes,
+        "logins": {
+            "failed": sum(1 for status, _ in logins if status != 302),
+            **latency_summary([ms for _, ms in logins]),
+        },
+    }
+
+
+def latency_summary(latencies):
+    """Return p50/p95/p99/mean/max in milliseconds (None when empty)."""
+    if not latencies:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "mean_ms": None, "max_ms": None}
+    return {
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "mean_ms": round(statistics.mean(latencies), 2),
+        "max_ms": round(max(latencies), 2),
+    }
+
+
+def find_saturation(steps, p95_target_ms, max_error_rate):
+    """Return the first saturated step's concurrency and why, or None.
+
+    A step is saturated when its error rate or overall p95 passes the
+    target, or its throughput grew less than MIN_THROUGHPUT_GAIN over the
+    previous step's.
+    """
+    previous = None
+    for step in steps:
+        reasons = []
+        if step["logins"]["failed"]:
+            reasons.append(f"{step['logins']['failed']} logins failed")
+        if step["error_rate"] > max_error_rate:
+            reasons.append(f"error rate {step['error_rate']:.1%}")
+        if step["p95_ms"] is not None and step["p95_ms"] > p95_target_ms:
+            reasons.append(f"p95 {step['p95_ms']} ms > {p95_target_ms} ms")
+        if previous and step["requests_per_second"] < previous["requests_per_second"] * (1 + MIN_THROUGHPUT_GAIN):
+            reasons.append(
+                f"throughput {step['requests_per_second']}/s vs {previous['requests_per_second']}/s"
+            )
+        if reasons:
+            return {
+                "concurrency": step["concurrency"],
+                "last_healthy_concurrency": previous["concurrency"] if previous else None,
+                "reasons": reasons,
+            }
+        previous = step
+    return None
+
+
+def free_port():
+    """Return a free local TCP port."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def prepare_database(env, words):
+    """Create, seed and fill the benchmark database in a child process."""
+    script = (
+        "from app import create_app\n"
+        "from app.datagen import generate_dataset\n"
+        "app = create_app('development')\n"
+        "with app.app_context():\n"
+        f"    generate_dataset(words={words}, reset=True)\n"
+    )
+    subprocess.run([sys.executable, "-c", script], env=env, check=True, stdout=subprocess.DEVNULL)
+
+
+def start_server(args, password, extra_env=None):
+    """Start gunicorn on a seeded database; returns (process, base URL).
+
+    ``extra_env`` adds settings to the server's environment.
+    """
+    env = dict(os.environ, **(extra_env or {}))
+    if "DATABASE_URL" not in env:
+        workdir = tempfile.mkdtemp(prefix="bench-load-")
+        env["DATABASE_URL"] = f"sqlite:///{workdir}/load.db"
+    # Development config: production's secure cookies need HTTPS
+    env.update({
+        "FLASK_ENV": "development",
+        "NICK_PASSWORD": password,
+        "WIFE_PASSWORD": password,
+        "INSTRUMENTATION_ENABLED": "true",
+    })
+    if not args.keep_limits:
+        env["RATE_LIMITS_ENABLED"] = "false"
+    prepare_database(env, args.words)
+
+    port = free_port()
+    command = [
+        "gunicorn", "run:app",
+        "--bind", f"127.0.0.1:{port}",
+        "--workers", str(args.workers),
+        "--worker-class", args.worker_class,
+        "--threads", str(args.threads),
+        "--log-level", "warning",
+    ]
+    process = subprocess.Popen(command, env=env)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(base_url + "/readyz", timeout=1):
+                return process, base_url
+        except OSError:
+            if process.poll() is not None:
+                raise SystemExit("gunicorn exited during startup.")
+            time.sleep(0.2)
+    process.terminate()
+    raise SystemExit("gunicorn did not become ready within 30 seconds.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="Test a running server instead of starting gunicorn.")
+    parser.add_argument("--password", default="loadtest",
+                        help="Password for nick and wife (set on the started server).")
+    parser.add_argument("--concurrency", default="1,2,4,8,16,32",
+                        help="Comma-separated virtual parents per step.")
+    parser.add_argument("--duration", type=float, default=15, help="Seconds per step.")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help="Scenario weights, e.g. dashboard=40,words=25,add=15,stats=15,export=5")
+    parser.add_argument("--words", type=int, default=2000, help="Words in the seeded database.")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--worker-class", default="gthread")
+    parser.add_argument("--p95-target-ms", type=float, default=500)
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--keep-limits", action="store_true",
+                        help="Leave rate limits and load shedding on.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Also write the JSON report to this file.")
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.concurrency.split(",")]
+    credentials = [("nick", args.password), ("wife", args.password)]
+
+    process = None
+    base_url = args.url
+    if base_url is None:
+        process, base_url = start_server(args, args.password)
+    try:
+        steps = []
+        for concurrency in levels:
+            steps.append(run_step(base_url, credentials, concurrency, args.duration, args.mix, args.seed))
+            print(
+                f"{concurrency:>4} parents: {steps[-1]['requests_per_second']:>8}/s  "
+                f"p95 {steps[-1]['p95_ms']} ms  errors {steps[-1]['error_rate']:.1%}",
+                file=sys.stderr,
+            )
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+
+    peak = max(steps, key=lambda step: step["requests_per_second"])
+    report = {
+        "target": base_url if args.url else {
+            "workers": args.workers, "worker_class": args.worker_class,
+            "threads": args.threads, "words": args.words,
+            "rate_limits": args.keep_limits,
+        },
+        "mix": args.mix,
+        "duration_per_step": args.duration,
+        "p95_target_ms": args.p95_target_ms,
+        "peak": {"concurrency": peak["concurrency"],
+                 "requests_per_second": peak["requests_per_second"]},
+        "saturation": find_saturation(steps, args.p95_target_ms, args.max_error_rate),
+        "steps": steps,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as stream:
+            stream.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
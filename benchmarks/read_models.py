@@ -0,0 +1,103 @@
+"""Benchmark read-only word rows against full ORM entities.
+
+Fills a SQLite file (or ``DATABASE_URL``) with synthetic words, then loads
+them the two ways the list pages could: ``Word.query`` entities and
+``read_models`` rows. Each load reads the five attributes the templates
+use. For each path the report gives:
+
+- median milliseconds per 10,000 rows over ``--repeats`` loads;
+- bytes held per row while the result is alive (tracemalloc), including
+  the session's identity map for entities.
+
+Usage:
+    python -m benchmarks.read_models --words 50000 --repeats 5
+"""
+
+import argparse
+import gc
+import json
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+
+def consume(rows):
+    """Read the attributes the word list renders from every row."""
+    for row in rows:
+        row.id, row.word, row.date_added, row.user_id, row.category_id
+
+
+def measure(load, repeats, session):
+    """Time ``load()`` plus reading its rows, and its memory per row.
+
+    Returns:
+        Dictionary with rows loaded, median ms per 10k rows and bytes per row.
+    """
+    timings = []
+    for _ in range(repeats):
+        session.expunge_all()
+        gc.collect()
+        started = time.perf_counter()
+        rows = load()
+        consume(rows)
+        timings.append(time.perf_counter() - started)
+        count = len(rows)
+        del rows
+
+    session.expunge_all()
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    rows = load()
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del rows
+    session.expunge_all()
+
+    return {
+        "rows": count,
+        "ms_per_10k_rows": round(statistics.median(timings) * 1000 * 10000 / count, 2),
+        "bytes_per_row": round(held / count),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--words", type=int, default=50000, help="Words in the database.")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed loads per path.")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-read-models-")
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{workdir}/bench.db")
+    os.environ.setdefault("SLOW_QUERY_LOG_ENABLED", "false")
+
+    from app import create_app, db
+    from app.datagen import generate_dataset
+    from app.models import Word
+    from app.read_models import select_words, word_rows
+
+    app = create_app("development")
+    with app.app_context():
+        generate_dataset(words=args.words, reset=True)
+
+        def orm():
+            return Word.query.order_by(Word.date_added.desc()).all()
+
+        def projection():
+            return word_rows(select_words().order_by(Word.date_added.desc()))
+
+        report = {
+            "words": args.words,
+            "repeats": args.repeats,
+            "orm": measure(orm, args.repeats, db.session),
+            "read_model": measure(projection, args.repeats, db.session),
+        }
+    report["speedup"] = round(report["orm"]["ms_per_10k_rows"] / report["read_model"]["ms_per_10k_rows"], 2)
+    report["memory_ratio"] = round(report["read_model"]["bytes_per_row"] / report["orm"]["bytes_per_row"], 2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
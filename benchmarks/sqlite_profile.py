@@ -0,0 +1,116 @@
+"""Compare SQLite's default settings with the tuned connection profile.
+
+Starts gunicorn twice with several workers, once with ``SQLITE_TUNING=false``
+and once with the profile, each on a fresh SQLite file seeded with the
+same synthetic vocabulary (WAL mode is stored in the file, so profiles
+never share one). Virtual parents from ``benchmarks.load`` then run the
+same write-heavy scenario mix at each concurrency step, and the report
+gives both profiles' throughput, error rate and latency per step with the
+tuned/default ratios. Several worker processes are what make SQLite's
+locking matter: with the default rollback journal, a committing writer
+blocks every reader in every worker.
+
+Usage:
+    python -m benchmarks.sqlite_profile --workers 4 --concurrency 4,8,16 --duration 20
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+
+from benchmarks.load import parse_mix, run_step, start_server
+
+# Additions are where journal mode and fsyncs show
+DEFAULT_MIX = {"dashboard": 30, "words": 20, "add": 35, "stats": 10, "export": 5}
+
+PROFILES = {"default": "false", "tuned": "true"}
+
+
+def run_profile(args, tuning):
+    """Run every concurrency step against a server with SQLITE_TUNING=tuning."""
+    workdir = tempfile.mkdtemp(prefix="bench-sqlite-")
+    extra_env = {"SQLITE_TUNING": tuning, "DATABASE_URL": f"sqlite:///{workdir}/bench.db"}
+    credentials = [("nick", args.password), ("wife", args.password)]
+
+    process, base_url = start_server(args, args.password, extra_env)
+    try:
+        steps = []
+        for concurrency in args.levels:
+            steps.append(run_step(base_url, credentials, concurrency, args.duration, args.mix, args.seed))
+            print(
+                f"{'tuned' if tuning == 'true' else 'default':>7} {concurrency:>4} parents: "
+                f"{steps[-1]['requests_per_second']:>8}/s  p95 {steps[-1]['p95_ms']} ms  "
+                f"errors {steps[-1]['error_rate']:.1%}",
+                file=sys.stderr,
+            )
+        return steps
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def ratio(tuned, default):
+    """Return tuned/default rounded, or None when either is missing or zero."""
+    if not tuned or not default:
+        return None
+    return round(tuned / default, 2)
+
+
+def compare(results):
+    """Pair each step's default and tuned numbers."""
+    comparison = []
+    for default, tuned in zip(results["default"], results["tuned"]):
+        add_default = default["routes"].get("POST /words/add", {})
+        add_tuned = tuned["routes"].get("POST /words/add", {})
+        comparison.append({
+            "concurrency": default["concurrency"],
+            "requests_per_second": {"default": default["requests_per_second"],
+                                    "tuned": tuned["requests_per_second"]},
+            "throughput_ratio": ratio(tuned["requests_per_second"], default["requests_per_second"]),
+            "p95_ms": {"default": default["p95_ms"], "tuned": tuned["p95_ms"]},
+            "p95_ratio": ratio(tuned["p95_ms"], default["p95_ms"]),
+            "add_p95_ms": {"default": add_default.get("p95_ms"), "tuned": add_tuned.get("p95_ms")},
+            "error_rate": {"default": default["error_rate"], "tuned": tuned["error_rate"]},
+        })
+    return comparison
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--password", default="loadtest", help="Password for nick and wife.")
+    parser.add_argument("--concurrency", default="4,8,16,32",
+                        help="Comma-separated virtual parents per step.")
+    parser.add_argument("--duration", type=float, default=15, help="Seconds per step.")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help="Scenario weights, e.g. dashboard=30,words=20,add=35,stats=10,export=5")
+    parser.add_argument("--words", type=int, default=5000, help="Words in each seeded database.")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--worker-class", default="gthread")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Also write the JSON report to this file.")
+    args = parser.parse_args()
+    args.levels = [int(level) for level in args.concurrency.split(",")]
+    # Limits would cap both profiles at the same rate
+    args.keep_limits = False
+
+    results = {name: run_profile(args, tuning) for name, tuning in PROFILES.items()}
+
+    report = {
+        "target": {"workers": args.workers, "worker_class": args.worker_class,
+                   "threads": args.threads, "words": args.words},
+        "mix": args.mix,
+        "duration_per_step": args.duration,
+        "comparison": compare(results),
+        "profiles": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as stream:
+            stream.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
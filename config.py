@@ -15,6 +15,129 @@ class Config:
     # User display names
     WIFE_DISPLAY_NAME = os.environ.get("WIFE_DISPLAY_NAME", "Partner")
 
+    # bcrypt work factor for new password hashes
+    BCRYPT_ROUNDS = 12
+
+    # Request/SQL timing, Server-Timing header and /metrics endpoint
+    INSTRUMENTATION_ENABLED = os.environ.get("INSTRUMENTATION_ENABLED", "true").lower() == "true"
+    # Bearer token required to read /metrics (required in production unless
+    # instrumentation is off)
+    METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+
+    # Slow query log: statements slower than the threshold are recorded with plans
+    SLOW_QUERY_LOG_ENABLED = os.environ.get("SLOW_QUERY_LOG_ENABLED", "true").lower() == "true"
+    SLOW_QUERY_THRESHOLD_MS = float(os.environ.get("SLOW_QUERY_THRESHOLD_MS", "200"))
+    SLOW_QUERY_EXPLAIN = os.environ.get("SLOW_QUERY_EXPLAIN", "true").lower() == "true"
+    # Record from a background thread; when False, entries wait for flush()
+    SLOW_QUERY_ASYNC = True
+
+    # Per-route query budgets: warn (or raise, when strict) on overruns.
+    # QUERY_BUDGETS maps endpoint names to budgets, overriding @query_budget.
+    QUERY_BUDGETS_ENABLED = True
+    QUERY_BUDGETS = {}
+    QUERY_BUDGET_STRICT = False
+
+    # Group commit: batch concurrent word additions into shared transactions
+    GROUP_COMMIT_ENABLED = os.environ.get("GROUP_COMMIT_ENABLED", "false").lower() == "true"
+    GROUP_COMMIT_WINDOW_MS = float(os.environ.get("GROUP_COMMIT_WINDOW_MS", "5"))
+    GROUP_COMMIT_MAX_BATCH = int(os.environ.get("GROUP_COMMIT_MAX_BATCH", "100"))
+    GROUP_COMMIT_TIMEOUT = 5.0
+
+    # Maximum words accepted in one /api/sync request
+    SYNC_MAX_BATCH = 1000
+    # Largest page from /api/changes and most points from /api/growth
+    CHANGES_MAX_PAGE = 1000
+    GROWTH_MAX_POINTS = 2000
+
+    # Reference data cache: seconds between checks for changes made by other workers
+    REFERENCE_CACHE_TTL = float(os.environ.get("REFERENCE_CACHE_TTL", "5"))
+
+    # Cache for computed results (stats, timeline, chart series): LRU
+    # entries per worker, plus an optional tier shared by every worker on
+    # the host ("sqlite:///path", bounded in MB). Entries expire when their
+    # data versions move, or after CACHE_DEFAULT_TTL seconds (0 for never).
+    CACHE_ENABLED = os.environ.get("CACHE_ENABLED", "true").lower() == "true"
+    CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", "256"))
+    CACHE_STORAGE = os.environ.get("CACHE_STORAGE", "memory")
+    CACHE_SHARED_MAX_MB = int(os.environ.get("CACHE_SHARED_MAX_MB", "32"))
+    CACHE_DEFAULT_TTL = int(os.environ.get("CACHE_DEFAULT_TTL", "3600"))
+    # One caller per worker recomputes a stale entry. Once an entry's TTL
+    # runs out, the others get its value for CACHE_STALE_GRACE seconds
+    # while it refreshes in the background (0 makes them wait); an entry
+    # made stale by a write is always recomputed. CACHE_SHARED_LOCK makes
+    # one worker per host compute, through the shared tier, waiting up to
+    # CACHE_LOCK_TIMEOUT seconds for it.
+    CACHE_STALE_GRACE = int(os.environ.get("CACHE_STALE_GRACE", "30"))
+    CACHE_SHARED_LOCK = os.environ.get("CACHE_SHARED_LOCK", "false").lower() == "true"
+    CACHE_LOCK_TIMEOUT = 10
+    # Refresh stale entries on a background thread; when False, the caller
+    # that finds an entry stale recomputes it
+    CACHE_REFRESH_ASYNC = True
+
+    # Live updates (/events): how often each worker polls the change log for
+    # other workers' writes, keep-alive interval, stream lifetime before the
+    # browser reconnects, events kept for replay and streams per worker.
+    # Under gthread each stream holds a thread (a dead client is noticed at
+    # the next heartbeat), so gunicorn.conf.py lowers LIVE_MAX_CLIENTS to
+    # leave LIVE_RESERVED_THREADS threads for ordinary requests.
+    LIVE_POLL_INTERVAL = float(os.environ.get("LIVE_POLL_INTERVAL", "2"))
+    LIVE_HEARTBEAT = 5
+    LIVE_STREAM_SECONDS = int(os.environ.get("LIVE_STREAM_SECONDS", "300"))
+    LIVE_BACKLOG = 500
+    LIVE_MAX_CLIENTS = int(os.environ.get("LIVE_MAX_CLIENTS", "12"))
+    LIVE_RESERVED_THREADS = int(os.environ.get("LIVE_RESERVED_THREADS", "4"))
+    # Poll from a background thread; when False, streams poll as they wait
+    LIVE_POLL_ASYNC = True
+
+    # Background jobs (full export, pediatrician report): pool threads and
+    # waiting jobs per worker, where finished files are kept (defaults to
+    # instance/jobs) and how long an unfinished job counts as in progress
+    JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+    JOB_MAX_QUEUED = int(os.environ.get("JOB_MAX_QUEUED", "20"))
+    JOB_ARTIFACT_DIR = os.environ.get("JOB_ARTIFACT_DIR")
+    JOB_STALE_SECONDS = 600
+    # Run jobs on the pool; when False, jobs run inside the submitting request
+    JOB_ASYNC = True
+
+    # Per-client rate limits on expensive routes. RATE_LIMITS maps endpoint
+    # names to rates like "10/minute" (or None), overriding @rate_limit.
+    # Buckets are per worker ("memory") or shared through a SQLite file
+    # ("sqlite:///path").
+    RATE_LIMITS_ENABLED = os.environ.get("RATE_LIMITS_ENABLED", "true").lower() == "true"
+    RATE_LIMITS = {}
+    RATE_LIMIT_STORAGE = os.environ.get("RATE_LIMIT_STORAGE", "memory")
+    # Shed rate-limited routes with 503 when a worker has more requests in
+    # flight, or a request queued longer in front of it (0 disables each)
+    LOAD_SHED_MAX_INFLIGHT = int(os.environ.get("LOAD_SHED_MAX_INFLIGHT", "12"))
+    LOAD_SHED_MAX_QUEUE_MS = float(os.environ.get("LOAD_SHED_MAX_QUEUE_MS", "2000"))
+    LOAD_SHED_RETRY_AFTER = 5
+    # Proxies in front of the app whose X-Forwarded-For/-Proto to trust.
+    # Behind an untrusted proxy every client shares the proxy's address, and
+    # so its login rate limit.
+    TRUSTED_PROXIES = int(os.environ.get("TRUSTED_PROXIES", "0"))
+
+    # Warm each worker up (pool connections, templates, reference data and
+    # stats caches) before it serves; /readyz answers 503 until it has
+    WARMUP_ENABLED = os.environ.get("WARMUP_ENABLED", "true").lower() == "true"
+    WARMUP_POOL_CONNECTIONS = int(os.environ.get("WARMUP_POOL_CONNECTIONS", "2"))
+
+    # SQLite database files: WAL, synchronous=NORMAL, page cache (KiB per
+    # connection), mmap, lock wait and foreign keys on every connection.
+    # No effect on PostgreSQL or in-memory databases.
+    SQLITE_TUNING = os.environ.get("SQLITE_TUNING", "true").lower() == "true"
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get("SQLITE_CACHE_SIZE_KB", "16384"))
+    SQLITE_MMAP_SIZE_MB = int(os.environ.get("SQLITE_MMAP_SIZE_MB", "256"))
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_JOURNAL_SIZE_LIMIT_MB = 64
+    # Upkeep per worker: WAL checkpoint every SQLITE_CHECKPOINT_INTERVAL
+    # seconds; PRAGMA optimize and an incremental vacuum of up to
+    # SQLITE_VACUUM_PAGES pages every SQLITE_OPTIMIZE_INTERVAL (0 disables each)
+    SQLITE_CHECKPOINT_INTERVAL = int(os.environ.get("SQLITE_CHECKPOINT_INTERVAL", "300"))
+    SQLITE_OPTIMIZE_INTERVAL = int(os.environ.get("SQLITE_OPTIMIZE_INTERVAL", "3600"))
+    SQLITE_VACUUM_PAGES = 1000
+    # Run upkeep from a background thread; when False, only on demand
+    SQLITE_MAINTENANCE_ASYNC = True
+
 
 class DevelopmentConfig(Config):
     """Development configuration."""
@@ -35,6 +158,9 @@ class ProductionConfig(Config):
     SESSION_COOKIE_HTTPONLY = True
     SESSION_COOKIE_SAMESITE = "Lax"
 
+    # Deployed behind Railway's proxy: trust its one hop
+    TRUSTED_PROXIES = int(os.environ.get("TRUSTED_PROXIES", "1"))
+
     def __init__(self):
         """Validate required production settings and set database URI."""
         super().__init__()
@@ -52,6 +178,14 @@ class ProductionConfig(Config):
                 "Generate one with: python -c \"import secrets; print(secrets.token_hex(32))\""
             )
 
+        # /metrics exposes routes, timings and pool usage; keep it private
+        if self.INSTRUMENTATION_ENABLED and not self.METRICS_TOKEN:
+            raise ValueError(
+                "METRICS_TOKEN must be set in production (or set "
+                "INSTRUMENTATION_ENABLED=false). "
+                "Generate one with: python -c \"import secrets; print(secrets.token_hex(32))\""
+            )
+
 
 class TestingConfig(Config):
     """Testing configuration."""
@@ -59,6 +193,27 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
     WTF_CSRF_ENABLED = False
+    # bcrypt's minimum cost: hashes stay real but take about a millisecond
+    BCRYPT_ROUNDS = 4
+    # The in-memory database shares one connection, so record slow queries
+    # only when a test flushes them
+    SLOW_QUERY_ASYNC = False
+    # Fail tests that go over a route's query budget
+    QUERY_BUDGET_STRICT = True
+    # Check the reference data version on every request (the worst case)
+    REFERENCE_CACHE_TTL = 0
+    # Keep the cache in memory whatever the environment says
+    CACHE_STORAGE = "memory"
+    # The in-memory database shares one connection, so refreshes run inline
+    CACHE_REFRESH_ASYNC = False
+    # The in-memory database shares one connection, so streams poll inline
+    LIVE_POLL_ASYNC = False
+    # The in-memory database shares one connection, so jobs run inline
+    JOB_ASYNC = False
+    # Tests warm up explicitly
+    WARMUP_ENABLED = False
+    # Tests that use a SQLite file run upkeep themselves
+    SQLITE_MAINTENANCE_ASYNC = False
 
 
 config = {
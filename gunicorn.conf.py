@@ -0,0 +1,27 @@
+"""Gunicorn settings, read automatically from the working directory.
+
+Each worker warms up (database pool, templates, reference data, stats
+caches) after loading the app and before accepting connections. Workers
+that serve a request per thread cap live update streams below their
+thread count.
+"""
+
+# Worker classes where an open live update stream holds a request thread
+THREADED_WORKERS = ("sync", "gthread")
+
+
+def post_worker_init(worker):
+    """Warm the worker's app up and log how long each step took."""
+    from app.live import fit_live_clients
+    from app.warmup import warm_up
+
+    app = worker.wsgi
+    if worker.cfg.worker_class_str in THREADED_WORKERS:
+        limit = fit_live_clients(app, worker.cfg.threads)
+        worker.log.info("Worker %s accepts up to %s live update streams", worker.pid, limit)
+    warmup = app.extensions["warmup"]
+    if not warm_up(app):
+        worker.log.warning("Worker %s warm-up failed: %s; retrying on its first request", worker.pid, warmup.error)
+    elif warmup.total_ms is not None:
+        steps = ", ".join(f"{name} {ms} ms" for name, ms in warmup.timings.items())
+        worker.log.info("Worker %s warmed up in %s ms (%s)", worker.pid, warmup.total_ms, steps)
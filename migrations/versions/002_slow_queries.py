@@ -0,0 +1,46 @@
+"""Add slow query log table
+
+Revision ID: 002_slow_queries
+Revises: 001_initial
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '002_slow_queries'
+down_revision = '001_initial'
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name):
+    # Every app start runs db.create_all(), which may have created the table
+    # (with its indexes) before this migration ran
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade():
+    if _has_table('slow_queries'):
+        return
+    op.create_table('slow_queries',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('fingerprint', sa.String(length=40), nullable=False),
+        sa.Column('statement', sa.Text(), nullable=False),
+        sa.Column('param_shape', sa.String(length=500), nullable=True),
+        sa.Column('route', sa.String(length=100), nullable=True),
+        sa.Column('calls', sa.Integer(), nullable=False),
+        sa.Column('total_ms', sa.Float(), nullable=False),
+        sa.Column('max_ms', sa.Float(), nullable=False),
+        sa.Column('plan', sa.Text(), nullable=True),
+        sa.Column('first_seen', sa.DateTime(), nullable=False),
+        sa.Column('last_seen', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('fingerprint')
+    )
+
+
+def downgrade():
+    op.drop_table('slow_queries')
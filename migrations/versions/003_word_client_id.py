@@ -0,0 +1,32 @@
+"""Add client_id to words for idempotent offline sync
+
+Revision ID: 003_word_client_id
+Revises: 002_slow_queries
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '003_word_client_id'
+down_revision = '002_slow_queries'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # db.create_all() never alters the existing words table, so the column
+    # only reaches upgraded databases here; skip what is already there
+    inspector = sa.inspect(op.get_bind())
+    if 'client_id' not in {column['name'] for column in inspector.get_columns('words')}:
+        op.add_column('words', sa.Column('client_id', sa.String(length=36), nullable=True))
+    if 'ix_words_client_id' not in {index['name'] for index in inspector.get_indexes('words')}:
+        op.create_index('ix_words_client_id', 'words', ['client_id'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_words_client_id', table_name='words')
+    with op.batch_alter_table('words') as batch_op:
+        batch_op.drop_column('client_id')
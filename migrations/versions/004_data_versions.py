@@ -0,0 +1,37 @@
+"""Add data_versions table for cache invalidation
+
+Revision ID: 004_data_versions
+Revises: 003_word_client_id
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '004_data_versions'
+down_revision = '003_word_client_id'
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name):
+    # Every app start runs db.create_all(), which may have created the table
+    # (with its indexes) before this migration ran
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade():
+    if _has_table('data_versions'):
+        return
+    op.create_table(
+        'data_versions',
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('name'),
+    )
+
+
+def downgrade():
+    op.drop_table('data_versions')
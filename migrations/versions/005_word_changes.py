@@ -0,0 +1,43 @@
+"""Add word_changes append-only change log
+
+Revision ID: 005_word_changes
+Revises: 004_data_versions
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '005_word_changes'
+down_revision = '004_data_versions'
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name):
+    # Every app start runs db.create_all(), which may have created the table
+    # (with its indexes) before this migration ran
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade():
+    if _has_table('word_changes'):
+        return
+    op.create_table(
+        'word_changes',
+        sa.Column('seq', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), nullable=False),
+        sa.Column('op', sa.String(length=10), nullable=False),
+        sa.Column('word_id', sa.Integer(), nullable=True),
+        sa.Column('data', sa.Text(), nullable=True),
+        sa.Column('changed_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('seq'),
+        sqlite_autoincrement=True,
+    )
+    op.create_index('ix_word_changes_word_id_seq', 'word_changes', ['word_id', 'seq'])
+
+
+def downgrade():
+    op.drop_index('ix_word_changes_word_id_seq', table_name='word_changes')
+    op.drop_table('word_changes')
@@ -0,0 +1,34 @@
+"""Add composite indexes for word list filters and sorts
+
+Revision ID: 006_word_indexes
+Revises: 005_word_changes
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '006_word_indexes'
+down_revision = '005_word_changes'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_words_date_added', ['date_added']),
+    ('ix_words_word', ['word']),
+    ('ix_words_category_date', ['category_id', 'date_added']),
+    ('ix_words_category_word', ['category_id', 'word']),
+    ('ix_words_user_date', ['user_id', 'date_added']),
+    ('ix_words_user_word', ['user_id', 'word']),
+]
+
+
+def upgrade():
+    for name, columns in INDEXES:
+        op.create_index(name, 'words', columns)
+
+
+def downgrade():
+    for name, _ in reversed(INDEXES):
+        op.drop_index(name, table_name='words')
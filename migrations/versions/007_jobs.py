@@ -0,0 +1,52 @@
+"""Add jobs table for background reports and exports
+
+Revision ID: 007_jobs
+Revises: 006_word_indexes
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '007_jobs'
+down_revision = '006_word_indexes'
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name):
+    # Every app start runs db.create_all(), which may have created the table
+    # (with its indexes) before this migration ran
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade():
+    if _has_table('jobs'):
+        return
+    op.create_table(
+        'jobs',
+        sa.Column('id', sa.String(length=32), nullable=False),
+        sa.Column('kind', sa.String(length=30), nullable=False),
+        sa.Column('params', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(length=10), nullable=False),
+        sa.Column('progress', sa.Float(), nullable=False),
+        sa.Column('message', sa.String(length=200), nullable=True),
+        sa.Column('data_version', sa.String(length=100), nullable=False),
+        sa.Column('artifact', sa.String(length=255), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'ix_jobs_kind_params_version', 'jobs', ['kind', 'params', 'data_version']
+    )
+
+
+def downgrade():
+    op.drop_index('ix_jobs_kind_params_version', table_name='jobs')
+    op.drop_table('jobs')
@@ -1,22 +1,113 @@
-"""Pytest configuration and fixtures."""
+"""Pytest configuration and fixtures.
 
+The schema is built once per test process (so once per xdist worker, each
+with its own in-memory database) on a connection every test's app shares.
+Tests start from an empty database: after each test, every table is
+emptied rather than the schema being dropped and rebuilt.
+"""
+
+import sqlite3
 from datetime import datetime, timedelta, timezone
 
 import pytest
+from flask import g
+from jinja2 import BytecodeCache
 
 from app import create_app, db
+from app.datagen import generate_dataset
 from app.models import Category, User, Word
+from app.query_budget import record_queries
+from app.reference_data import get_reference_data
+
+# Password of the seeded test users
+TEST_PASSWORD = "testpass"
+
+# Categories in shared datasets
+DATASET_CATEGORIES = ("Noun", "Verb", "Animal Sound", "Person", "Other")
+
+
+class SharedConnection(sqlite3.Connection):
+    """A SQLite connection that outlives the engines of the apps using it."""
+
+    def close(self):
+        # Each test's engine "closes" its connection when discarded
+        pass
+
+    def close_for_good(self):
+        """Close the connection at the end of the session."""
+        sqlite3.Connection.close(self)
+
+
+class MemoryBytecodeCache(BytecodeCache):
+    """Compiled templates kept for the session, so each test's app skips compiling them."""
+
+    def __init__(self):
+        self.compiled = {}
+
+    def load_bytecode(self, bucket):
+        code = self.compiled.get(bucket.key)
+        if code is not None:
+            bucket.bytecode_from_string(code)
+
+    def dump_bytecode(self, bucket):
+        self.compiled[bucket.key] = bucket.bytecode_to_string()
+
+
+TEMPLATE_CACHE = MemoryBytecodeCache()
+
+
+def connect_shared():
+    """Open an in-memory database for several apps to share."""
+    return sqlite3.connect(":memory:", check_same_thread=False, factory=SharedConnection)
+
+
+def make_app(connection, **overrides):
+    """Create a testing app whose engine uses ``connection``."""
+    app = create_app("testing", SQLALCHEMY_ENGINE_OPTIONS={"creator": lambda: connection}, **overrides)
+    app.jinja_env.bytecode_cache = TEMPLATE_CACHE
+    return app
+
+
+def empty_database(connection):
+    """Delete every row, keeping the schema, and restart AUTOINCREMENT counters."""
+    connection.rollback()
+    tables = {row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    for table in reversed(db.metadata.sorted_tables):
+        if table.name in tables:
+            connection.execute(f'DELETE FROM "{table.name}"')
+    if "sqlite_sequence" in tables:
+        connection.execute("DELETE FROM sqlite_sequence")
+    connection.commit()
+
+
+@pytest.fixture(scope="session")
+def database():
+    """This process's test database, with the schema created once."""
+    connection = connect_shared()
+    with make_app(connection).app_context():
+        db.create_all()
+    yield connection
+    connection.close_for_good()
+
+
+@pytest.fixture(scope="session")
+def password_hash():
+    """bcrypt hash of TEST_PASSWORD, computed once."""
+    user = User()
+    with create_app("testing").app_context():
+        user.set_password(TEST_PASSWORD)
+    return user.password_hash
 
 
 @pytest.fixture
-def app():
+def app(database):
     """Create application for testing."""
-    app = create_app("testing")
+    app = make_app(database)
 
     with app.app_context():
-        db.create_all()
         yield app
-        db.drop_all()
+        db.session.remove()
+    empty_database(database)
 
 
 @pytest.fixture
@@ -27,32 +118,33 @@ def client(app):
 
 @pytest.fixture
 def db_session(app):
-    """Provide a database session for testing.
+    """Provide the app's database session.
 
-    This fixture ensures tests run within a transaction that gets
-    rolled back after each test for isolation.
+    Uncommitted changes are rolled back when the test ends. Isolation
+    between tests comes from the ``app`` fixture, which empties every
+    table afterwards.
     """
     with app.app_context():
         yield db.session
         db.session.rollback()
 
 
+def seed_users(password_hash):
+    """Add the two test users, nick and wife, with TEST_PASSWORD."""
+    db.session.add_all([
+        User(username="nick", display_name="Nick", password_hash=password_hash),
+        User(username="wife", display_name="Partner", password_hash=password_hash),
+    ])
+
+
 @pytest.fixture
-def seeded_db(app):
+def seeded_db(app, password_hash):
     """Create database with seeded test users.
 
-    Creates two users with known password 'testpass' for authentication tests.
+    Creates two users with known password TEST_PASSWORD for authentication tests.
     """
     with app.app_context():
-        # Create test users
-        nick = User(username="nick", display_name="Nick")
-        nick.set_password("testpass")
-        db.session.add(nick)
-
-        wife = User(username="wife", display_name="Partner")
-        wife.set_password("testpass")
-        db.session.add(wife)
-
+        seed_users(password_hash)
         db.session.commit()
         yield db
         db.session.rollback()
@@ -67,7 +159,7 @@ def authenticated_client(app, seeded_db):
         # Log in as nick
         client.post("/login", data={
             "username": "nick",
-            "password": "testpass"
+            "password": TEST_PASSWORD
         }, follow_redirects=True)
         yield client
 
@@ -100,17 +192,16 @@ def sample_words(authenticated_client, seeded_db):
         {"word": "eat", "user": nick, "category": verb, "days_ago": 7},
     ]
 
-    words = []
-    for data in words_data:
-        word = Word(
+    words = [
+        Word(
             word=data["word"],
             user_id=data["user"].id,
             category_id=data["category"].id if data["category"] else None,
             date_added=now - timedelta(days=data["days_ago"]),
         )
-        db.session.add(word)
-        words.append(word)
-
+        for data in words_data
+    ]
+    db.session.add_all(words)
     db.session.commit()
 
     # Refresh to load relationships
@@ -118,3 +209,80 @@ def sample_words(authenticated_client, seeded_db):
         db.session.refresh(word)
 
     return words
+
+
+def build_dataset(words, password_hash):
+    """Serialize a database with the test users, categories and ``words`` words."""
+    connection = connect_shared()
+    try:
+        with make_app(connection).app_context():
+            db.create_all()
+            seed_users(password_hash)
+            db.session.add_all(Category(name=name) for name in DATASET_CATEGORIES)
+            db.session.commit()
+            generate_dataset(words=words)
+        return connection.serialize()
+    finally:
+        connection.close_for_good()
+
+
+@pytest.fixture(scope="session")
+def dataset_cache():
+    """Serialized shared datasets by word count, built once per session."""
+    return {}
+
+
+@pytest.fixture
+def shared_dataset(app, database, password_hash, dataset_cache):
+    """Return a loader that swaps in a synthetic dataset built once per session.
+
+    ``load(words)`` replaces the whole test database with the seeded users,
+    DATASET_CATEGORIES and ``words`` generated words. Each size is generated
+    once per session and copied in afterwards. Data versions move past
+    their values before the load, so per-app caches do not serve data from
+    before it.
+    """
+    def load(words):
+        if words not in dataset_cache:
+            dataset_cache[words] = build_dataset(words, password_hash)
+        db.session.rollback()
+        db.session.expunge_all()
+        database.rollback()
+        versions = database.execute("SELECT name, version FROM data_versions").fetchall()
+        replaced = database.execute("PRAGMA schema_version").fetchone()[0]
+        database.deserialize(dataset_cache[words])
+        # Datasets of different sizes can share a schema cookie but not index
+        # root pages (generation rebuilds the indexes); move the cookie past
+        # the replaced database's so SQLite re-reads the schema
+        cookie = database.execute("PRAGMA schema_version").fetchone()[0]
+        database.execute(f"PRAGMA schema_version = {max(cookie, replaced) + 1}")
+        database.executemany(
+            "INSERT INTO data_versions (name, version) VALUES (?, ? + 1) "
+            "ON CONFLICT(name) DO UPDATE SET version = max(data_versions.version + 1, excluded.version)",
+            versions,
+        )
+        database.commit()
+
+    return load
+
+
+@pytest.fixture
+def count_queries(app):
+    """Return a helper that counts the SQL statements one GET request issues.
+
+    The session's identity map and Flask-Login's cached user are cleared
+    first, so the request is counted the way a fresh production request
+    would be. The reference data snapshot is warmed beforehand, as it is in
+    a worker that has served any request.
+    """
+    def count(client, url):
+        get_reference_data()
+        db.session.expunge_all()
+        g.pop("_login_user", None)
+        g.pop("_reference_checked", None)
+        with record_queries() as statements:
+            response = client.get(url)
+        assert response.status_code == 200
+        return len(statements)
+
+    return count
@@ -0,0 +1,151 @@
+"""Tests for snapshot backup and bulk restore."""
+
+import gzip
+import uuid
+from datetime import datetime
+
+import pytest
+from sqlalchemy import inspect
+
+from app import db
+from app.backup import read_snapshot, restore_snapshot, verify_snapshot, write_snapshot
+from app.models import Category, User, Word
+from app.reference_data import get_reference_data
+
+
+@pytest.fixture
+def words(seeded_db):
+    """A few words with fixed timestamps, a category and a sync UUID."""
+    nick = User.query.filter_by(username="nick").first()
+    noun = Category(name="Noun", description="Things")
+    db.session.add(noun)
+    db.session.flush()
+    stamp = datetime(2025, 3, 1, 9, 30, 15, 123456)
+    db.session.add_all([
+        Word(id=10, word="ball", user_id=nick.id, category_id=noun.id,
+             date_added=stamp, created_at=stamp, updated_at=stamp,
+             client_id=str(uuid.uuid4())),
+        Word(id=12, word="dog", user_id=nick.id, date_added=stamp,
+             created_at=stamp, updated_at=stamp),
+    ])
+    db.session.commit()
+
+
+def table_rows():
+    """Return every backed-up row, for comparing databases."""
+    return {
+        model.__tablename__: [
+            tuple(getattr(row, column.key) for column in model.__table__.columns)
+            for row in model.query.order_by(model.id)
+        ]
+        for model in (User, Category, Word)
+    }
+
+
+def test_round_trip_preserves_ids_and_timestamps(words, tmp_path):
+    """A restored database matches the one that was backed up."""
+    path = str(tmp_path / "snapshot.jsonl.gz")
+    before = table_rows()
+
+    result = write_snapshot(path)
+    assert result["tables"] == {"users": 2, "categories": 1, "words": 2, "word_changes": 2}
+
+    Word.query.delete()
+    db.session.add(Word(word="extra", user_id=before["users"][0][0]))
+    db.session.commit()
+
+    restored = restore_snapshot(path, batch_size=1)
+    db.session.expire_all()
+
+    assert restored["tables"]["words"] == 2
+    assert table_rows() == before
+    word = db.session.get(Word, 10)
+    assert word.date_added == datetime(2025, 3, 1, 9, 30, 15, 123456)
+
+
+def test_restore_rebuilds_indexes(words, tmp_path):
+    """Secondary indexes dropped for the load exist again afterwards."""
+    path = str(tmp_path / "snapshot.jsonl.gz")
+    write_snapshot(path)
+
+    restore_snapshot(path)
+
+    indexes = {index["name"] for index in inspect(db.engine).get_indexes("words")}
+    assert "ix_words_client_id" in indexes
+
+
+def test_verify_reports_header_and_counts(words, tmp_path):
+    """Verification reads the whole snapshot without touching the database."""
+    path = str(tmp_path / "snapshot.jsonl.gz")
+    write_snapshot(path)
+
+    header, counts = verify_snapshot(path)
+
+    assert header["dialect"] == "sqlite"
+    assert sorted(header["tables"]) == ["categories", "users", "word_changes", "words"]
+    assert counts == {"users": 2, "categories": 1, "words": 2, "word_changes": 2}
+
+
+def test_corrupt_snapshot_rolls_back(words, tmp_path):
+    """A tampered snapshot is rejected and leaves existing data alone."""
+    path = tmp_path / "snapshot.jsonl.gz"
+    write_snapshot(str(path))
+    with gzip.open(path, "rb") as stream:
+        data = stream.read()
+    with gzip.open(path, "wb") as stream:
+        stream.write(data.replace(b'"ball"', b'"bell"'))
+
+    with pytest.raises(ValueError, match="checksum"):
+        list(read_snapshot(str(path)))
+    with pytest.raises(ValueError, match="checksum"):
+        restore_snapshot(str(path))
+
+    assert Word.query.count() == 2
+    assert Word.query.filter_by(word="ball").count() == 1
+
+
+def test_truncated_snapshot_rejected(words, tmp_path):
+    """A snapshot missing its footer is rejected."""
+    path = tmp_path / "snapshot.jsonl.gz"
+    write_snapshot(str(path))
+    with gzip.open(path, "rb") as stream:
+        lines = stream.read().splitlines(keepends=True)
+    with gzip.open(path, "wb") as stream:
+        stream.writelines(lines[:-1])
+
+    with pytest.raises(ValueError, match="truncated"):
+        verify_snapshot(str(path))
+
+
+def test_restore_invalidates_reference_cache(words, tmp_path):
+    """Cached categories and users are refreshed after a restore."""
+    path = str(tmp_path / "snapshot.jsonl.gz")
+    write_snapshot(path)
+    db.session.add(Category(name="Verb"))
+    db.session.commit()
+    assert len(get_reference_data().categories) == 2
+
+    restore_snapshot(path)
+
+    assert [c.name for c in get_reference_data().categories] == ["Noun"]
+
+
+def test_cli_backup_and_restore(app, words, tmp_path):
+    """flask backup and flask restore round-trip through the CLI."""
+    path = str(tmp_path / "cli.jsonl.gz")
+    runner = app.test_cli_runner()
+
+    result = runner.invoke(args=["backup", "--output", path])
+    assert result.exit_code == 0, result.output
+    assert "words=2" in result.output
+
+    result = runner.invoke(args=["restore", path, "--verify-only"])
+    assert result.exit_code == 0, result.output
+    assert "Checksum OK" in result.output
+
+    Word.query.delete()
+    db.session.commit()
+    result = runner.invoke(args=["restore", path, "--yes"])
+    assert result.exit_code == 0, result.output
+    assert "Restored 7 rows" in result.output
+    assert Word.query.count() == 2
@@ -0,0 +1,350 @@
+"""Tests for the two-tier cache."""
+
+import threading
+import time
+
+import pytest
+
+from app import db
+from app.cache import (COALESCED, LOCAL_HIT, MISS, SHARED_HIT, STALE, Cache, LocalTier,
+                       SingleFlight, SQLiteTier, cached, create_shared_tier)
+from app.changes import WORDS
+from app.models import User, Word
+from app.query_budget import record_queries
+
+
+class Counter:
+    """Callable returning how many times it has been called."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.calls
+
+
+@cached(versions=(WORDS,))
+def word_count(prefix=""):
+    return Word.query.filter(Word.word.startswith(prefix)).count()
+
+
+class Gate:
+    """Compute function that blocks until opened, counting its calls."""
+
+    def __init__(self):
+        self.calls = 0
+        self.started = threading.Event()
+        self.opened = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        assert self.opened.wait(5)
+        return self.calls
+
+
+def add_word(word):
+    nick = User.query.filter_by(username="nick").first()
+    db.session.add(Word(word=word, user_id=nick.id))
+    db.session.commit()
+
+
+def test_local_tier_is_lru_bounded():
+    """The least recently used entry goes when the tier is full."""
+    tier = LocalTier(max_entries=2)
+    tier.set("a", [], None, 1)
+    tier.set("b", [], None, 2)
+    tier.get("a")
+    tier.set("c", [], None, 3)
+
+    assert tier.get("b") is None
+    assert tier.get("a")[2] == 1
+    assert len(tier) == 2
+
+
+def test_ttl_expires_entries(app, monkeypatch):
+    """An entry is recomputed once its TTL has run out."""
+    cache = Cache(LocalTier())
+    compute = Counter()
+    now = [1000.0]
+    monkeypatch.setattr("app.cache.time.time", lambda: now[0])
+
+    assert cache.get("ns", "key", compute, ttl=10) == 1
+    now[0] += 9
+    assert cache.get("ns", "key", compute, ttl=10) == 1
+    now[0] += 2
+    assert cache.get("ns", "key", compute, ttl=10) == 2
+
+
+def test_tags_invalidate(app):
+    """Invalidating a tag recomputes only the values cached with it."""
+    cache = Cache(LocalTier())
+    tagged, untagged = Counter(), Counter()
+    cache.get("ns", "tagged", tagged, tags=("birthdate",))
+    cache.get("ns", "untagged", untagged)
+
+    cache.invalidate("birthdate")
+
+    assert cache.get("ns", "tagged", tagged, tags=("birthdate",)) == 2
+    assert cache.get("ns", "untagged", untagged) == 1
+
+
+def test_decorator_follows_data_version(app, seeded_db):
+    """Results are kept per arguments until the words data version moves."""
+    add_word("apple")
+    with app.test_request_context():
+        assert word_count("a") == 1
+        with record_queries() as statements:
+            assert word_count("a") == 1
+            assert word_count("b") == 0
+        # The request's version check is reused; only new arguments query
+        assert len(statements) == 1
+        assert "count(" in statements[0]
+
+        add_word("avocado")
+        assert word_count("a") == 2
+
+    stats = app.extensions["cache"].stats()[word_count.cache_namespace]
+    assert (stats[LOCAL_HIT], stats[MISS]) == (1, 3)
+    assert stats["hit_ratio"] == 0.25
+
+
+def test_decorator_without_app_calls_through():
+    """Outside an app the function simply runs."""
+    assert cached()(lambda x: x * 2)(21) == 42
+
+
+def test_shared_tier_serves_other_workers(app, tmp_path):
+    """A value computed by one worker is a shared hit for the next."""
+    path = str(tmp_path / "cache.db")
+    first = Cache(LocalTier(), SQLiteTier(path))
+    second = Cache(LocalTier(), SQLiteTier(path))
+    compute = Counter()
+
+    assert first.get("ns", "key", compute, versions=(WORDS,)) == 1
+    assert second.get("ns", "key", compute, versions=(WORDS,)) == 1
+    assert second.get("ns", "key", compute, versions=(WORDS,)) == 1
+
+    assert compute.calls == 1
+    stats = second.stats()["ns"]
+    assert (stats[LOCAL_HIT], stats[SHARED_HIT], stats[MISS], stats["hit_ratio"]) == (1, 1, 0, 1.0)
+
+
+def test_shared_tags_reach_other_workers(app, tmp_path):
+    """A tag invalidated by one worker expires the others' local copies."""
+    path = str(tmp_path / "cache.db")
+    first = Cache(LocalTier(), SQLiteTier(path))
+    second = Cache(LocalTier(), SQLiteTier(path))
+    compute = Counter()
+    second.get("ns", "key", compute, tags=("t",))
+
+    first.invalidate("t")
+
+    assert second.get("ns", "key", compute, tags=("t",)) == 2
+
+
+def test_shared_tier_is_size_bounded(tmp_path):
+    """The oldest entries are evicted past the byte bound."""
+    tier = SQLiteTier(str(tmp_path / "cache.db"), max_bytes=10_000)
+    for n in range(10):
+        tier.set(f"key{n}", [[], []], None, "x" * 2000)
+
+    assert tier.size() <= 10_000
+    assert tier.get("key0") is None
+    assert tier.get("key9")[2] == "x" * 2000
+
+
+def test_create_shared_tier(tmp_path):
+    """Storage is memory (no shared tier) or a SQLite file."""
+    assert create_shared_tier("memory", 1024) is None
+    assert isinstance(create_shared_tier(f"sqlite:///{tmp_path}/c.db", 1024), SQLiteTier)
+    with pytest.raises(ValueError):
+        create_shared_tier("redis://localhost", 1024)
+
+
+def test_metrics_report_lookups(authenticated_client, sample_words):
+    """Cache lookups per function appear on /metrics."""
+    authenticated_client.get("/stats")
+    authenticated_client.get("/stats")
+
+    body = authenticated_client.get("/metrics").get_data(as_text=True)
+
+    assert 'cache_lookups_total{name="app.stats_cube.get_stats_cube",result="local_hit"' in body
+    assert "cache_local_entries" in body
+
+
+def test_single_flight_shares_one_computation():
+    """Callers arriving during a computation wait for it and share its value."""
+    flights = SingleFlight()
+    gate = Gate()
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flights.run("k", gate)))
+    leader.start()
+    gate.started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flights.run("k", gate)))
+                 for _ in range(3)]
+    for thread in followers:
+        thread.start()
+
+    gate.opened.set()
+    for thread in [leader, *followers]:
+        thread.join(5)
+
+    assert gate.calls == 1
+    assert sorted(results, key=lambda r: not r[1]) == [(1, True), (1, False), (1, False), (1, False)]
+
+
+def test_single_flight_shares_errors():
+    """Waiters get the computation's exception."""
+    flights = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+
+    def fail():
+        started.set()
+        release.wait(5)
+        raise RuntimeError("boom")
+
+    errors = []
+
+    def call():
+        try:
+            flights.run("k", fail)
+        except RuntimeError as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=call)]
+    threads[0].start()
+    started.wait(5)
+    threads.append(threading.Thread(target=call))
+    threads[1].start()
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(errors) == 2 and errors[0] is errors[1]
+
+
+def test_commit_detaches_running_flights():
+    """After a data set changes, new callers start a fresh computation."""
+    flights = SingleFlight()
+    gate = Gate()
+    thread = threading.Thread(target=flights.run, args=("k", gate), kwargs={"depends_on": (WORDS,)})
+    thread.start()
+    gate.started.wait(5)
+
+    flights.forget({WORDS})
+
+    assert not flights.running("k")
+    gate.opened.set()
+    thread.join(5)
+
+
+def test_stale_served_while_refreshing(app, monkeypatch):
+    """Within the grace window, callers get the stale value during a refresh."""
+    cache = Cache(LocalTier(), stale_grace=30, refresh_async=True, app=app)
+    gate = Gate()
+    now = [1000.0]
+    monkeypatch.setattr("app.cache.time.time", lambda: now[0])
+    gate.opened.set()
+    assert cache.get("ns", "key", gate, ttl=10) == 1
+    gate.opened.clear()
+    now[0] += 11
+
+    assert cache.get("ns", "key", gate, ttl=10) == 1
+    gate.started.wait(5)
+    assert cache.get("ns", "key", gate, ttl=10) == 1
+    gate.opened.set()
+    for _ in range(100):
+        if not cache._refreshing:
+            break
+        time.sleep(0.01)
+
+    assert cache.get("ns", "key", gate, ttl=10) == 2
+    stats = cache.stats()["ns"]
+    assert (stats[MISS], stats[STALE], stats[LOCAL_HIT]) == (2, 2, 1)
+
+
+def test_stale_not_served_past_grace(app, monkeypatch):
+    """Without a grace window the caller that finds an entry stale recomputes."""
+    cache = Cache(LocalTier(), stale_grace=0, app=app)
+    compute = Counter()
+    now = [1000.0]
+    monkeypatch.setattr("app.cache.time.time", lambda: now[0])
+    cache.get("ns", "key", compute, ttl=10)
+    now[0] += 11
+
+    assert cache.get("ns", "key", compute, ttl=10) == 2
+
+
+def test_concurrent_misses_compute_once(app):
+    """Callers missing the same entry together share one computation."""
+    cache = Cache(LocalTier(), app=app)
+    gate = Gate()
+    results = []
+
+    def get():
+        with app.app_context():
+            results.append(cache.get("ns", "key", gate))
+
+    threads = [threading.Thread(target=get) for _ in range(4)]
+    threads[0].start()
+    gate.started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    gate.opened.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == [1, 1, 1, 1]
+    stats = cache.stats()["ns"]
+    assert (stats[MISS], stats[COALESCED]) == (1, 3)
+
+
+def test_shared_lock_defers_to_other_worker(app, tmp_path):
+    """With the shared lock held elsewhere, a worker reads the holder's result."""
+    path = str(tmp_path / "cache.db")
+    other = SQLiteTier(path)
+    cache = Cache(LocalTier(), SQLiteTier(path), shared_lock=True, lock_timeout=5)
+    compute = Counter()
+    assert other.acquire("ns:'key'", 5)
+    assert not other.acquire("ns:'key'", 5)
+    timer = threading.Timer(0.1, other.set, args=("ns:'key'", [[], []], None, "theirs"))
+    timer.start()
+
+    assert cache.get("ns", "key", compute) == "theirs"
+    assert compute.calls == 0
+    assert cache.stats()["ns"][SHARED_HIT] == 1
+
+    other.release("ns:'key'")
+    assert other.acquire("ns:'key'", 5)
+
+
+def test_writes_are_never_served_stale(app, seeded_db):
+    """An entry made stale by a write is recomputed, even within the grace window."""
+    cache = Cache(LocalTier(), stale_grace=30, refresh_async=True, app=app)
+
+    def count():
+        return Word.query.count()
+
+    with app.test_request_context():
+        assert cache.get("ns", "count", count, versions=(WORDS,)) == 0
+    with app.test_request_context():
+        add_word("ball")
+        assert cache.get("ns", "count", count, versions=(WORDS,)) == 1
+    with app.test_request_context():
+        assert cache.get("ns", "count", count, versions=(WORDS,)) == 1
+    assert cache.stats()["ns"][STALE] == 0
+
+
+def test_grace_runs_from_expiry(app, monkeypatch):
+    """An entry first looked up after its grace window has passed is recomputed."""
+    cache = Cache(LocalTier(), stale_grace=30, refresh_async=True, app=app)
+    compute = Counter()
+    now = [1000.0]
+    monkeypatch.setattr("app.cache.time.time", lambda: now[0])
+    cache.get("ns", "key", compute, ttl=10)
+    now[0] += 10 + 31
+
+    assert cache.get("ns", "key", compute, ttl=10) == 2
+    assert cache.stats()["ns"][STALE] == 0
@@ -0,0 +1,298 @@
+"""Tests for the word change log, change feed and incremental exports."""
+
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import changes, data_versions, db
+from app.backup import restore_snapshot, write_snapshot
+from app.changes import compact_changes, get_changes, latest_seq
+from app.datagen import generate_dataset
+from app.init_db import seed_categories
+from app.models import User, Word, WordChange
+
+
+def log():
+    """Return (op, word_id, word text) for every log entry, oldest first."""
+    return [
+        (change["op"], change["word_id"], (change["word"] or {}).get("word"))
+        for change in get_changes(limit=1000)["changes"]
+    ]
+
+
+def add(word):
+    """Add a word through the ORM as nick."""
+    nick = User.query.filter_by(username="nick").first()
+    entry = Word(word=word, user_id=nick.id)
+    db.session.add(entry)
+    db.session.commit()
+    return entry
+
+
+def test_route_writes_are_logged(authenticated_client, seeded_db):
+    """Add, edit and delete each append an entry with the row image."""
+    authenticated_client.post("/words/add", data={"word": "ball"})
+    word = Word.query.filter_by(word="ball").one()
+    authenticated_client.post(f"/words/{word.id}/edit", data={"word": "balls"})
+    authenticated_client.post(f"/words/{word.id}/delete")
+
+    assert log() == [
+        ("insert", word.id, "ball"),
+        ("update", word.id, "balls"),
+        ("delete", word.id, "balls"),
+    ]
+    update = get_changes(limit=10)["changes"][1]
+    assert update["word"]["user_id"] == word.user_id
+    assert datetime.fromisoformat(update["word"]["updated_at"])
+
+
+def test_failed_write_logs_nothing(authenticated_client, seeded_db):
+    """Rolled-back changes leave no entries behind."""
+    add("ball")
+    before = latest_seq()
+
+    db.session.add(Word(word="dog", user_id=None))
+    with pytest.raises(Exception):
+        db.session.commit()
+    db.session.rollback()
+
+    assert latest_seq() == before
+
+
+def test_unmodified_words_not_logged(seeded_db):
+    """Touching a word without changing it does not append an entry."""
+    add("ball")
+    before = latest_seq()
+
+    word = Word.query.filter_by(word="ball").one()
+    word.word = "ball"
+    db.session.commit()
+
+    assert latest_seq() == before
+
+
+def test_sync_inserts_logged(authenticated_client, seeded_db):
+    """Words stored by the bulk sync path are logged too."""
+    response = authenticated_client.post("/api/sync", json={"words": [
+        {"client_id": str(uuid.uuid4()), "word": "milk"},
+        {"client_id": str(uuid.uuid4()), "word": "more"},
+    ]})
+
+    assert [entry[0::2] for entry in log()] == [("insert", "milk"), ("insert", "more")]
+    assert response.get_json()["cursor"] == str(latest_seq())
+
+
+def test_writers_lock_before_versions(authenticated_client, seeded_db, monkeypatch):
+    """ORM and bulk writes both take the write lock before any version row."""
+    events = []
+    real_lock = data_versions.lock_writes
+
+    def lock_writes(connection):
+        events.append("lock")
+        real_lock(connection)
+
+    def record_write(conn, cursor, statement, parameters, context, executemany):
+        for table in ("data_versions", "word_changes"):
+            if statement.lstrip().upper().startswith(("INSERT", "UPDATE")) and table in statement:
+                events.append(table)
+
+    monkeypatch.setattr(data_versions, "lock_writes", lock_writes)
+    monkeypatch.setattr(changes, "lock_writes", lock_writes)
+    event.listen(db.engine, "before_cursor_execute", record_write)
+    try:
+        add("ball")
+        orm_events, events[:] = list(events), []
+        authenticated_client.post("/api/sync", json={"words": [
+            {"client_id": str(uuid.uuid4()), "word": "milk"},
+        ]})
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record_write)
+
+    for writes in (orm_events, events):
+        assert writes[0] == "lock"
+        assert {"data_versions", "word_changes"} <= set(writes)
+
+
+def test_pages_follow_cursor(seeded_db):
+    """Readers page through the log with the returned cursor."""
+    for word in ("a", "b", "c"):
+        add(word)
+
+    first = get_changes(since=0, limit=2)
+    second = get_changes(since=first["cursor"], limit=2)
+    third = get_changes(since=second["cursor"], limit=2)
+
+    assert [c["word"]["word"] for c in first["changes"]] == ["a", "b"]
+    assert first["has_more"] is True
+    assert [c["word"]["word"] for c in second["changes"]] == ["c"]
+    assert second["has_more"] is False
+    assert third == {"changes": [], "cursor": second["cursor"], "has_more": False, "reset": False}
+
+
+def test_bulk_generation_logs_reset(seeded_db):
+    """Synthetic data is logged as one reset instead of per-row entries."""
+    seed_categories()
+    add("ball")
+    cursor = latest_seq()
+
+    generate_dataset(words=50, seed=1, reset=True)
+
+    page = get_changes(since=cursor)
+    assert page["reset"] is True
+    assert [c["op"] for c in page["changes"]] == ["reset"]
+
+
+def test_cursor_ahead_of_log_means_reset(seeded_db):
+    """A cursor past the end of the log (an older restore) forces a re-read."""
+    add("ball")
+
+    assert get_changes(since=latest_seq() + 5)["reset"] is True
+
+
+def test_api_changes(authenticated_client, seeded_db):
+    """The JSON feed pages the log and rejects malformed cursors."""
+    add("ball")
+    add("dog")
+
+    response = authenticated_client.get("/api/changes?since=0&limit=1")
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [c["word"]["word"] for c in data["changes"]] == ["ball"]
+    assert data["has_more"] is True
+
+    data = authenticated_client.get(f"/api/changes?since={data['cursor']}").get_json()
+    assert [c["word"]["word"] for c in data["changes"]] == ["dog"]
+
+    assert authenticated_client.get("/api/changes?since=-1").status_code == 400
+
+
+@pytest.mark.parametrize("url", ["/api/changes?since=", "/export?since="])
+@pytest.mark.parametrize("since", [str(2**63), "9" * 40, "-1", "１２"])
+def test_cursor_out_of_range_is_rejected(authenticated_client, seeded_db, url, since):
+    """Positions outside 0..2**63-1 are a client error, not a database error."""
+    assert authenticated_client.get(url + since).status_code == 400
+
+
+def test_largest_cursor_is_accepted(authenticated_client, seeded_db):
+    """The largest 64-bit position is valid; nothing comes after it."""
+    for url in ("/api/changes?since=", "/export?since="):
+        assert authenticated_client.get(f"{url}{2**63 - 1}").status_code == 200
+
+
+def test_positions_are_64_bit():
+    """The log column holds every position parse_cursor accepts, on Postgres too."""
+    seq = WordChange.__table__.c.seq.type
+    assert seq.compile(dialect=postgresql.dialect()) == "BIGINT"
+    assert seq.compile(dialect=sqlite.dialect()) == "INTEGER"
+
+
+def test_api_changes_requires_login(client, seeded_db):
+    """Anonymous clients get a 401 JSON error."""
+    assert client.get("/api/changes").status_code == 401
+
+
+def test_compaction_keeps_latest_per_word(seeded_db):
+    """Superseded entries go; each word's newest entry and tombstone stay."""
+    ball = add("ball")
+    dog = add("dog")
+    ball.word = "balls"
+    db.session.commit()
+    db.session.delete(dog)
+    db.session.commit()
+
+    removed = compact_changes()
+
+    assert removed == 2
+    assert log() == [("update", ball.id, "balls"), ("delete", dog.id, "dog")]
+
+
+def test_compaction_respects_horizon(seeded_db):
+    """Entries newer than the keep-days horizon are left alone."""
+    ball = add("ball")
+    ball.word = "balls"
+    db.session.commit()
+
+    assert compact_changes(keep_days=7) == 0
+
+    WordChange.query.filter(WordChange.seq == 1).update(
+        {"changed_at": datetime.now(timezone.utc) - timedelta(days=30)}
+    )
+    db.session.commit()
+    assert compact_changes(keep_days=7) == 1
+
+
+def test_incremental_backup_round_trip(seeded_db, tmp_path):
+    """A full snapshot plus an incremental one reproduce the latest state."""
+    full = str(tmp_path / "full.jsonl.gz")
+    incremental = str(tmp_path / "changes.jsonl.gz")
+    ball = add("ball")
+    dog = add("dog")
+    through = write_snapshot(full)["through"]
+
+    ball.word = "balls"
+    db.session.delete(dog)
+    db.session.commit()
+    cat = add("cat")
+    result = write_snapshot(incremental, since=through)
+    assert result["tables"] == {"word_changes": 3}
+    expected = sorted((w.id, w.word) for w in Word.query)
+
+    restore_snapshot(full)
+    assert sorted(w.word for w in Word.query) == ["ball", "dog"]
+    restore_snapshot(incremental)
+    db.session.expire_all()
+
+    assert sorted((w.id, w.word) for w in Word.query) == expected
+    assert db.session.get(Word, cat.id).user_id == cat.user_id
+    # Ids handed out before the restore are not reused
+    assert add("egg").id > cat.id
+
+
+def test_incremental_restore_requires_matching_position(seeded_db, tmp_path):
+    """An incremental snapshot only applies at the position it continues from."""
+    path = str(tmp_path / "changes.jsonl.gz")
+    add("ball")
+    add("dog")
+    write_snapshot(path, since=1)
+
+    with pytest.raises(ValueError, match="continues from change 1"):
+        restore_snapshot(path)
+    assert Word.query.count() == 2
+
+
+def test_incremental_export(authenticated_client, seeded_db):
+    """?since= exports only the changes after the cursor."""
+    ball = add("ball")
+    cursor = latest_seq()
+    add("dog")
+    db.session.delete(ball)
+    db.session.commit()
+
+    response = authenticated_client.get(f"/export?since={cursor}")
+
+    assert response.status_code == 200
+    lines = response.data.decode("utf-8-sig").strip().splitlines()
+    assert lines[0] == "Seq,Change,Word,Date Added,Added By,Category"
+    assert [line.split(",")[1:3] for line in lines[1:]] == [["insert", "dog"], ["delete", "ball"]]
+    assert response.headers["X-Changes-Cursor"] == str(latest_seq())
+    assert "emily_changes_since_" in response.headers["Content-Disposition"]
+    assert authenticated_client.get("/export?since=x").status_code == 400
+
+
+def test_cli_lists_and_compacts(app, seeded_db):
+    """flask changes prints JSON lines and compacts on request."""
+    ball = add("ball")
+    ball.word = "balls"
+    db.session.commit()
+    runner = app.test_cli_runner()
+
+    result = runner.invoke(args=["changes", "--since", "0"])
+    assert result.exit_code == 0, result.output
+    assert '"op": "update"' in result.output
+
+    result = runner.invoke(args=["changes", "--compact"])
+    assert result.exit_code == 0, result.output
+    assert "Removed 1 superseded" in result.output
@@ -0,0 +1,118 @@
+"""Tests for the synthetic dataset generator."""
+
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import func, inspect
+
+from app import db
+from app.datagen import generate_dataset, iter_word_rows, synthetic_word
+from app.models import Category, User, Word
+
+
+@pytest.fixture
+def categories(seeded_db):
+    """Create the default categories used by the generator's mix."""
+    for name in ("Noun", "Verb", "Animal Sound", "Person", "Other"):
+        db.session.add(Category(name=name))
+    db.session.commit()
+
+
+class TestSyntheticWord:
+    """Tests for synthetic word text."""
+
+    def test_starts_with_real_first_words(self):
+        """First generated words are real first words."""
+        assert synthetic_word(0) == "mama"
+        assert synthetic_word(1) == "dada"
+
+    def test_words_are_unique(self):
+        """Every index maps to a distinct case-insensitive word."""
+        words = [synthetic_word(i).lower() for i in range(20000)]
+        assert len(set(words)) == len(words)
+
+
+class TestIterWordRows:
+    """Tests for row generation."""
+
+    def test_deterministic_for_seed(self):
+        """The same seed always yields the same rows."""
+        users = {"nick": 1, "wife": 2}
+        cats = {"Noun": 1, "Verb": 2}
+        first = list(iter_word_rows(users, cats, words=500, seed=7))
+        second = list(iter_word_rows(users, cats, words=500, seed=7))
+        assert first == second
+        assert first != list(iter_word_rows(users, cats, words=500, seed=8))
+
+    def test_dates_follow_growth_window(self):
+        """Dates are ordered and fall within the configured age range."""
+        rows = list(iter_word_rows(
+            {"nick": 1, "wife": 2}, {"Noun": 1}, words=1000,
+            birthdate=date(2022, 1, 1), months=36,
+        ))
+        dates = [row[1] for row in rows]
+        assert dates == sorted(dates)
+        assert dates[0] >= "2022-11-01"
+        assert dates[-1] < "2025-01-02"
+
+    def test_children_split_words(self):
+        """Words are split evenly across children."""
+        rows = list(iter_word_rows({"nick": 1}, {}, words=101, children=2))
+        assert len(rows) == 101
+
+
+class TestGenerateDataset:
+    """Tests for bulk insertion."""
+
+    def test_inserts_words(self, app, categories):
+        """Generated rows are written to the words table."""
+        result = generate_dataset(words=2000, batch_size=300)
+
+        assert result["words"] == 2000
+        assert Word.query.count() == 2000
+        word = Word.query.order_by(Word.id).first()
+        assert word.word == "mama"
+        assert isinstance(word.date_added, datetime)
+
+    def test_uses_both_users_and_category_mix(self, app, categories):
+        """Words are spread over both parents and several categories."""
+        generate_dataset(words=2000)
+
+        user_counts = dict(
+            db.session.query(Word.user_id, func.count(Word.id)).group_by(Word.user_id).all()
+        )
+        assert len(user_counts) == User.query.count() == 2
+        category_ids = {row[0] for row in db.session.query(Word.category_id).distinct()}
+        assert None in category_ids
+        assert len(category_ids) == 6
+
+    def test_rebuilds_word_indexes(self, app, categories):
+        """Indexes dropped for the load are all back afterwards."""
+        def index_names():
+            return {index["name"] for index in inspect(db.session.connection()).get_indexes("words")}
+        before = index_names()
+
+        generate_dataset(words=500)
+
+        assert "ix_words_user_date" in before
+        assert index_names() == before
+
+    def test_refuses_to_overwrite_without_reset(self, app, categories):
+        """Existing words are only replaced when reset is requested."""
+        generate_dataset(words=100)
+
+        with pytest.raises(ValueError):
+            generate_dataset(words=100)
+
+        generate_dataset(words=50, reset=True)
+        assert Word.query.count() == 50
+
+
+def test_generate_data_command(app, categories):
+    """The flask CLI command generates the requested number of words."""
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=["generate-data", "--words", "300", "--seed", "3"])
+
+    assert result.exit_code == 0, result.output
+    assert "Inserted 300 words" in result.output
+    assert Word.query.count() == 300
@@ -0,0 +1,130 @@
+"""Tests for the group-commit write path."""
+
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import pytest
+
+from app.group_commit import GroupCommitter
+from app.models import User, Word
+
+
+@pytest.fixture
+def committer(app, seeded_db):
+    """Group committer with a window wide enough to batch test threads."""
+    return GroupCommitter(app, window_ms=50, max_batch=100)
+
+
+def add_concurrently(committer, words, user_id):
+    """Submit words from one thread each and return results in input order."""
+    results = [None] * len(words)
+
+    def worker(index, word):
+        results[index] = committer.add_word(word, user_id)
+
+    threads = [threading.Thread(target=worker, args=(i, w)) for i, w in enumerate(words)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_adds_share_transactions(committer):
+    """Concurrent inserts are committed together, each getting its own id."""
+    user = User.query.filter_by(username="nick").first()
+    words = [f"word{i}" for i in range(10)]
+
+    results = add_concurrently(committer, words, user.id)
+
+    assert all(result["status"] == "added" for result in results)
+    assert len({result["id"] for result in results}) == 10
+    assert Word.query.count() == 10
+    assert committer.items == 10
+    assert committer.batches < 10
+
+
+def test_duplicates_detected_within_and_across_batches(committer):
+    """Duplicates are reported against stored words and earlier batch entries."""
+    user = User.query.filter_by(username="nick").first()
+    first = committer.add_word("Ball", user.id)
+
+    results = add_concurrently(committer, ["ball", "dog", "DOG"], user.id)
+
+    statuses = sorted(result["status"] for result in results)
+    assert statuses == ["added", "duplicate", "duplicate"]
+    assert results[0] == {"status": "duplicate", "word": "Ball", "id": first["id"]}
+    assert Word.query.count() == 2
+
+
+def test_timed_out_insert_is_never_written(committer):
+    """An insert still queued at its timeout is withdrawn, so a retry can't duplicate it."""
+    user = User.query.filter_by(username="nick").first()
+    entered, release = threading.Event(), threading.Event()
+    insert = committer._insert
+
+    def blocking_insert(batch):
+        if batch[0].word == "slow":
+            entered.set()
+            release.wait(5)
+        return insert(batch)
+
+    committer._insert = blocking_insert
+    committer.timeout = 0.3
+    slow = []
+    thread = threading.Thread(target=lambda: slow.append(committer.add_word("slow", user.id)))
+    thread.start()
+    assert entered.wait(5)
+
+    with pytest.raises(FutureTimeoutError):
+        committer.add_word("late", user.id)
+    release.set()
+    thread.join(5)
+    retried = committer.add_word("late", user.id)
+
+    assert slow[0]["status"] == "added"
+    assert retried["status"] == "added"
+    assert Word.query.filter_by(word="late").count() == 1
+    assert committer.items == 2
+
+
+def test_failed_insert_only_fails_its_request(committer):
+    """A bad row fails alone; the rest of its batch still commits."""
+    user = User.query.filter_by(username="nick").first()
+    outcomes = {}
+
+    def worker(word, user_id):
+        try:
+            outcomes[word] = committer.add_word(word, user_id)["status"]
+        except Exception as exc:
+            outcomes[word] = type(exc).__name__
+
+    threads = [
+        threading.Thread(target=worker, args=("good", user.id)),
+        threading.Thread(target=worker, args=("orphan", None)),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert outcomes["good"] == "added"
+    assert outcomes["orphan"] == "IntegrityError"
+    assert Word.query.filter_by(word="good").count() == 1
+
+
+def test_add_word_route_uses_group_commit(app, authenticated_client):
+    """The add route reports success and duplicates through the committer."""
+    app.config["GROUP_COMMIT_ENABLED"] = True
+
+    response = authenticated_client.post(
+        "/words/add", data={"word": "moo"}, follow_redirects=True
+    )
+    assert b"Added &#34;moo&#34;" in response.data or b'Added "moo"' in response.data
+    assert app.extensions["group_committer"].items == 1
+
+    response = authenticated_client.post(
+        "/words/add", data={"word": "MOO"}, follow_redirects=True
+    )
+    assert b"already been added" in response.data
+    assert Word.query.count() == 1
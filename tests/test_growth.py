@@ -0,0 +1,116 @@
+"""Tests for the chart growth series."""
+
+import math
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app import db
+from app.growth import add_months, cumulative_series, load_daily_counts, lttb
+from app.models import User, Word
+from app.query_budget import record_queries
+
+START = datetime(2025, 1, 1, 8, 0)
+
+
+@pytest.fixture
+def words(seeded_db):
+    """Two words on Jan 1, one on Jan 2 and one on Feb 10, 2025."""
+    nick = User.query.filter_by(username="nick").first()
+    for word, offset in (("a", 0), ("b", 0.5), ("c", 1), ("d", 40)):
+        db.session.add(Word(word=word, user_id=nick.id,
+                            date_added=START + timedelta(days=offset)))
+    db.session.commit()
+
+
+def test_daily_counts(words):
+    """Words are counted per calendar day in one grouped query."""
+    assert load_daily_counts() == [
+        (date(2025, 1, 1), 2), (date(2025, 1, 2), 1), (date(2025, 2, 10), 1),
+    ]
+
+
+@pytest.mark.parametrize("resolution, expected", [
+    ("day", [("2025-01-01", 2, 2), ("2025-01-02", 1, 3), ("2025-02-10", 1, 4)]),
+    ("week", [("2024-12-30", 3, 3), ("2025-02-10", 1, 4)]),
+    ("month", [("2025-01-01", 3, 3), ("2025-02-01", 1, 4)]),
+])
+def test_api_series_by_resolution(authenticated_client, words, resolution, expected):
+    """Each resolution buckets the words and carries a running total."""
+    response = authenticated_client.get(f"/api/growth?resolution={resolution}")
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [(p["date"], p["added"], p["total"]) for p in data["points"]] == expected
+    assert data["total"] == 4
+    assert data["downsampled"] is False
+
+
+def test_api_milestone_bands(app, authenticated_client, words):
+    """Milestone ranges come along, dated from the birthdate when known."""
+    app.config["BABY_BIRTHDATE"] = "2024-01-31"
+
+    bands = authenticated_client.get("/api/growth").get_json()["milestones"]
+
+    assert bands[0] == {"label": "12 months", "age_months": 12, "min_words": 1,
+                        "max_words": 3, "date": "2025-01-31"}
+    assert bands[-1]["max_words"] is None
+
+
+def test_api_rejects_bad_arguments(authenticated_client, seeded_db):
+    """Unknown resolutions and tiny point counts are rejected."""
+    assert authenticated_client.get("/api/growth?resolution=year").status_code == 400
+    assert authenticated_client.get("/api/growth?points=2").status_code == 400
+    assert authenticated_client.get("/api/growth?points=x").status_code == 400
+
+
+def test_series_cached_per_data_version(authenticated_client, words):
+    """A repeat load costs only the version check until a word is added."""
+    first = authenticated_client.get("/api/growth?resolution=week").get_json()
+
+    with record_queries() as statements:
+        again = authenticated_client.get("/api/growth?resolution=week").get_json()
+    assert again == first
+    assert not any("FROM words" in statement for statement in statements)
+
+    authenticated_client.post("/words/add", data={"word": "e"})
+    updated = authenticated_client.get("/api/growth?resolution=week").get_json()
+    assert updated["total"] == 5
+
+
+def test_lttb_keeps_endpoints_and_peaks():
+    """Downsampling keeps the first, last and most prominent points."""
+    points = [(x, math.sin(x / 10) * 100) for x in range(1000)]
+    points[500] = (500, 1000)
+
+    kept = lttb(points, 50)
+
+    assert len(kept) == 50
+    assert kept[0] == points[0] and kept[-1] == points[-1]
+    assert (500, 1000) in kept
+    assert [p[0] for p in kept] == sorted(p[0] for p in kept)
+    assert lttb(points[:10], 50) == points[:10]
+
+
+def test_api_downsamples_to_points(authenticated_client, seeded_db):
+    """Long daily histories come back with at most the requested points."""
+    nick = User.query.filter_by(username="nick").first()
+    db.session.add_all(
+        Word(word=f"w{n}", user_id=nick.id, date_added=START + timedelta(days=n))
+        for n in range(300)
+    )
+    db.session.commit()
+
+    data = authenticated_client.get("/api/growth?points=30").get_json()
+
+    assert data["downsampled"] is True
+    assert len(data["points"]) == 30
+    assert data["points"][0]["total"] == 1
+    assert data["points"][-1]["total"] == 300
+
+
+def test_helpers():
+    """Month arithmetic clamps to month end; series roll up in order."""
+    assert add_months(date(2024, 1, 31), 1) == date(2024, 2, 29)
+    assert add_months(date(2024, 11, 15), 14) == date(2026, 1, 15)
+    assert cumulative_series([]) == []
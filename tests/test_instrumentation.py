@@ -0,0 +1,100 @@
+"""Tests for request/SQL instrumentation and the metrics endpoint."""
+
+import pytest
+
+from app.instrumentation import metrics
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    """Start each test with an empty metrics registry."""
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def test_server_timing_header(authenticated_client, sample_words):
+    """Responses carry db, render and total Server-Timing entries."""
+    response = authenticated_client.get("/words")
+    timing = response.headers["Server-Timing"]
+
+    assert "db;dur=" in timing
+    assert "render;dur=" in timing
+    assert "total;dur=" in timing
+
+
+def test_login_times_bcrypt(client, seeded_db):
+    """Password checks show up as a bcrypt phase."""
+    response = client.post("/login", data={"username": "nick", "password": "testpass"})
+    assert "bcrypt;dur=" in response.headers["Server-Timing"]
+
+
+def test_metrics_endpoint_reports_routes(authenticated_client, sample_words):
+    """Metrics expose latency histograms and query counts per endpoint."""
+    authenticated_client.get("/")
+    authenticated_client.get("/stats")
+
+    response = authenticated_client.get("/metrics")
+    body = response.data.decode()
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    assert 'http_request_duration_seconds_bucket{endpoint="main.index"' in body
+    assert 'http_request_duration_seconds_count{endpoint="main.stats"' in body
+    assert 'db_queries_total{endpoint="main.index"' in body
+    assert 'http_requests_total{endpoint="main.index",method="GET",status="200"' in body
+
+
+def test_metrics_histogram_is_cumulative(authenticated_client, seeded_db):
+    """The +Inf bucket matches the request count."""
+    for _ in range(3):
+        authenticated_client.get("/stats")
+
+    body = authenticated_client.get("/metrics").data.decode()
+    inf_line = next(
+        line for line in body.splitlines()
+        if line.startswith('http_request_duration_seconds_bucket{endpoint="main.stats"')
+        and 'le="+Inf"' in line
+    )
+    assert inf_line.endswith(" 3")
+
+
+def test_metrics_token_required(app, client):
+    """A configured METRICS_TOKEN must be presented as a bearer token."""
+    app.config["METRICS_TOKEN"] = "secret"
+
+    assert client.get("/metrics").status_code == 401
+    response = client.get("/metrics", headers={"Authorization": "Bearer secret"})
+    assert response.status_code == 200
+
+
+def test_production_requires_metrics_token(monkeypatch):
+    """Production refuses to start with /metrics open to anyone."""
+    from config import ProductionConfig
+
+    monkeypatch.setattr(ProductionConfig, "SECRET_KEY", "not-the-default")
+    monkeypatch.setattr(ProductionConfig, "METRICS_TOKEN", None)
+    with pytest.raises(ValueError, match="METRICS_TOKEN"):
+        ProductionConfig()
+
+    monkeypatch.setattr(ProductionConfig, "INSTRUMENTATION_ENABLED", False)
+    ProductionConfig()
+    monkeypatch.setattr(ProductionConfig, "INSTRUMENTATION_ENABLED", True)
+    monkeypatch.setattr(ProductionConfig, "METRICS_TOKEN", "secret")
+    ProductionConfig()
+
+
+def test_instrumentation_can_be_disabled():
+    """No hooks or endpoint are installed when instrumentation is disabled."""
+    from app import create_app
+    from config import TestingConfig
+
+    TestingConfig.INSTRUMENTATION_ENABLED = False
+    try:
+        app = create_app("testing")
+    finally:
+        TestingConfig.INSTRUMENTATION_ENABLED = True
+
+    response = app.test_client().get("/static/css/style.css")
+    assert "Server-Timing" not in response.headers
+    assert "metrics" not in app.view_functions
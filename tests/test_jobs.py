@@ -0,0 +1,160 @@
+"""Tests for background export and report jobs."""
+
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.jobs import FAILED, JobQueueFull, get_job_runner, iter_words
+from app.models import Job, User, Word
+
+START = datetime(2025, 1, 1, 9, 0)
+
+
+@pytest.fixture
+def runner(app, tmp_path):
+    """Job runner writing artifacts under a temporary directory."""
+    app.config["JOB_ARTIFACT_DIR"] = str(tmp_path)
+    return get_job_runner(app)
+
+
+@pytest.fixture
+def words(seeded_db):
+    """Five words on consecutive days."""
+    nick = User.query.filter_by(username="nick").first()
+    db.session.add_all(
+        Word(word=f"word{n}", user_id=nick.id, date_added=START + timedelta(days=n))
+        for n in range(5)
+    )
+    db.session.commit()
+
+
+def test_api_export_job_runs_and_downloads(authenticated_client, runner, words):
+    """A submitted export finishes with a downloadable CSV."""
+    response = authenticated_client.post("/api/jobs", json={"kind": "export"})
+
+    assert response.status_code == 202
+    job = response.get_json()
+    assert job["status"] == "done"
+    assert job["progress"] == 1.0
+
+    status = authenticated_client.get(job["status_url"]).get_json()
+    assert status["download_url"] == job["download_url"]
+
+    download = authenticated_client.get(job["download_url"])
+    assert download.status_code == 200
+    assert download.mimetype == "text/csv"
+    lines = download.data.decode("utf-8-sig").splitlines()
+    assert lines[0] == "Word,Date Added,Added By,Category"
+    assert lines[1:] == [f"word{n},2025-01-0{n + 1},Nick," for n in range(5)]
+
+
+def test_finished_job_reused_until_words_change(authenticated_client, runner, words):
+    """The same job is returned while the data version stands."""
+    first = authenticated_client.post("/api/jobs", json={"kind": "export"}).get_json()
+
+    again = authenticated_client.post("/api/jobs", json={"kind": "export"})
+    assert again.status_code == 200
+    assert again.get_json()["id"] == first["id"]
+
+    authenticated_client.post("/words/add", data={"word": "newword"})
+    fresh = authenticated_client.post("/api/jobs", json={"kind": "export"})
+    assert fresh.status_code == 202
+    assert fresh.get_json()["id"] != first["id"]
+
+    # The superseded artifact is deleted
+    assert authenticated_client.get(first["download_url"]).status_code == 404
+    assert len(os.listdir(runner.artifact_dir)) == 1
+
+
+def test_missing_artifact_is_rebuilt(authenticated_client, runner, words):
+    """A finished job whose file is gone is not reused."""
+    first = authenticated_client.post("/api/jobs", json={"kind": "export"}).get_json()
+    os.remove(runner.artifact_path(db.session.get(Job, first["id"])))
+
+    again = authenticated_client.post("/api/jobs", json={"kind": "export"})
+    assert again.status_code == 202
+
+
+def test_pending_job_deduplicated(app, runner, words):
+    """A queued job is returned instead of queuing a duplicate."""
+    runner.run_async = True
+    runner._ensure_executor = lambda: type("Idle", (), {"submit": lambda *args: None})()
+
+    job, reused = runner.submit("export")
+    again, reused_again = runner.submit("export")
+
+    assert reused is False
+    assert reused_again is True
+    assert again.id == job.id
+
+
+def test_queue_limit(app, runner, words):
+    """Submitting past the waiting-job limit raises."""
+    runner.pending = runner.max_queued
+
+    with pytest.raises(JobQueueFull):
+        runner.submit("report")
+
+
+def test_api_queue_full(authenticated_client, runner, words):
+    """The API sheds jobs with 503 and Retry-After when the queue is full."""
+    runner.pending = runner.max_queued
+
+    response = authenticated_client.post("/api/jobs", json={"kind": "report"})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "30"
+
+
+def test_api_rejects_unknown_kind(authenticated_client, runner):
+    """Unknown job types and missing jobs are reported."""
+    assert authenticated_client.post("/api/jobs", json={"kind": "nope"}).status_code == 400
+    assert authenticated_client.post("/api/jobs", data="x").status_code == 400
+    assert authenticated_client.get("/api/jobs/missing").status_code == 404
+
+
+def test_report_job_page(app, authenticated_client, runner, words):
+    """The stats page button prepares a printable report."""
+    app.config["BABY_BIRTHDATE"] = "2024-01-15"
+
+    response = authenticated_client.post("/jobs/report")
+    assert response.status_code == 302
+    status = authenticated_client.get(response.headers["Location"])
+    assert status.status_code == 200
+    assert b"Open Report" in status.data
+
+    job = Job.query.filter_by(kind="report").one()
+    report = authenticated_client.get(f"/jobs/{job.id}/download")
+    assert report.status_code == 200
+    assert report.mimetype == "text/html"
+    assert "attachment" not in report.headers["Content-Disposition"]
+    html = report.data.decode()
+    assert "Vocabulary Report" in html
+    assert "word3" in html
+    # Three words (the 12-18 month milestone) were reached on the third day
+    assert "Jan 03, 2025 (11 mo)" in html
+
+
+def test_failed_job_records_error(app, runner, words, monkeypatch):
+    """A failing job is marked failed with its error and leaves no file."""
+    def broken(*args, **kwargs):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr("app.export.write_csv", broken)
+
+    job, _ = runner.submit("export")
+
+    assert job.status == FAILED
+    assert job.error == "disk full"
+    assert os.listdir(runner.artifact_dir) == []
+
+
+def test_iter_words_pages_through_ties(app, seeded_db):
+    """Export paging keeps order across batches of identical timestamps."""
+    nick = User.query.filter_by(username="nick").first()
+    db.session.add_all(Word(word=f"t{n:02d}", user_id=nick.id, date_added=START) for n in range(7))
+    db.session.commit()
+
+    assert [row.word for row in iter_words(batch_size=3)] == [f"t{n:02d}" for n in range(7)]
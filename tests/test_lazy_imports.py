@@ -0,0 +1,42 @@
+"""Tests that startup leaves migrations, bcrypt and the CSV export unloaded."""
+
+import subprocess
+import sys
+
+from benchmarks.import_time import LAZY_MODULES, parse_importtime
+
+STARTUP = (
+    "import sys\n"
+    "from app import create_app\n"
+    "create_app('testing')\n"
+    f"print(','.join(name for name in {LAZY_MODULES!r} if name in sys.modules))\n"
+)
+
+
+def test_create_app_skips_lazy_modules():
+    """Creating the app imports none of the lazily loaded modules."""
+    completed = subprocess.run([sys.executable, "-c", STARTUP], capture_output=True, text=True, check=True)
+
+    assert completed.stdout.strip() == ""
+
+
+def test_db_commands_load_on_demand(app):
+    """``flask db`` sets Flask-Migrate up the first time it is used."""
+    assert "migrate" not in app.extensions
+
+    result = app.test_cli_runner().invoke(args=["db", "--help"])
+
+    assert result.exit_code == 0, result.output
+    assert "upgrade" in result.output
+    assert app.extensions["migrate"].db is not None
+
+
+def test_parse_importtime():
+    """The benchmark reads module, depth, self and cumulative times."""
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |   _csv\n"
+        "import time:       600 |        720 | csv\n"
+    )
+
+    assert parse_importtime(stderr) == [("_csv", 1, 120, 120), ("csv", 0, 600, 720)]
@@ -0,0 +1,217 @@
+"""Tests for Server-Sent Events live updates."""
+
+import json
+import threading
+
+import pytest
+
+from app import db
+from app.changes import latest_seq
+from app.live import LiveHubFull, fit_live_clients, get_live_hub
+from app.models import User, Word
+
+
+def add(word):
+    """Add a word through the ORM as the other parent."""
+    wife = User.query.filter_by(username="wife").first()
+    entry = Word(word=word, user_id=wife.id)
+    db.session.add(entry)
+    db.session.commit()
+    return entry
+
+
+def parse(chunk):
+    """Split one SSE message into its fields, decoding the data as JSON."""
+    fields = {}
+    for line in chunk.decode().strip().splitlines():
+        name, _, value = line.partition(": ")
+        fields[name] = json.loads(value) if name == "data" else value
+    return fields
+
+
+@pytest.fixture
+def open_stream(authenticated_client):
+    """Open /events and return an iterator over its messages."""
+    responses = []
+
+    def open_(headers=None):
+        response = authenticated_client.get("/events", headers=headers or {}, buffered=False)
+        responses.append(response)
+        assert response.status_code == 200
+        assert response.mimetype == "text/event-stream"
+        stream = response.iter_encoded()
+        assert next(stream).startswith(b"retry: ")
+        return stream
+
+    yield open_
+    for response in responses:
+        response.close()
+
+
+def test_stream_pushes_changes_and_counts(app, seeded_db, open_stream):
+    """Words added, edited and deleted elsewhere arrive as events."""
+    stream = open_stream()
+    assert next(stream) == b": heartbeat\n\n"
+
+    ball = add("ball")
+    added = parse(next(stream))
+    assert added["event"] == "word-added"
+    assert added["id"] == str(latest_seq())
+    assert added["data"]["word"]["word"] == "ball"
+    assert added["data"]["word"]["user"] == "Partner"
+    assert f'data-word-id="{ball.id}"' in added["data"]["html"]["row"]
+    assert parse(next(stream)) == {"event": "count", "data": {"word_count": 1}}
+
+    ball.word = "balls"
+    db.session.commit()
+    edited = parse(next(stream))
+    assert edited["event"] == "word-edited"
+    assert "balls" in edited["data"]["html"]["card"]
+    next(stream)
+
+    db.session.delete(ball)
+    db.session.commit()
+    deleted = parse(next(stream))
+    assert deleted["event"] == "word-deleted"
+    assert deleted["data"]["word_id"] == ball.id
+    assert "html" not in deleted["data"]
+    assert parse(next(stream))["data"] == {"word_count": 0}
+
+
+def test_reconnect_replays_from_last_event_id(seeded_db, open_stream):
+    """A client reconnecting with Last-Event-ID gets what it missed."""
+    add("ball")
+    seen = latest_seq()
+    add("dog")
+    add("cat")
+
+    stream = open_stream({"Last-Event-ID": str(seen)})
+
+    events = [parse(next(stream)) for _ in range(3)]
+    assert [e["data"]["word"]["word"] for e in events[:2]] == ["dog", "cat"]
+    assert events[2] == {"event": "count", "data": {"word_count": 3}}
+    assert next(stream) == b": heartbeat\n\n"
+
+
+def test_large_gap_becomes_reset(app, seeded_db, open_stream):
+    """A client too far behind is told to reload instead of replaying."""
+    app.config["LIVE_BACKLOG"] = 2
+    for word in ("a", "b", "c"):
+        add(word)
+
+    stream = open_stream({"Last-Event-ID": "0"})
+
+    assert parse(next(stream)) == {
+        "id": str(latest_seq()), "event": "reset", "data": {"seq": latest_seq()},
+    }
+
+
+def test_hub_shares_one_buffer(app, seeded_db):
+    """Streams read from one buffer; a cursor behind it must catch up another way."""
+    hub = get_live_hub(app)
+    hub._events = type(hub._events)(maxlen=2)
+    start = hub.connect()
+    for word in ("a", "b", "c"):
+        add(word)
+
+    events, count = hub.wait(start, timeout=0)
+
+    assert events is None
+    assert count == 3
+    recent, _ = hub.wait(latest_seq() - 1, timeout=0)
+    assert [seq for seq, _ in recent] == [latest_seq()]
+    hub.disconnect()
+
+
+def test_local_commit_wakes_hub(app, seeded_db, open_stream):
+    """A commit in this process signals the hub without waiting for the poll."""
+    open_stream()
+    hub = get_live_hub(app)
+    hub._wake.clear()
+
+    add("ball")
+
+    assert hub._wake.is_set()
+
+
+def test_stream_limit_returns_503(app, authenticated_client, open_stream):
+    """Past LIVE_MAX_CLIENTS, new streams are turned away with Retry-After."""
+    app.config["LIVE_MAX_CLIENTS"] = 1
+    open_stream()
+
+    response = authenticated_client.get("/events")
+
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) > 0
+
+
+def test_concurrent_connects_respect_cap(app):
+    """Streams connecting together never exceed the cap."""
+    hub = get_live_hub(app)
+    hub._cursor = 0
+    start = threading.Barrier(8)
+    refused = []
+
+    def connect():
+        start.wait(5)
+        try:
+            hub.connect(max_clients=3)
+        except LiveHubFull:
+            refused.append(True)
+
+    threads = [threading.Thread(target=connect) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert (hub.clients, len(refused)) == (3, 5)
+    for _ in range(3):
+        hub.disconnect()
+
+
+def test_closed_stream_disconnects(app, authenticated_client):
+    """Closing the response unregisters the stream."""
+    response = authenticated_client.get("/events", buffered=False)
+    next(response.iter_encoded())
+    hub = get_live_hub(app)
+    assert hub.clients == 1
+
+    response.close()
+
+    assert hub.clients == 0
+
+
+def test_unstarted_stream_disconnects(app, authenticated_client):
+    """A response dropped before streaming still unregisters its client."""
+    response = authenticated_client.get("/events", buffered=False)
+    hub = get_live_hub(app)
+    assert hub.clients == 1
+
+    response.close()
+
+    assert hub.clients == 0
+
+
+def test_live_clients_leave_threads_free(app):
+    """Under a threaded worker the cap stays below the thread count."""
+    app.config.update(LIVE_MAX_CLIENTS=50, LIVE_RESERVED_THREADS=4)
+
+    assert fit_live_clients(app, 16) == 12
+    assert fit_live_clients(app, 64) == 12
+    assert fit_live_clients(app, 2) == 0
+
+
+def test_events_require_login(client, seeded_db):
+    """Anonymous requests are sent to the login page."""
+    response = client.get("/events")
+
+    assert response.status_code == 302
+    assert "/login" in response.headers["Location"]
+
+
+def test_pages_subscribe_when_signed_in(authenticated_client, seeded_db):
+    """The dashboard and word list point app.js at the event stream; other pages don't."""
+    for url in ("/", "/words"):
+        assert b'data-live="/events"' in authenticated_client.get(url).data
+    assert b"data-live" not in authenticated_client.get("/stats").data
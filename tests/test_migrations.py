@@ -0,0 +1,56 @@
+"""Tests for upgrading existing databases with the Alembic migrations."""
+
+import os
+
+import pytest
+import sqlalchemy as sa
+from flask_migrate import Migrate, upgrade
+
+from app import create_app, db
+from app.models import Word
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(__file__)), "migrations")
+
+
+@pytest.fixture
+def baseline_app(tmp_path):
+    """An app on a SQLite file holding the baseline schema, at 001_initial."""
+    app = create_app("testing", SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'app.db'}")
+    Migrate(app, db, directory=MIGRATIONS)
+    with app.app_context():
+        upgrade(revision="001_initial")
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_upgrade_after_app_start(baseline_app):
+    """Upgrading works although app startup already created the new tables."""
+    # What every non-testing app start does before `flask db upgrade` runs
+    db.create_all()
+
+    upgrade()
+
+    tables = set(sa.inspect(db.engine).get_table_names())
+    assert {"slow_queries", "data_versions", "word_changes", "jobs"} <= tables
+    head = db.session.execute(sa.text("SELECT version_num FROM alembic_version")).scalar()
+    assert head == "007_jobs"
+
+
+def test_upgrade_adds_client_id_to_existing_words(baseline_app):
+    """Words from before offline sync get the client_id column and index."""
+    db.session.execute(sa.text(
+        "INSERT INTO users (username, password_hash, display_name) VALUES ('nick', 'x', 'Nick')"
+    ))
+    db.session.execute(sa.text(
+        "INSERT INTO words (word, date_added, user_id, created_at, updated_at) "
+        "VALUES ('ball', '2025-01-01', 1, '2025-01-01', '2025-01-01')"
+    ))
+    db.session.commit()
+    db.create_all()
+
+    upgrade()
+
+    assert [(word.word, word.client_id) for word in Word.query.all()] == [("ball", None)]
+    indexes = {index["name"]: index for index in sa.inspect(db.engine).get_indexes("words")}
+    assert indexes["ix_words_client_id"]["unique"]
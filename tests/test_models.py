@@ -15,6 +15,18 @@ class TestUserModel:
         assert user.check_password("secret123") is True
         assert user.check_password("wrong") is False
 
+    def test_password_cost_from_config(self, app):
+        """New hashes use BCRYPT_ROUNDS; older hashes still verify."""
+        user = User(username="test", display_name="Test")
+        user.set_password("secret123")
+        assert user.password_hash.startswith("$2b$04$")
+
+        app.config["BCRYPT_ROUNDS"] = 5
+        stronger = User(username="test2", display_name="Test")
+        stronger.set_password("secret123")
+        assert stronger.password_hash.startswith("$2b$05$")
+        assert user.check_password("secret123") is True
+
     def test_user_repr(self, app):
         """User has a readable string representation."""
         user = User(username="testuser", display_name="Test User")
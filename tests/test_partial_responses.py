@@ -0,0 +1,116 @@
+"""Tests for partial-page (JSON delta) responses on add, edit and delete."""
+
+import pytest
+
+from app.models import Word
+
+XHR = {"X-Requested-With": "XMLHttpRequest"}
+JSON = {"Accept": "application/json"}
+BROWSER = {"Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8"}
+
+
+def pending_flashes(client):
+    """Return messages flashed to the session but not yet displayed."""
+    with client.session_transaction() as session:
+        return session.get("_flashes", [])
+
+
+@pytest.mark.parametrize("headers", [XHR, JSON])
+def test_add_word_returns_delta(authenticated_client, seeded_db, headers):
+    """A scripted add gets the new word, its fragments and the count."""
+    response = authenticated_client.post("/words/add", data={"word": "ball"}, headers=headers)
+
+    assert response.status_code == 201
+    data = response.get_json()
+    assert data["ok"] is True
+    assert data["category"] == "success"
+    assert data["word"]["word"] == "ball"
+    assert data["word"]["user"] == "Nick"
+    assert data["word_count"] == 1
+    assert f'data-word-id="{data["word"]["id"]}"' in data["html"]["row"]
+    assert "ball" in data["html"]["card"]
+    assert "ball" in data["html"]["recent"]
+    assert 'class="flash-message success"' in data["flash"]
+    # The message travels in the delta, not in the session
+    assert pending_flashes(authenticated_client) == []
+
+
+def test_add_word_errors_return_status(authenticated_client, seeded_db):
+    """Empty and duplicate words are reported with error statuses."""
+    response = authenticated_client.post("/words/add", data={"word": " "}, headers=XHR)
+    assert response.status_code == 400
+    assert response.get_json()["ok"] is False
+
+    authenticated_client.post("/words/add", data={"word": "Dog"}, headers=XHR)
+    response = authenticated_client.post("/words/add", data={"word": "dog"}, headers=XHR)
+    assert response.status_code == 409
+    data = response.get_json()
+    assert data["category"] == "error"
+    assert "already been added" in data["message"]
+    assert Word.query.count() == 1
+
+
+def test_browser_form_post_still_redirects(authenticated_client, seeded_db):
+    """Plain form submissions keep the post-redirect-get flow."""
+    response = authenticated_client.post("/words/add", data={"word": "cat"}, headers=BROWSER)
+
+    assert response.status_code == 302
+    assert pending_flashes(authenticated_client)
+
+
+def test_add_word_group_commit_delta(app, authenticated_client):
+    """The group-commit path returns the same delta."""
+    app.config["GROUP_COMMIT_ENABLED"] = True
+
+    response = authenticated_client.post("/words/add", data={"word": "moo"}, headers=XHR)
+    assert response.status_code == 201
+    assert response.get_json()["word"]["word"] == "moo"
+
+    response = authenticated_client.post("/words/add", data={"word": "MOO"}, headers=XHR)
+    assert response.status_code == 409
+
+
+def test_edit_word_returns_delta(authenticated_client, seeded_db, sample_words):
+    """A scripted edit gets the updated word and fragments."""
+    word = sample_words[0]
+    word_id = word.id
+    other = sample_words[1].word
+
+    response = authenticated_client.post(
+        f"/words/{word_id}/edit", data={"word": "renamed"}, headers=XHR
+    )
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["word"]["id"] == word_id
+    assert data["word"]["word"] == "renamed"
+    assert "renamed" in data["html"]["row"]
+    assert "word_count" not in data
+
+    response = authenticated_client.post(
+        f"/words/{word_id}/edit", data={"word": other}, headers=XHR
+    )
+    assert response.status_code == 409
+    assert Word.query.get(word_id).word == "renamed"
+
+
+def test_delete_word_returns_delta(authenticated_client, seeded_db, sample_words):
+    """A scripted delete reports the removed id and the new count."""
+    word_id = sample_words[0].id
+    remaining = len(sample_words) - 1
+
+    response = authenticated_client.post(f"/words/{word_id}/delete", headers=JSON)
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["deleted_id"] == word_id
+    assert data["word_count"] == remaining
+    assert data["redirect"] == "/words"
+    assert Word.query.get(word_id) is None
+
+
+def test_pages_load_enhancement_script(authenticated_client, seeded_db):
+    """Pages include the script and mark the enhanced forms."""
+    response = authenticated_client.get("/")
+
+    assert b"js/app.js" in response.data
+    assert b'data-enhance="add-word"' in response.data
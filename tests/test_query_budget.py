@@ -0,0 +1,63 @@
+"""Tests for per-route query budgets."""
+
+import logging
+
+import pytest
+
+from app.query_budget import QueryBudgetExceeded, get_query_budget, statement_shapes
+
+BUDGETED_PAGES = ["/", "/words", "/words?sort=word&order=asc", "/words?category=1&user=1",
+                  "/stats", "/export", "/words/1/edit"]
+
+
+def test_main_routes_have_budgets(app):
+    """Every main blueprint view declares a query budget."""
+    with app.test_request_context():
+        for endpoint in app.view_functions:
+            if endpoint.startswith("main.") and endpoint != "main.logout":
+                assert get_query_budget(endpoint) is not None, endpoint
+
+
+@pytest.mark.parametrize("url", BUDGETED_PAGES)
+def test_query_count_independent_of_rows(authenticated_client, shared_dataset, count_queries, url):
+    """Pages issue the same number of queries at N and 10N rows."""
+    shared_dataset(20)
+    small = count_queries(authenticated_client, url)
+
+    shared_dataset(200)
+    large = count_queries(authenticated_client, url)
+
+    assert small == large
+
+
+def test_over_budget_raises_in_strict_mode(app, authenticated_client, sample_words):
+    """Strict mode turns a budget overrun into an error."""
+    app.config["QUERY_BUDGETS"] = {"main.word_list": 1}
+
+    with pytest.raises(QueryBudgetExceeded) as excinfo:
+        authenticated_client.get("/words")
+    assert "main.word_list" in str(excinfo.value)
+    assert "FROM words" in str(excinfo.value)
+
+
+def test_over_budget_logs_warning(app, authenticated_client, sample_words, caplog):
+    """Outside strict mode an overrun is logged with statement shapes."""
+    app.config["QUERY_BUDGETS"] = {"main.word_list": 1}
+    app.config["QUERY_BUDGET_STRICT"] = False
+
+    with caplog.at_level(logging.WARNING):
+        response = authenticated_client.get("/words")
+
+    assert response.status_code == 200
+    assert "budget 1" in caplog.text
+    assert "FROM users" in caplog.text
+
+
+def test_statement_shapes_group_repeats():
+    """Repeated statements with different values share a shape."""
+    shapes = statement_shapes([
+        "SELECT * FROM users WHERE id = 1",
+        "SELECT * FROM users WHERE id = 2",
+        "SELECT * FROM categories",
+    ])
+    assert shapes[0] == ("SELECT * FROM users WHERE id = ?", 2)
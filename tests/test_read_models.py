@@ -0,0 +1,37 @@
+"""Tests for read-only word rows."""
+
+from datetime import date
+
+from app import db
+from app.models import Word
+from app.read_models import WordRow, recent_words, select_words, word_rows
+
+
+def test_rows_skip_the_session(sample_words):
+    """Rows are plain tuples and nothing enters the identity map."""
+    db.session.expunge_all()
+
+    rows = word_rows(select_words().order_by(Word.word))
+
+    assert [row.word for row in rows] == ["apple", "banana", "cat", "dog", "eat"]
+    assert all(type(row) is WordRow for row in rows)
+    assert len(db.session.identity_map) == 0
+
+
+def test_filters_match_word_list(sample_words):
+    """Category, user and date filters combine."""
+    noun = next(word.category_id for word in sample_words if word.word == "apple")
+    wife = next(word.user_id for word in sample_words if word.word == "banana")
+
+    by_category = word_rows(select_words(category_id=noun).order_by(Word.word))
+    assert [row.word for row in by_category] == ["apple", "banana", "dog"]
+
+    both = word_rows(select_words(category_id=noun, user_id=wife).order_by(Word.word))
+    assert [row.word for row in both] == ["banana", "dog"]
+
+    assert word_rows(select_words(start=date(2000, 1, 1), end=date(2000, 1, 2))) == []
+
+
+def test_recent_words_newest_first(sample_words):
+    """The dashboard's recent list is newest first and limited."""
+    assert [row.word for row in recent_words(3)] == ["dog", "cat", "banana"]
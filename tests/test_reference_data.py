@@ -0,0 +1,130 @@
+"""Tests for the reference data cache and data version stamps."""
+
+import pytest
+from flask import g
+from sqlalchemy import insert, update
+
+from app import db
+from app.data_versions import bump_version, get_version
+from app.models import Category, User
+from app.query_budget import record_queries
+from app.reference_data import REFERENCE, category_name, get_reference_data, user_name
+
+
+@pytest.fixture
+def cache(app, seeded_db):
+    """The app's reference cache with two categories added."""
+    db.session.add_all([Category(name="Noun"), Category(name="Verb")])
+    db.session.commit()
+    return app.extensions["reference_data"]
+
+
+def change_elsewhere(statement):
+    """Run a write the way another worker would: Core SQL plus a version bump."""
+    with db.engine.begin() as conn:
+        conn.execute(statement)
+        bump_version(REFERENCE, conn)
+
+
+def test_snapshot_holds_rows_and_name_maps(cache):
+    """The snapshot lists categories and users with id-to-name maps."""
+    reference = get_reference_data()
+
+    assert [c.name for c in reference.categories] == ["Noun", "Verb"]
+    assert [u.username for u in reference.users] == ["nick", "wife"]
+    nick = reference.users[0]
+    assert reference.user_names[nick.id] == "Nick"
+    assert reference.category_names[reference.categories[0].id] == "Noun"
+    with pytest.raises(TypeError):
+        reference.user_names[nick.id] = "Someone"
+
+
+def test_cached_snapshot_issues_no_queries(cache):
+    """Within the TTL the snapshot is served without touching the database."""
+    cache.ttl = 60
+    first = get_reference_data()
+
+    with record_queries() as statements:
+        second = get_reference_data()
+
+    assert second is first
+    assert statements == []
+
+
+def test_version_checked_once_per_request(cache):
+    """With no TTL, each request costs one version check and no reloads."""
+    get_reference_data()
+    loads = cache.loads
+
+    with record_queries() as statements:
+        g.pop("_reference_checked", None)
+        get_reference_data()
+        get_reference_data()
+
+    assert len(statements) == 1
+    assert "data_versions" in statements[0]
+    assert cache.loads == loads
+
+
+def test_local_commit_invalidates(cache):
+    """ORM changes bump the version and drop the snapshot at commit."""
+    before = get_reference_data()
+
+    db.session.add(Category(name="Animal Sound"))
+    db.session.commit()
+
+    after = get_reference_data()
+    assert after.version == before.version + 1
+    assert "Animal Sound" in [c.name for c in after.categories]
+
+
+def test_unmodified_users_do_not_bump(cache):
+    """Loading and touching users without changes leaves the version alone."""
+    version = get_version(REFERENCE)
+
+    user = User.query.filter_by(username="nick").first()
+    user.display_name = user.display_name
+    db.session.commit()
+
+    assert get_version(REFERENCE) == version
+
+
+def test_other_worker_change_seen_after_version_check(cache):
+    """Changes from another worker are picked up once the version is checked."""
+    cache.ttl = 60
+    get_reference_data()
+    change_elsewhere(update(Category).where(Category.name == "Noun").values(name="Thing"))
+
+    # Still within the TTL: the old snapshot is served
+    assert "Noun" in get_reference_data().category_names.values()
+
+    cache.ttl = 0
+    g.pop("_reference_checked", None)
+    assert "Thing" in get_reference_data().category_names.values()
+
+
+def test_lookup_reloads_on_unknown_id(cache):
+    """A name lookup for a row newer than the snapshot reloads it."""
+    cache.ttl = 60
+    get_reference_data()
+    db.session.execute(
+        insert(User).values(id=99, username="grandma", password_hash="x", display_name="Grandma")
+    )
+
+    assert user_name(99) == "Grandma"
+    assert category_name(None) is None
+
+
+def test_pages_use_snapshot(authenticated_client, cache, sample_words):
+    """Word pages and the export no longer query categories or users."""
+    get_reference_data()
+
+    for url in ("/", "/words", "/export", f"/words/{sample_words[0].id}/edit"):
+        with record_queries() as statements:
+            response = authenticated_client.get(url)
+        assert response.status_code == 200
+        assert not any("FROM categories" in statement for statement in statements), url
+
+    response = authenticated_client.get("/words")
+    assert b"Nick" in response.data
+    assert b"Noun" in response.data
@@ -0,0 +1,119 @@
+"""Tests for the slow query log."""
+
+import pytest
+
+from app.models import SlowQuery
+from app.slow_queries import fingerprint_sql, normalize_sql, param_shape
+
+
+@pytest.fixture
+def slow_log(app):
+    """Slow query log that records every statement."""
+    log = app.extensions["slow_query_log"]
+    log.threshold_ms = 0
+    yield log
+    log.threshold_ms = app.config["SLOW_QUERY_THRESHOLD_MS"]
+
+
+def record(log):
+    """Flush queued statements and stop logging the test's own queries."""
+    log.flush()
+    log.threshold_ms = 10_000
+
+
+class TestNormalization:
+    """Tests for statement shape normalization."""
+
+    def test_literals_and_placeholders_collapse(self):
+        """Values and placeholder styles normalize to the same shape."""
+        a = normalize_sql("SELECT * FROM words WHERE id = 5 AND word = 'ball'")
+        b = normalize_sql("SELECT *  FROM words\nWHERE id = ? AND word = %(word_1)s")
+        assert a == b == "SELECT * FROM words WHERE id = ? AND word = ?"
+
+    def test_in_lists_collapse(self):
+        """IN lists of any length share a shape."""
+        short = normalize_sql("SELECT * FROM words WHERE id IN (?, ?)")
+        long = normalize_sql("SELECT * FROM words WHERE id IN (1, 2, 3, 4)")
+        assert short == long
+        assert fingerprint_sql(short) == fingerprint_sql(long)
+
+    def test_identifiers_keep_digits(self):
+        """Digits inside identifiers are not treated as literals."""
+        assert "anon_1" in normalize_sql("SELECT count(*) AS anon_1 FROM words")
+
+    def test_param_shape(self):
+        """Parameter shapes record types, not values."""
+        assert param_shape((1, "ball", None)) == "(int, str, NoneType)"
+        assert param_shape({"id": 3}) == "{id: int}"
+        assert param_shape([(1,), (2,)], executemany=True) == "2 x (int)"
+
+
+class TestSlowQueryLog:
+    """Tests for recording slow statements."""
+
+    def test_records_route_and_plan(self, authenticated_client, sample_words, slow_log):
+        """Slow statements are stored with route, shape and plan."""
+        authenticated_client.get("/words?category=1")
+        record(slow_log)
+
+        rows = SlowQuery.query.filter_by(route="main.word_list").all()
+        assert rows
+        select_words = next(r for r in rows if "FROM words" in r.statement)
+        assert "?" in select_words.statement
+        assert select_words.param_shape.startswith("(")
+        assert select_words.plan and ("SCAN" in select_words.plan or "SEARCH" in select_words.plan)
+
+    def test_identical_shapes_deduplicated(self, authenticated_client, sample_words, slow_log):
+        """Repeated statements update one row instead of adding more."""
+        authenticated_client.get("/words?category=1")
+        record(slow_log)
+        shapes = SlowQuery.query.count()
+        calls = SlowQuery.query.with_entities(SlowQuery.calls).all()
+
+        slow_log.threshold_ms = 0
+        authenticated_client.get("/words?category=2")
+        record(slow_log)
+
+        assert SlowQuery.query.count() == shapes
+        assert sum(c for (c,) in SlowQuery.query.with_entities(SlowQuery.calls)) > sum(
+            c for (c,) in calls
+        )
+
+    def test_below_threshold_ignored(self, authenticated_client, sample_words, app):
+        """Fast statements are not recorded."""
+        log = app.extensions["slow_query_log"]
+        log.threshold_ms = 10_000
+        authenticated_client.get("/words")
+        log.flush()
+        assert SlowQuery.query.count() == 0
+
+    def test_async_recording(self, app, seeded_db, slow_log):
+        """The background thread records submitted statements."""
+        slow_log.run_async = True
+        try:
+            slow_log.threshold_ms = 10_000
+            slow_log.submit("SELECT * FROM users WHERE id = ?", (1,), False, 250.0, "main.login")
+            slow_log.flush()
+        finally:
+            slow_log.run_async = False
+
+        row = SlowQuery.query.one()
+        assert row.route == "main.login"
+        assert row.calls == 1
+        assert row.max_ms == 250.0
+
+
+def test_slow_queries_command(app, authenticated_client, sample_words, slow_log):
+    """The CLI lists recorded shapes with their plans."""
+    authenticated_client.get("/stats")
+    record(slow_log)
+
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=["slow-queries", "--plans", "--limit", "3"])
+    assert result.exit_code == 0, result.output
+    assert "main.stats" in result.output or "main.login" in result.output
+    assert "|" in result.output
+
+    result = runner.invoke(args=["slow-queries", "--reset"])
+    assert "Cleared" in result.output
+    assert SlowQuery.query.count() == 0
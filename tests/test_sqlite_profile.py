@@ -0,0 +1,96 @@
+"""Tests for the SQLite connection profile and upkeep."""
+
+import pytest
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import IntegrityError
+
+from app import create_app, db
+from app.models import Word
+from app.sqlite_profile import is_file_database
+
+
+@pytest.fixture
+def file_app(tmp_path):
+    """An app on a SQLite file with the schema created."""
+    app = create_app("testing", SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'app.db'}")
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+def pragma(name):
+    return db.session.execute(db.text(f"PRAGMA {name}")).scalar()
+
+
+def test_file_database_detection():
+    """Only SQLite files get the profile."""
+    assert is_file_database(make_url("sqlite:///dev.db"))
+    assert not is_file_database(make_url("sqlite:///:memory:"))
+    assert not is_file_database(make_url("sqlite://"))
+    assert not is_file_database(make_url("sqlite:///file:mem?mode=memory&uri=true"))
+    assert not is_file_database(make_url("postgresql://localhost/words"))
+
+
+def test_connections_get_profile(file_app):
+    """Every connection runs with the tuned settings."""
+    assert pragma("journal_mode") == "wal"
+    assert pragma("synchronous") == 1
+    assert pragma("foreign_keys") == 1
+    assert pragma("busy_timeout") == 5000
+    assert pragma("cache_size") == -16384
+    assert pragma("mmap_size") == 256 * 1024 * 1024
+    assert pragma("auto_vacuum") == 2
+
+
+def test_foreign_keys_enforced(file_app):
+    """A word cannot point at a missing user."""
+    db.session.add(Word(word="ball", user_id=999))
+    with pytest.raises(IntegrityError):
+        db.session.commit()
+
+
+def test_maintenance_checkpoints_and_vacuums(file_app):
+    """Upkeep empties the WAL and returns freed pages."""
+    db.session.execute(db.text("CREATE TABLE scratch (data TEXT)"))
+    db.session.execute(
+        db.text("INSERT INTO scratch SELECT hex(randomblob(2000)) FROM (WITH RECURSIVE n(i) AS "
+                "(SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 200) SELECT i FROM n)")
+    )
+    db.session.commit()
+    db.session.execute(db.text("DROP TABLE scratch"))
+    db.session.commit()
+    db.session.remove()
+
+    result = file_app.extensions["sqlite_maintenance"].run()
+
+    assert result["busy"] is False
+    assert result["checkpointed"] == result["wal_frames"]
+    assert result["free_pages"] > 0
+    assert result["free_pages_after"] == 0
+
+
+def test_maintenance_command(file_app):
+    """``flask sqlite-maintenance`` runs upkeep, optionally after a VACUUM."""
+    result = file_app.test_cli_runner().invoke(args=["sqlite-maintenance", "--vacuum"])
+
+    assert result.exit_code == 0, result.output
+    assert "Rebuilt the database file." in result.output
+    assert "free pages 0 -> 0" in result.output
+
+
+def test_profile_can_be_disabled(tmp_path):
+    """SQLITE_TUNING=false keeps SQLite's defaults."""
+    app = create_app("testing", SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'plain.db'}",
+                     SQLITE_TUNING=False)
+    with app.app_context():
+        assert "sqlite_maintenance" not in app.extensions
+        assert pragma("journal_mode") == "delete"
+        assert pragma("foreign_keys") == 0
+        db.engine.dispose()
+
+
+def test_memory_database_untouched(app):
+    """The in-memory test database gets no profile."""
+    assert "sqlite_maintenance" not in app.extensions
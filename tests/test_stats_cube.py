@@ -0,0 +1,95 @@
+"""Tests for the stats cube."""
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app import db
+from app.models import Category, User, Word
+from app.query_budget import record_queries
+from app.stats_cube import (build_cube, get_stats_cube, grouping_sets_statement, load_emulated,
+                             load_stats_cube)
+
+JAN = datetime(2025, 1, 15)
+FEB = datetime(2025, 2, 15)
+
+
+@pytest.fixture
+def cube_words(seeded_db):
+    """Three January words and two February words across two users."""
+    nick = User.query.filter_by(username="nick").first()
+    wife = User.query.filter_by(username="wife").first()
+    noun = Category(name="Noun")
+    db.session.add(noun)
+    db.session.commit()
+    for word, user, category, added in (
+        ("apple", nick, noun, JAN), ("ball", nick, noun, JAN), ("cup", wife, None, JAN),
+        ("dog", nick, None, FEB), ("egg", wife, noun, FEB),
+    ):
+        db.session.add(Word(word=word, user_id=user.id, category_id=category and category.id,
+                            date_added=added))
+    db.session.commit()
+    return nick, wife, noun
+
+
+def test_cube_cells_and_subtotals(cube_words):
+    """Cells, per-dimension subtotals and the total come from one scan."""
+    nick, wife, noun = cube_words
+
+    cube = load_stats_cube()
+
+    assert cube["total"] == 5
+    assert [(c["month"], c["user_id"], c["category_id"], c["count"]) for c in cube["cells"]] == sorted([
+        ("2025-01", nick.id, noun.id, 2), ("2025-01", wife.id, None, 1),
+        ("2025-02", nick.id, None, 1), ("2025-02", wife.id, noun.id, 1),
+    ], key=lambda c: (c[0], c[1], c[2] is None))
+    assert [(m["month"], m["month_name"], m["count"], m["running_total"]) for m in cube["by_month"]] == [
+        ("2025-01", "January", 3, 3), ("2025-02", "February", 2, 5),
+    ]
+    assert [(u["user_id"], u["count"]) for u in cube["by_user"]] == [(nick.id, 3), (wife.id, 2)]
+    assert [(c["category_id"], c["count"]) for c in cube["by_category"]] == [(noun.id, 3), (None, 2)]
+
+
+def test_empty_cube(seeded_db):
+    """With no words every section is empty and the total is zero."""
+    assert build_cube(load_emulated()) == {
+        "total": 0, "cells": [], "by_month": [], "by_user": [], "by_category": [],
+    }
+
+
+def test_cached_until_words_change(cube_words):
+    """The cube is reused until the words data version moves."""
+    nick, _, _ = cube_words
+    assert get_stats_cube()["total"] == 5
+    with record_queries() as statements:
+        assert get_stats_cube()["total"] == 5
+    assert not any("GROUP BY" in statement for statement in statements)
+
+    db.session.add(Word(word="fish", user_id=nick.id, date_added=FEB))
+    db.session.commit()
+
+    assert get_stats_cube()["total"] == 6
+
+
+def test_postgres_uses_grouping_sets():
+    """The PostgreSQL path is a single GROUPING SETS query with GROUPING()."""
+    sql = str(grouping_sets_statement().compile(dialect=postgresql.dialect()))
+
+    assert "GROUP BY GROUPING SETS(" in sql
+    assert "SELECT grouping(" in sql
+    assert sql.count("SELECT") == 1
+
+
+def test_api_and_page_show_breakdowns(authenticated_client, cube_words):
+    """The JSON endpoint names users and categories; the page lists both."""
+    data = authenticated_client.get("/api/stats").get_json()
+
+    assert data["total"] == 5
+    assert [(u["user"], u["count"]) for u in data["by_user"]] == [("Nick", 3), ("Partner", 2)]
+    assert [(c["category"], c["count"]) for c in data["by_category"]] == [("Noun", 3), (None, 2)]
+
+    html = authenticated_client.get("/stats").get_data(as_text=True)
+    assert "Words by Person" in html
+    assert "Words by Category" in html
+    assert "Uncategorized" in html
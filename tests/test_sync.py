@@ -0,0 +1,116 @@
+"""Tests for the offline batch sync API."""
+
+import uuid
+
+import pytest
+
+from app import db
+from app.changes import latest_seq
+from app.models import Category, Word
+
+
+def item(word, **extra):
+    """Build a sync item with a fresh client UUID."""
+    data = {"client_id": str(uuid.uuid4()), "word": word}
+    data.update(extra)
+    return data
+
+
+def sync(client, items):
+    """POST a batch and return the decoded JSON response."""
+    response = client.post("/api/sync", json={"words": items})
+    assert response.status_code == 200, response.data
+    return response.get_json()
+
+
+def test_sync_creates_words(authenticated_client, seeded_db):
+    """New words are stored with their UUID and captured timestamp."""
+    items = [
+        item("ball", captured_at="2026-03-01T09:15:00Z"),
+        item("dog", captured_at="2026-03-01T10:00:00-05:00"),
+    ]
+    data = sync(authenticated_client, items)
+
+    assert [r["status"] for r in data["results"]] == ["created", "created"]
+    ball = Word.query.filter_by(word="ball").one()
+    assert ball.client_id == items[0]["client_id"]
+    assert ball.date_added.strftime("%Y-%m-%d %H:%M") == "2026-03-01 09:15"
+    assert ball.user.username == "nick"
+    dog = Word.query.filter_by(word="dog").one()
+    assert dog.date_added.hour == 15
+    assert data["cursor"] == str(latest_seq())
+
+
+def test_replay_is_idempotent(authenticated_client, seeded_db):
+    """Sending the same batch twice stores each word once."""
+    items = [item("milk"), item("more")]
+    first = sync(authenticated_client, items)
+    second = sync(authenticated_client, items)
+
+    assert [r["status"] for r in second["results"]] == ["replayed", "replayed"]
+    assert [r["id"] for r in second["results"]] == [r["id"] for r in first["results"]]
+    assert Word.query.count() == 2
+
+
+def test_duplicate_text_detected(authenticated_client, seeded_db):
+    """Words already stored (any case) or repeated in the batch are duplicates."""
+    sync(authenticated_client, [item("Apple")])
+
+    data = sync(authenticated_client, [item("apple "), item("cup"), item("CUP")])
+
+    statuses = [r["status"] for r in data["results"]]
+    assert statuses == ["duplicate", "created", "duplicate"]
+    assert data["results"][0]["word"] == "Apple"
+    assert data["results"][2]["id"] == data["results"][1]["id"]
+    assert Word.query.count() == 2
+
+
+def test_invalid_items_reported_individually(authenticated_client, seeded_db):
+    """Bad items are rejected without affecting valid ones."""
+    category = Category(name="Noun")
+    db.session.add(category)
+    db.session.commit()
+
+    data = sync(authenticated_client, [
+        {"client_id": "not-a-uuid", "word": "hat"},
+        item(""),
+        item("shoe", captured_at="yesterday"),
+        item("sock", category_id=999),
+        item("cat", category_id=category.id),
+    ])
+
+    statuses = [r["status"] for r in data["results"]]
+    assert statuses == ["invalid", "invalid", "invalid", "invalid", "created"]
+    assert all("error" in r for r in data["results"][:4])
+    assert Word.query.one().category.name == "Noun"
+
+
+def test_sync_rejects_malformed_payload(authenticated_client, seeded_db):
+    """A body without a words array is a 400."""
+    response = authenticated_client.post("/api/sync", json={"word": "x"})
+    assert response.status_code == 400
+
+
+def test_sync_batch_limit(app, authenticated_client, seeded_db):
+    """Batches above SYNC_MAX_BATCH are refused."""
+    app.config["SYNC_MAX_BATCH"] = 2
+    response = authenticated_client.post(
+        "/api/sync", json={"words": [item("a"), item("b"), item("c")]}
+    )
+    assert response.status_code == 413
+
+
+def test_sync_requires_auth(client):
+    """Unauthenticated sync gets a JSON 401, not a redirect."""
+    response = client.post("/api/sync", json={"words": []})
+    assert response.status_code == 401
+    assert response.get_json()["error"]
+
+
+def test_large_batch_in_one_round_trip(authenticated_client, seeded_db):
+    """A day's worth of words syncs in a single request within budget."""
+    items = [item(f"word{i}") for i in range(500)]
+    data = sync(authenticated_client, items)
+
+    assert all(r["status"] == "created" for r in data["results"])
+    assert Word.query.count() == 500
@@ -0,0 +1,181 @@
+"""Tests for rate limiting, load shedding and the health check."""
+
+import time
+
+import pytest
+
+from app import db
+from app.query_budget import record_queries
+from app.throttling import MemoryBuckets, SQLiteBuckets, parse_rate, queue_wait
+
+from tests.conftest import empty_database, make_app
+
+
+class FakeClock:
+    """Controllable replacement for time.time."""
+
+    def __init__(self, now=1_760_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(app):
+    """Freeze the app's throttle clock."""
+    fake = FakeClock()
+    app.extensions["throttle"].clock = fake
+    return fake
+
+
+def login(client, password="wrong"):
+    return client.post("/login", data={"username": "nick", "password": password})
+
+
+def test_parse_rate():
+    """Rates are a count per second, minute, hour or day."""
+    assert parse_rate("10/minute") == (10, 60)
+    assert parse_rate("5/hours") == (5, 3600)
+    with pytest.raises(ValueError):
+        parse_rate("ten/minute")
+    with pytest.raises(ValueError):
+        parse_rate("10/fortnight")
+
+
+@pytest.mark.parametrize("make_buckets", [
+    lambda tmp_path: MemoryBuckets(),
+    lambda tmp_path: SQLiteBuckets(str(tmp_path / "buckets.db")),
+], ids=["memory", "sqlite"])
+def test_token_bucket(tmp_path, make_buckets):
+    """A bucket allows a burst, then refills at the rate."""
+    buckets = make_buckets(tmp_path)
+    now = 100.0
+
+    assert [buckets.take("k", 0.5, 2, now) for _ in range(2)] == [0, 0]
+    assert buckets.take("k", 0.5, 2, now) == pytest.approx(2.0)
+    assert buckets.take("other", 0.5, 2, now) == 0
+    assert buckets.take("k", 0.5, 2, now + 2) == 0
+    assert buckets.take("k", 0.5, 2, now + 2) > 0
+
+
+def test_sqlite_buckets_shared_between_instances(tmp_path):
+    """Two workers opening the same file share buckets."""
+    path = str(tmp_path / "buckets.db")
+    first, second = SQLiteBuckets(path), SQLiteBuckets(path)
+
+    assert first.take("k", 1.0, 1, 50.0) == 0
+    assert second.take("k", 1.0, 1, 50.0) == pytest.approx(1.0)
+
+
+def test_login_limited_per_ip(client, seeded_db, clock):
+    """Repeated login attempts get 429 with Retry-After; GETs stay open."""
+    assert [login(client).status_code for _ in range(10)] == [302] * 10
+    limited = login(client)
+    assert limited.status_code == 429
+    assert int(limited.headers["Retry-After"]) == 6
+    assert client.get("/login").status_code == 200
+
+    # Another address has its own bucket
+    other = client.post("/login", data={"username": "nick", "password": "x"},
+                        environ_base={"REMOTE_ADDR": "10.0.0.9"})
+    assert other.status_code == 302
+
+    clock.now += 6
+    assert login(client).status_code == 302
+
+
+def test_proxied_clients_get_own_buckets(database):
+    """Behind a trusted proxy, each forwarded client address has its own bucket."""
+    app = make_app(database, TRUSTED_PROXIES=1)
+    app.extensions["throttle"].clock = FakeClock()
+    client = app.test_client()
+
+    def attempt(address):
+        return client.post("/login", data={"username": "nick", "password": "x"},
+                           headers={"X-Forwarded-For": address}).status_code
+
+    with app.app_context():
+        assert [attempt("203.0.113.5") for _ in range(10)] == [302] * 10
+        assert attempt("203.0.113.5") == 429
+        assert attempt("198.51.100.7") == 302
+        db.session.remove()
+    empty_database(database)
+
+
+def test_production_trusts_one_proxy():
+    """Production reads client addresses through Railway's proxy by default."""
+    from config import ProductionConfig, TestingConfig
+
+    assert ProductionConfig.TRUSTED_PROXIES == 1
+    assert TestingConfig.TRUSTED_PROXIES == 0
+
+
+def test_export_limited_per_user(authenticated_client, clock):
+    """Exports are limited per user; cheap pages are not."""
+    assert [authenticated_client.get("/export").status_code for _ in range(3)] == [200] * 3
+
+    limited = authenticated_client.get("/export")
+    assert limited.status_code == 429
+    assert authenticated_client.get("/words").status_code == 200
+
+
+def test_api_limit_answers_json(app, authenticated_client, clock):
+    """API routes report limits as JSON."""
+    app.config["RATE_LIMITS"] = {"api.list_changes": "1/minute"}
+
+    assert authenticated_client.get("/api/changes").status_code == 200
+    limited = authenticated_client.get("/api/changes")
+    assert limited.status_code == 429
+    assert "error" in limited.get_json()
+
+
+def test_config_lifts_limit(app, authenticated_client, clock):
+    """A None override removes a route's limit."""
+    app.config["RATE_LIMITS"] = {"main.export_csv": None}
+
+    assert all(authenticated_client.get("/export").status_code == 200 for _ in range(5))
+
+
+def test_sheds_expensive_routes_when_busy(app, authenticated_client, clock):
+    """Over the in-flight limit, limited routes get 503 and others still work."""
+    throttle = app.extensions["throttle"]
+    throttle.max_inflight = 2
+    throttle.in_flight = 2  # two other requests already running
+
+    shed = authenticated_client.get("/export")
+    assert shed.status_code == 503
+    assert shed.headers["Retry-After"] == "5"
+    assert authenticated_client.get("/words").status_code == 200
+    assert throttle.in_flight == 2
+
+    health = authenticated_client.get("/healthz").get_json()
+    assert health == {"status": "ok", "in_flight": 3, "shedding": True}
+
+
+def test_sheds_requests_that_queued_too_long(app, authenticated_client, clock):
+    """A request that waited past the queue limit is shed."""
+    app.extensions["throttle"].max_queue_ms = 500
+    stale = f"t={int((clock.now - 2) * 1_000_000)}"
+    fresh = f"t={clock.now - 0.1:.3f}"
+
+    assert authenticated_client.get("/export", headers={"X-Request-Start": stale}).status_code == 503
+    assert authenticated_client.get("/export", headers={"X-Request-Start": fresh}).status_code == 200
+
+
+def test_queue_wait_units():
+    """Request start stamps are read in seconds, milliseconds or microseconds."""
+    now = time.time()
+    for stamp in (f"t={now - 1:.3f}", str(int((now - 1) * 1000)), str(int((now - 1) * 1e6))):
+        assert queue_wait(stamp, now) == pytest.approx(1.0, abs=0.01)
+    assert queue_wait("garbage", now) is None
+
+
+def test_healthz_skips_database(client, app):
+    """The health check answers without a query or a login."""
+    with record_queries() as statements:
+        response = client.get("/healthz")
+
+    assert response.status_code == 200
+    assert response.get_json()["status"] == "ok"
+    assert statements == []
@@ -0,0 +1,101 @@
+"""Tests for the milestone-reached timeline."""
+
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app import db
+from app.models import User, Word
+from app.query_budget import record_queries
+from app.timeline import build_timeline, get_milestone_timeline, load_crossings, round_numbers
+
+START = datetime(2025, 1, 1, 9, 0)
+
+
+@pytest.fixture
+def growth(app, seeded_db):
+    """Sixty words, one per day from START, added out of order."""
+    app.config["BABY_BIRTHDATE"] = "2024-01-15"
+    nick = User.query.filter_by(username="nick").first()
+    db.session.add_all(
+        Word(word=f"w{n:02d}", user_id=nick.id, date_added=START + timedelta(days=n))
+        for n in reversed(range(60))
+    )
+    db.session.commit()
+
+
+def entry(timeline, words):
+    """Return the timeline entry for a word count."""
+    return next(e for e in timeline if e["words"] == words)
+
+
+def test_round_numbers():
+    """Round numbers follow a 1-2.5-5 series."""
+    assert round_numbers(1000) == [10, 25, 50, 100, 250, 500, 1000]
+
+
+def test_crossings_come_from_running_count(growth):
+    """The Nth word in date order marks when N words were reached."""
+    crossings = load_crossings([1, 3, 10, 50, 100])
+
+    assert crossings == {
+        1: START,
+        3: START + timedelta(days=2),
+        10: START + timedelta(days=9),
+        50: START + timedelta(days=49),
+    }
+
+
+def test_timeline_lists_milestones_and_round_numbers(growth):
+    """Milestones appear reached or not; round numbers up to the next one."""
+    timeline = get_milestone_timeline()
+
+    assert [e["words"] for e in timeline] == [1, 3, 10, 25, 50, 100, 200, 450]
+    ten = entry(timeline, 10)
+    assert ten["reached_on"] == date(2025, 1, 10)
+    assert ten["age_months"] == 11
+    assert ten["milestone"]["label"] == "18 months"
+    assert ten["on_time"] is True
+    assert entry(timeline, 25)["milestone"] is None
+    assert entry(timeline, 100)["reached_on"] is None
+    assert entry(timeline, 200)["on_time"] is False
+
+
+def test_late_milestone_not_on_time():
+    """A milestone reached after its age is flagged."""
+    timeline = build_timeline({1: datetime(2025, 3, 1)}, birthdate=date(2024, 1, 15))
+
+    first = entry(timeline, 1)
+    assert first["age_months"] == 13
+    assert first["on_time"] is False
+
+
+def test_timeline_cached_until_words_change(app, growth):
+    """Repeat reads in a request reuse its version check; a new word recomputes."""
+    first = get_milestone_timeline()
+
+    with record_queries() as statements:
+        assert get_milestone_timeline() is first
+    assert statements == []
+
+    nick = User.query.filter_by(username="nick").first()
+    db.session.add_all(
+        Word(word=f"x{n:02d}", user_id=nick.id, date_added=START + timedelta(days=90 + n))
+        for n in range(40)
+    )
+    db.session.commit()
+
+    with record_queries() as statements:
+        timeline = get_milestone_timeline()
+    assert len(statements) == 2
+    assert entry(timeline, 100)["reached_on"] == date(2025, 5, 10)
+
+
+def test_stats_page_shows_timeline(authenticated_client, growth):
+    """The stats page shows when each milestone was reached."""
+    response = authenticated_client.get("/stats")
+
+    assert response.status_code == 200
+    assert b"Vocabulary Timeline" in response.data
+    assert b"Jan 10, 2025 (11 mo)" in response.data
+    assert b"Not yet" in response.data
@@ -0,0 +1,71 @@
+"""Tests for worker warm-up and the readiness check."""
+
+import pytest
+
+from app import db
+from app.warmup import FAILED, READY, warm_up
+
+from tests.conftest import TEST_PASSWORD, empty_database, make_app, seed_users
+
+
+@pytest.fixture
+def warm_app(database):
+    """An app with warm-up enabled, not yet warmed."""
+    app = make_app(database, WARMUP_ENABLED=True)
+    with app.app_context():
+        yield app
+        db.session.remove()
+    empty_database(database)
+
+
+def test_readyz_ready_when_disabled(client):
+    """With warm-up off, a worker is ready at once."""
+    response = client.get("/readyz")
+
+    assert response.status_code == 200
+    assert response.get_json()["status"] == READY
+
+
+def test_warm_up_primes_templates_and_caches(warm_app):
+    """Warm-up compiles templates, opens connections and fills the caches."""
+    assert warm_up(warm_app) is True
+
+    compiled = {key[1] for key in warm_app.jinja_env.cache.keys()}
+    assert {"base.html", "words.html", "stats.html"} <= compiled
+    assert {"app.timeline._timeline", "app.growth._growth_series",
+            "app.stats_cube.get_stats_cube"} <= set(warm_app.extensions["cache"].stats())
+    assert set(warm_app.extensions["warmup"].timings) == {"pool", "templates", "reference_data", "stats"}
+
+
+def test_first_request_warms_up(warm_app, password_hash):
+    """Under a plain server the first request warms up outside its query budget."""
+    seed_users(password_hash)
+    db.session.commit()
+    client = warm_app.test_client()
+
+    assert client.get("/healthz").status_code == 200
+    assert warm_app.extensions["warmup"].state == "cold"
+
+    login = client.post("/login", data={"username": "nick", "password": TEST_PASSWORD})
+    assert login.status_code == 302
+
+    ready = client.get("/readyz").get_json()
+    assert ready["status"] == READY
+    assert ready["warmup_ms"] >= 0
+
+
+def test_failed_warm_up_not_ready(warm_app, monkeypatch):
+    """A failing step leaves the worker unready with the error, until retried."""
+    def broken(app):
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr("app.warmup.STEPS", (("pool", broken),))
+    client = warm_app.test_client()
+
+    response = client.get("/readyz")
+    assert response.status_code == 503
+    assert response.get_json() == {"status": FAILED, "error": "database unavailable"}
+
+    monkeypatch.setattr("app.warmup.RETRY_SECONDS", 0)
+    monkeypatch.setattr("app.warmup.STEPS", ())
+    assert client.get("/readyz").status_code == 200
@@ -0,0 +1,120 @@
+"""Tests for word list indexes and date-range filtering."""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.models import User, Word
+
+FILTERS = ["", "category=1", "user=1", "category=1&user=1"]
+SORTS = ["sort=date", "sort=word&order=asc"]
+RANGES = ["", "from=2025-01-01&to=2025-06-30"]
+URLS = ["/", "/export", "/export?from=2025-01-01&to=2025-06-30"] + [
+    "/words?" + "&".join(part for part in (filters, sort, dates) if part)
+    for filters in FILTERS
+    for sort in SORTS
+    for dates in RANGES
+]
+
+
+@pytest.fixture
+def word_plans(authenticated_client, sample_words):
+    """Return a helper giving the query plans of a page's word queries."""
+    def plans(url):
+        captured = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if "FROM words" in statement and "count(" not in statement:
+                captured.append((statement, parameters))
+
+        event.listen(db.engine, "before_cursor_execute", capture)
+        try:
+            response = authenticated_client.get(url)
+        finally:
+            event.remove(db.engine, "before_cursor_execute", capture)
+        assert response.status_code == 200
+        assert captured, url
+
+        connection = db.session.connection()
+        return [
+            [row[-1] for row in connection.exec_driver_sql(
+                "EXPLAIN QUERY PLAN " + statement, parameters
+            )]
+            for statement, parameters in captured
+        ]
+
+    return plans
+
+
+@pytest.mark.parametrize("url", URLS)
+def test_word_queries_use_an_index(word_plans, url):
+    """Every filter and sort combination reads words through an index."""
+    for plan in word_plans(url):
+        steps = [step for step in plan if " words" in step]
+        assert steps, plan
+        for step in steps:
+            assert "USING INDEX" in step or "USING COVERING INDEX" in step, (url, plan)
+
+
+def dated_words(days):
+    """Return the words added the given number of days ago, by name."""
+    return {f"day{n:02d}" for n in days}
+
+
+@pytest.fixture
+def dated(authenticated_client, seeded_db):
+    """Words added 1, 5, 10 and 20 days ago; returns the date of each."""
+    nick = User.query.filter_by(username="nick").first()
+    now = datetime.now(timezone.utc)
+    for days in (1, 5, 10, 20):
+        db.session.add(Word(word=f"day{days:02d}", user_id=nick.id,
+                            date_added=now - timedelta(days=days)))
+    db.session.commit()
+    return {days: (now - timedelta(days=days)).date() for days in (1, 5, 10, 20)}
+
+
+def listed(response, candidates):
+    """Return which candidate words appear in a page or export."""
+    return {word for word in candidates if word.encode() in response.data}
+
+
+def test_word_list_date_range(authenticated_client, dated):
+    """from/to keep only words added within the (inclusive) range."""
+    everything = dated_words(dated)
+
+    response = authenticated_client.get(f"/words?from={dated[10]}&to={dated[5]}")
+
+    assert listed(response, everything) == {"day10", "day05"}
+    assert b"Added:" in response.data
+    assert f'href="/export?from={dated[10]}&amp;to={dated[5]}"'.encode() in response.data
+
+
+def test_word_list_open_ended_and_invalid_dates(authenticated_client, dated):
+    """Either bound may be left out; malformed dates are ignored."""
+    everything = dated_words(dated)
+
+    response = authenticated_client.get(f"/words?from={dated[5]}")
+    assert listed(response, everything) == {"day05", "day01"}
+
+    response = authenticated_client.get(f"/words?to={dated[10]}&from=soon")
+    assert listed(response, everything) == {"day20", "day10"}
+
+
+def test_latest_possible_end_date(authenticated_client, dated):
+    """to=9999-12-31 means no upper bound rather than an overflow."""
+    everything = dated_words(dated)
+
+    for url in ("/words?to=9999-12-31", "/export?to=9999-12-31"):
+        response = authenticated_client.get(url)
+        assert response.status_code == 200
+        assert listed(response, everything) == everything
+
+
+def test_export_date_range(authenticated_client, dated):
+    """The CSV export honours the same date range."""
+    response = authenticated_client.get(f"/export?from={dated[20]}&to={dated[10]}")
+
+    assert response.status_code == 200
+    assert listed(response, dated_words(dated)) == {"day20", "day10"}